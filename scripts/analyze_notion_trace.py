@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Notion API Trace Analyzer
+Turns a JSON-lines trace written by utils/notion_client.py (NOTION_TRACE_FILE)
+into a profiling report: where the time went by calling function, which
+identical queries were repeated, and the critical path of the run.
+
+Example:
+    NOTION_TRACE_FILE=/tmp/rollover.jsonl python scripts/weekly_rollover/create_active_tasks_from_templates.py
+    python scripts/analyze_notion_trace.py /tmp/rollover.jsonl
+"""
+
+import json
+import argparse
+from bisect import bisect_right
+from collections import defaultdict
+
+
+def load_trace(path):
+    """Read trace events, skipping lines that aren't valid JSON (e.g. a partially written last line)."""
+    events = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return events
+
+
+def top_callers(events, limit=10):
+    """
+    Group calls by calling function, slowest total first.
+
+    Returns a list of dicts with caller, calls, total time (including waits
+    and retries), network time, queue wait and retries.
+    """
+    callers = defaultdict(lambda: {"calls": 0, "total_time": 0.0, "network_time": 0.0, "queue_wait": 0.0, "retries": 0})
+    for event in events:
+        entry = callers[event.get("caller", "unknown")]
+        entry["calls"] += 1
+        entry["total_time"] += event.get("duration", 0.0)
+        entry["network_time"] += event.get("network_time", 0.0)
+        entry["queue_wait"] += event.get("queue_wait", 0.0)
+        entry["retries"] += event.get("retries", 0)
+    ranked = sorted(callers.items(), key=lambda item: item[1]["total_time"], reverse=True)
+    return [{"caller": caller, **entry} for caller, entry in ranked[:limit]]
+
+
+def repeated_queries(events):
+    """
+    Find calls made more than once with identical parameters.
+
+    Returns a list of dicts with method, target, count, the time spent on the
+    repeats (every call after the first) and the callers, most repeated first.
+    """
+    groups = defaultdict(list)
+    for event in events:
+        groups[(event.get("method"), event.get("params_hash"))].append(event)
+
+    repeats = []
+    for (method, _), calls in groups.items():
+        if len(calls) < 2:
+            continue
+        repeats.append({
+            "method": method,
+            "target": calls[0].get("target"),
+            "count": len(calls),
+            "wasted_time": sum(call.get("duration", 0.0) for call in calls[1:]),
+            "callers": sorted({call.get("caller", "unknown") for call in calls}),
+        })
+    return sorted(repeats, key=lambda repeat: (repeat["count"], repeat["wasted_time"]), reverse=True)
+
+
+def critical_path(events):
+    """
+    Find the heaviest chain of calls that ran one after another.
+
+    Calls that overlap in time ran concurrently, so at most one of them can be
+    on the critical path. The chain of non-overlapping calls with the largest
+    total duration is a lower bound on how long the run must take however much
+    concurrency is added, so speeding up the run means shortening this chain.
+
+    Returns the calls on the path in start order.
+    """
+    calls = sorted(
+        (event for event in events if "ts" in event),
+        key=lambda event: event["ts"] + event.get("duration", 0.0),
+    )
+    ends = [call["ts"] + call.get("duration", 0.0) for call in calls]
+
+    # Weighted interval scheduling: best[i] is the heaviest chain among the first i calls
+    best = [0.0] * (len(calls) + 1)
+    take = [False] * (len(calls) + 1)
+    previous = [0] * (len(calls) + 1)
+    for i, call in enumerate(calls, start=1):
+        previous[i] = bisect_right(ends, call["ts"], 0, i - 1)
+        with_call = best[previous[i]] + call.get("duration", 0.0)
+        take[i] = with_call > best[i - 1]
+        best[i] = with_call if take[i] else best[i - 1]
+
+    path = []
+    i = len(calls)
+    while i > 0:
+        if take[i]:
+            path.append(calls[i - 1])
+            i = previous[i]
+        else:
+            i -= 1
+    return list(reversed(path))
+
+
+def format_report(events, limit=10):
+    """Render the full report as text."""
+    if not events:
+        return "Trace is empty."
+
+    start = min(event["ts"] for event in events)
+    end = max(event["ts"] + event.get("duration", 0.0) for event in events)
+    lines = [
+        f"Notion API trace: {len(events)} calls over {end - start:.1f}s",
+        f"  queue wait {sum(e.get('queue_wait', 0.0) for e in events):.1f}s, "
+        f"network {sum(e.get('network_time', 0.0) for e in events):.1f}s, "
+        f"retry sleep {sum(e.get('retry_sleep', 0.0) for e in events):.1f}s, "
+        f"{sum(e.get('retries', 0) for e in events)} retries",
+        "",
+        "Top callers by time:",
+    ]
+    for entry in top_callers(events, limit):
+        lines.append(
+            f"  {entry['caller']}: {entry['calls']} calls, {entry['total_time']:.1f}s total "
+            f"({entry['network_time']:.1f}s network, {entry['queue_wait']:.1f}s queued, {entry['retries']} retries)"
+        )
+
+    repeats = repeated_queries(events)
+    lines += ["", "Repeated identical calls:"]
+    if not repeats:
+        lines.append("  none")
+    for repeat in repeats[:limit]:
+        lines.append(
+            f"  {repeat['method']} on {repeat['target']}: {repeat['count']} times, "
+            f"{repeat['wasted_time']:.1f}s on repeats (from {', '.join(repeat['callers'])})"
+        )
+
+    path = critical_path(events)
+    path_time = sum(call.get("duration", 0.0) for call in path)
+    by_caller = defaultdict(lambda: [0, 0.0])
+    for call in path:
+        by_caller[call.get("caller", "unknown")][0] += 1
+        by_caller[call.get("caller", "unknown")][1] += call.get("duration", 0.0)
+    lines += ["", f"Critical path: {len(path)} sequential calls, {path_time:.1f}s of {end - start:.1f}s wall time"]
+    for caller, (count, duration) in sorted(by_caller.items(), key=lambda item: item[1][1], reverse=True):
+        lines.append(f"  {caller}: {count} calls, {duration:.1f}s")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a Notion API trace written with NOTION_TRACE_FILE")
+    parser.add_argument("trace_file", help="Path to the JSON-lines trace file")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of callers and repeated calls to list (default: 10)"
+    )
+    args = parser.parse_args()
+
+    print(format_report(load_trace(args.trace_file), limit=args.top))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Load Test for the Notion Scripts
+Runs the weekly rollover or daily review in-process against the fake Notion
+backend (utils/fake_notion.py) seeded with a large workspace, so the scripts
+can be exercised at 10k+ pages with injected latency, 5xx errors and 429s.
+
+Time is compressed by --speedup: the fake enforces Notion's 3 req/sec limit
+scaled up by that factor, the client's rate limiter, call budget, retry
+backoff and circuit breaker are scaled to match, and latencies are scaled
+down. Wall time, less the fake's own processing time, multiplied by the
+speedup estimates how long the run would take against Notion.
+
+Example:
+    python scripts/benchmarks/load_test.py --script weekly --templates 300 --active-pages 10000 \
+        --latency 0.3 --error-rate 0.01 --speedup 20
+"""
+
+import os
+import sys
+import time
+import runpy
+import random
+import logging
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+import yaml
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, PROJECT_ROOT)
+from utils import notion_client
+from utils.fake_notion import FakeNotion
+
+SCRIPTS = {
+    "weekly": os.path.join(PROJECT_ROOT, "scripts", "weekly_rollover", "create_active_tasks_from_templates.py"),
+    "daily": os.path.join(PROJECT_ROOT, "scripts", "daily_planned_date_review.py"),
+}
+
+FREQUENCIES = ("Daily", "Weekly", "Monthly", "Quarterly", "Yearly", "Monday/Friday")
+CATEGORIES = ("Random/Monday", "Cooking/Tuesday", "Cleaning/Friday")
+STATUSES = ("Not Started", "In Progress", "Done", "Not Needed", "Duplicate?")
+
+
+def _text(value):
+    return [{"text": {"content": value}}]
+
+
+def _date(value):
+    return {"date": {"start": value.isoformat()} if value else None}
+
+
+def seed_workspace(fake, templates, active_pages, today=None, seed=0):
+    """
+    Fill the fake with template tasks and active tasks shaped like a real workspace.
+
+    Most active tasks come from a template and are complete; a few lack a
+    planned date or category, or are overdue, so the daily review has work to do.
+    Returns (template_db_id, active_db_id).
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    template_db_id, active_db_id = fake.add_task_manager_databases()
+
+    template_ids = []
+    for i in range(templates):
+        page = fake.add_page(template_db_id, {
+            "Task": {"title": _text(f"Template task {i}")},
+            "Priority": {"select": {"name": rng.choice(("High", "Medium", "Low"))}},
+            "Frequency": {"select": {"name": rng.choice(FREQUENCIES)}},
+            "Category": {"select": {"name": rng.choice(CATEGORIES)}},
+        })
+        template_ids.append(page["id"])
+
+    for i in range(active_pages):
+        from_template = template_ids and rng.random() < 0.9
+        status = rng.choices(STATUSES, weights=(10, 2, 80, 5, 3))[0]
+        planned = today - timedelta(days=rng.randint(-7, 365)) if rng.random() > 0.05 else None
+        completed = planned if status == "Done" and planned else None
+        properties = {
+            "Task": {"title": _text(f"Active task {i}")},
+            "Status": {"status": {"name": status}},
+            "Planned Date": _date(planned),
+            "Completed Date": _date(completed),
+        }
+        if rng.random() > 0.05:
+            properties["Category"] = {"select": {"name": rng.choice(CATEGORIES)}}
+        if from_template:
+            properties["TemplateId"] = {"rich_text": _text(rng.choice(template_ids))}
+        fake.add_page(active_db_id, properties)
+    return template_db_id, active_db_id
+
+
+def install_fake(fake, speedup):
+    """Route every client in the process to fake, with the client's limits scaled by speedup."""
+    notion_client.set_shared_transport(fake)
+    notion_client._global_rate_limiter = notion_client.TokenBucketRateLimiter(
+        rate=notion_client.TOKEN_BUCKET_RATE * speedup,
+        capacity=notion_client.TOKEN_BUCKET_CAPACITY,
+    )
+    notion_client._global_call_budget = notion_client.SlidingWindowCallBudget(
+        limits=tuple((calls, window / speedup) for calls, window in notion_client.CALL_BUDGET_LIMITS)
+    )
+    notion_client._global_retry_policy = notion_client.RetryPolicy(
+        initial_delay=notion_client.INITIAL_RETRY_DELAY / speedup,
+        max_delay=notion_client.MAX_RETRY_DELAY / speedup,
+        deadline=notion_client.RETRY_CALL_DEADLINE / speedup,
+    )
+    notion_client._global_circuit_breaker = notion_client.CircuitBreaker(
+        open_duration=notion_client.CIRCUIT_OPEN_DURATION / speedup,
+    )
+
+
+def run_script(script, config_path, extra_args=()):
+    """Run a script's main() in this process, returning (elapsed seconds, exception or None)."""
+    argv = sys.argv
+    sys.argv = [SCRIPTS[script], "--config", config_path, *extra_args]
+    start = time.monotonic()
+    error = None
+    try:
+        runpy.run_path(SCRIPTS[script], run_name="__main__")
+    except Exception as e:
+        error = e
+    finally:
+        sys.argv = argv
+    return time.monotonic() - start, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a script against the in-process fake Notion backend")
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="weekly", help="Script to run (default: weekly)")
+    parser.add_argument("--templates", type=int, default=300, help="Template tasks to seed (default: 300)")
+    parser.add_argument("--active-pages", type=int, default=10000, help="Active tasks to seed (default: 10000)")
+    parser.add_argument("--latency", type=float, default=0.3, help="Notion response latency in seconds (default: 0.3)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 5xx")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--speedup", type=float, default=20.0, help="Time compression factor (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the workspace and injected failures")
+    parser.add_argument("--verbose", action="store_true", help="Show the script's own log output")
+    parser.add_argument("extra_args", nargs="*", help="Arguments passed through to the script (after --)")
+    args = parser.parse_args()
+
+    # The scripts log every task they touch; at this scale only warnings are useful
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    fake = FakeNotion(
+        latency=args.latency / args.speedup,
+        error_rate=args.error_rate,
+        rate_limit_probability=args.rate_limit_probability,
+        rate_limit_rps=3.0 * args.speedup,
+        rate_limit_burst=notion_client.TOKEN_BUCKET_CAPACITY,
+        retry_after=1.0 / args.speedup,
+        seed=args.seed,
+    )
+    start = time.monotonic()
+    template_db_id, active_db_id = seed_workspace(fake, args.templates, args.active_pages, seed=args.seed)
+    print(f"Seeded {args.templates} templates and {args.active_pages} active tasks in {time.monotonic() - start:.1f}s")
+    install_fake(fake, args.speedup)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+        yaml.safe_dump({"template_tasks_db_id": template_db_id, "active_tasks_db_id": active_db_id}, f)
+        config_path = f.name
+    os.environ.setdefault("NOTION_INTEGRATION_SECRET", "load-test")
+    try:
+        elapsed, error = run_script(args.script, config_path, args.extra_args)
+    finally:
+        os.unlink(config_path)
+        notion_client.set_shared_transport(None)
+
+    outcome = f"failed with {type(error).__name__}: {error}" if error else "finished"
+    # Time the fake spent filtering 10k pages isn't Notion latency, so don't scale it up
+    estimate = (elapsed - fake.processing_time) * args.speedup
+    print(f"{args.script} {outcome} in {elapsed:.1f}s wall time ({fake.processing_time:.1f}s in the fake), "
+          f"~{estimate / 60:.1f} min at Notion's real rate limit")
+    print("Requests served: " + ", ".join(f"{name} {count}" for name, count in sorted(fake.requests.items())))
+    print(notion_client.get_client_stats().summary())
+    if error:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
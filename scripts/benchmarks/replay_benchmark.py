@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Replay Benchmark for the Notion Scripts
+Runs the weekly rollover or daily review against a cassette recorded from
+real Notion traffic (see utils/notion_cassette.py), so changes to the scripts
+or the client can be timed without network access or Notion's rate limit.
+
+Record a cassette once from a real run:
+    NOTION_CASSETTE=rollover.jsonl.gz NOTION_CASSETTE_MODE=record \
+        python scripts/weekly_rollover/create_active_tasks_from_templates.py --config notion_config.yaml
+
+Then benchmark against it (pass the recorded run's --now so queries match exactly):
+    python scripts/benchmarks/replay_benchmark.py rollover.jsonl.gz --script weekly \
+        --config notion_config.yaml --latency -- --now 2025-01-04T09:00:00Z
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+SCRIPTS = {
+    "weekly": os.path.join(PROJECT_ROOT, "scripts", "weekly_rollover", "create_active_tasks_from_templates.py"),
+    "daily": os.path.join(PROJECT_ROOT, "scripts", "daily_planned_date_review.py"),
+}
+
+
+def run_replay(cassette, script, config, latency, extra_args):
+    """Run one replay of script in a subprocess, returning (elapsed seconds, CompletedProcess)."""
+    env = {
+        **os.environ,
+        "NOTION_CASSETTE": os.path.abspath(cassette),
+        "NOTION_CASSETTE_MODE": "replay",
+        "NOTION_CASSETTE_LATENCY": "1" if latency else "0",
+        # Nothing reaches Notion, so don't pace calls (which would time the limiter
+        # rather than the script) or draw from the host's shared rate limit ledger
+        "NOTION_RATE_LIMIT_MODE": "none",
+        # Replays never reach Notion, but the scripts require a token to start
+        "NOTION_INTEGRATION_SECRET": os.environ.get("NOTION_INTEGRATION_SECRET", "replay"),
+    }
+    start = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, SCRIPTS[script], "--config", config, *extra_args],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    return time.monotonic() - start, result
+
+
+def parse_args(argv=None):
+    """
+    Parse the benchmark's options; everything after ``--`` is passed through to the script.
+
+    The pass-through arguments are split off before argparse sees them, since
+    they usually look like options of their own (e.g. ``--now``).
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    extra_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, extra_args = argv[:split], argv[split + 1:]
+    parser = argparse.ArgumentParser(
+        description="Benchmark a script by replaying a recorded Notion cassette",
+        epilog="Arguments after -- are passed through to the script.",
+    )
+    parser.add_argument("cassette", help="Cassette recorded with NOTION_CASSETTE_MODE=record")
+    parser.add_argument("--script", choices=sorted(SCRIPTS), default="weekly", help="Script to run (default: weekly)")
+    parser.add_argument("--config", default="notion_config.yaml", help="Config file the cassette was recorded with")
+    parser.add_argument("--runs", type=int, default=3, help="Number of replays to time (default: 3)")
+    parser.add_argument("--latency", action="store_true", help="Replay the recorded response latencies")
+    args = parser.parse_args(argv)
+    args.extra_args = extra_args
+    return args
+
+
+def main():
+    args = parse_args()
+
+    timings = []
+    for run in range(args.runs):
+        elapsed, result = run_replay(args.cassette, args.script, args.config, args.latency, args.extra_args)
+        if result.returncode != 0:
+            print(result.stderr[-2000:])
+            print(f"Run {run + 1} failed with exit code {result.returncode}")
+            sys.exit(1)
+        timings.append(elapsed)
+        print(f"Run {run + 1}: {elapsed:.2f}s")
+
+    print(f"{args.script} replay over {args.runs} runs: "
+          f"mean {statistics.mean(timings):.2f}s, min {min(timings):.2f}s, max {max(timings):.2f}s")
+    # The scripts log their API stats summary last; show it from the final run
+    summary = [line for line in result.stderr.splitlines() if "Notion API stats" in line or line.startswith("  ")]
+    if summary:
+        print("\n".join(summary))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Connection Reuse Benchmark for the Notion API
+Replays the request pattern of a weekly rollover (phases of rate-spaced
+requests separated by idle gaps, repeated over scheduler runs) with:
+- per-run clients: a fresh httpx.Client per run with httpx's default pool,
+  which is what notion_client.Client builds for every script run
+- shared transport: the process-wide SharedHTTPTransport from utils/notion_client.py
+and reports the TLS handshakes and request latency of each.
+
+Needs network access to the target URL. Requests are unauthenticated GETs
+unless NOTION_INTEGRATION_SECRET is set; a 401 costs the same round trip.
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import httpx
+
+# Add parent directory to path to import utils
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from utils.notion_client import SharedHTTPTransport
+
+DEFAULT_URL = "https://api.notion.com/v1/users/me"
+
+
+def run_scenario(make_client, url, runs, phases, requests_per_phase, spacing, phase_gap):
+    """Replay the rollover pattern, returning (handshakes, request latencies)."""
+    handshakes = 0
+    latencies = []
+    # Plain-HTTP targets (e.g. a local test server) have no TLS, so count new connections
+    new_connection_event = "connection.start_tls.complete" if url.startswith("https://") else "connection.connect_tcp.complete"
+
+    def trace(event_name, info):
+        nonlocal handshakes
+        if event_name == new_connection_event:
+            handshakes += 1
+
+    headers = {"Notion-Version": "2022-06-28"}
+    token = os.environ.get("NOTION_INTEGRATION_SECRET")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    for run in range(runs):
+        client = make_client()
+        try:
+            for phase in range(phases):
+                if phase:
+                    time.sleep(phase_gap)
+                for _ in range(requests_per_phase):
+                    start = time.monotonic()
+                    client.get(url, headers=headers, extensions={"trace": trace})
+                    latencies.append(time.monotonic() - start)
+                    time.sleep(spacing)
+        finally:
+            client.close()
+    return handshakes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare TLS handshakes with per-run clients vs the shared pooled transport")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"URL to request (default: {DEFAULT_URL})")
+    parser.add_argument("--runs", type=int, default=2, help="Scheduler runs to simulate (default: 2)")
+    parser.add_argument("--phases", type=int, default=3, help="Phases per run, e.g. templates, schema sync, creation (default: 3)")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per phase (default: 10)")
+    parser.add_argument("--spacing", type=float, default=0.35, help="Seconds between requests (default: 0.35)")
+    parser.add_argument("--phase-gap", type=float, default=6.0, help="Idle seconds between phases (default: 6.0)")
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2 on the shared transport (needs the h2 package)")
+    args = parser.parse_args()
+
+    shared = SharedHTTPTransport(http2=args.http2)
+    scenarios = [
+        ("per-run clients", lambda: httpx.Client()),
+        ("shared transport", lambda: httpx.Client(transport=shared)),
+    ]
+
+    total_requests = args.runs * args.phases * args.requests
+    print(f"{total_requests} requests to {args.url} per scenario "
+          f"({args.runs} runs x {args.phases} phases x {args.requests} requests, {args.phase_gap}s between phases)")
+    for name, make_client in scenarios:
+        handshakes, latencies = run_scenario(
+            make_client, args.url, args.runs, args.phases, args.requests, args.spacing, args.phase_gap
+        )
+        print(f"{name}: {handshakes} handshakes, "
+              f"mean {statistics.mean(latencies) * 1000:.0f}ms, "
+              f"median {statistics.median(latencies) * 1000:.0f}ms, "
+              f"max {max(latencies) * 1000:.0f}ms per request")
+    shared.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,19 @@ import sys
 import yaml
 import logging
 import argparse
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta, date
 import pytz
 
 # Add parent directory to path to import utils
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from utils.notion_client import create_rate_limited_client
+from utils.notion_client import (
+    create_rate_limited_client,
+    CircuitOpenError,
+    DeadlineExceeded,
+    paginate,
+    run_deadline,
+)
 
 # Setup logging
 logging.basicConfig(
@@ -27,9 +34,16 @@ logger = logging.getLogger(__name__)
 
 # Global variables to be initialized in main()
 notion = None
+# Write-behind buffer for page updates during a run (see get_page_updater)
+page_updates = None
+# Labels of the updates queued in page_updates for each page, counted once the page is written
+queued_updates = defaultdict(list)
 ACTIVE_DB_ID = None
 TEMPLATE_ID_PROPERTY = "TemplateId"
 
+# Work done so far in this run, reported if the run deadline or an outage cuts it short
+progress = Counter()
+
 def get_active_schema():
     """Retrieve the schema for the active tasks database"""
     logger.info(f"Retrieving active schema from Notion DB {ACTIVE_DB_ID}")
@@ -82,19 +96,7 @@ def get_active_tasks_without_planned_date():
     
     filter_ = {"and": filter_conditions}
     
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            database_id=ACTIVE_DB_ID,
-            filter=filter_,
-            start_cursor=next_cursor if next_cursor else None
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
+    results = list(paginate(notion.databases.query, prefetch=True, database_id=ACTIVE_DB_ID, filter=filter_))
     
     logger.info(f"Found {len(results)} active tasks without planned dates")
     return results
@@ -145,19 +147,7 @@ def get_active_tasks_without_category():
     
     filter_ = {"and": filter_conditions}
     
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            database_id=ACTIVE_DB_ID,
-            filter=filter_,
-            start_cursor=next_cursor if next_cursor else None
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
+    results = list(paginate(notion.databases.query, prefetch=True, database_id=ACTIVE_DB_ID, filter=filter_))
     
     logger.info(f"Found {len(results)} active tasks without categories")
     return results
@@ -211,19 +201,7 @@ def get_old_incomplete_tasks():
     
     filter_ = {"and": filter_conditions}
     
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            database_id=ACTIVE_DB_ID,
-            filter=filter_,
-            start_cursor=next_cursor if next_cursor else None
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
+    results = list(paginate(notion.databases.query, prefetch=True, database_id=ACTIVE_DB_ID, filter=filter_))
     
     logger.info(f"Found {len(results)} old incomplete tasks")
     return results
@@ -247,12 +225,18 @@ def update_task_planned_date(task_id, planned_date):
     """Update the planned date for a specific task"""
     logger.info(f"Updating planned date for task {task_id} to {planned_date}")
     try:
-        notion.pages.update(
+        updater = get_page_updater()
+        updater.update(
             page_id=task_id,
             properties={"Planned Date": {"date": {"start": planned_date.isoformat()}}}
         )
-        logger.info(f"Successfully updated planned date for task {task_id}")
+        if updater is page_updates:
+            logger.info(f"Queued planned date update for task {task_id}")
+        else:
+            logger.info(f"Successfully updated planned date for task {task_id}")
         return True
+    except (DeadlineExceeded, CircuitOpenError):
+        raise
     except Exception as e:
         logger.error(f"Failed to update planned date for task {task_id}: {e}")
         return False
@@ -261,19 +245,65 @@ def update_task_category(task_id, category):
     """Update the category for a specific task"""
     logger.info(f"Updating category for task {task_id} to {category}")
     try:
-        notion.pages.update(
+        updater = get_page_updater()
+        updater.update(
             page_id=task_id,
             properties={"Category": {"select": {"name": category}}}
         )
-        logger.info(f"Successfully updated category for task {task_id}")
+        if updater is page_updates:
+            logger.info(f"Queued category update for task {task_id}")
+        else:
+            logger.info(f"Successfully updated category for task {task_id}")
         return True
+    except (DeadlineExceeded, CircuitOpenError):
+        raise
     except Exception as e:
         logger.error(f"Failed to update category for task {task_id}: {e}")
         return False
 
+def get_page_updater():
+    """Where page updates go: the run's write-behind buffer if there is one, else straight to Notion"""
+    return page_updates if page_updates is not None else notion.pages
+
+def get_task_name(task):
+    """Get the display name of a task page"""
+    title_prop = task.get("properties", {}).get("Task", {}).get("title", [])
+    if title_prop and len(title_prop) > 0:
+        return title_prop[0].get("plain_text", "Unknown Task")
+    return "Unknown Task"
+
+def update_tasks(tasks, update_func, value, label="task"):
+    """Apply update_func(task_id, value) to every task.
+
+    With the run's write-behind buffer the updates are only queued here (the
+    buffer's flush sends them concurrently) and are counted in progress once
+    their page is written (see record_flush). Without it each update is
+    written straight away and counted as it succeeds.
+    Returns the number of updates queued or written.
+    """
+    count = 0
+    for task in tasks:
+        logger.info(f"Processing {label}: {get_task_name(task)} (ID: {task['id']})")
+        if update_func(task["id"], value):
+            count += 1
+            if page_updates is not None:
+                queued_updates[task["id"]].append(label)
+            else:
+                progress[f"{label}s updated"] += 1
+    return count
+
+def record_flush(result):
+    """Count the queued updates of every page a flush wrote, and drop those of pages it failed to write"""
+    for page_id in result["updated"]:
+        for label in queued_updates.pop(page_id, []):
+            progress[f"{label}s updated"] += 1
+    for page_id in result["failed"]:
+        for label in queued_updates.pop(page_id, []):
+            progress[f"{label} updates failed"] += 1
+
 def main():
     """Main function to review and update planned dates, categories, and old tasks"""
-    global notion, ACTIVE_DB_ID
+    global notion, ACTIVE_DB_ID, page_updates
 
     # Parse command line arguments
     parser = argparse.ArgumentParser(description="Daily Planned Date Review for Notion Home Task Manager")
@@ -283,6 +313,11 @@ def main():
         default="notion_config.yaml",
         help="Path to the configuration YAML file (default: notion_config.yaml)"
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Give up (and report partial progress) if the review would take longer than this many seconds"
+    )
     args = parser.parse_args()
 
     # Load config
@@ -309,95 +344,80 @@ def main():
 
     # Initialize Notion client
     notion = create_rate_limited_client(auth=NOTION_TOKEN)
+    # The phases' queries don't depend on each other's writes, so updates are
+    # held back and a task missing both a planned date and a category gets one
+    # merged PATCH instead of two
+    queued_updates.clear()
+    page_updates = notion.page_update_buffer(on_flush=record_flush)
 
     logger.info("Starting daily planned date review...")
 
+    progress.clear()
     try:
-        total_updated = 0
+        with run_deadline(args.deadline):
+            # 1. Handle tasks without planned dates
+            logger.info("=== Processing tasks without planned dates ===")
+            tasks_without_planned_date = get_active_tasks_without_planned_date()
         
-        # 1. Handle tasks without planned dates
-        logger.info("=== Processing tasks without planned dates ===")
-        tasks_without_planned_date = get_active_tasks_without_planned_date()
-        
-        if tasks_without_planned_date:
-            # Get the Thursday of next week
-            next_thursday = get_thursday_of_next_week()
+            if tasks_without_planned_date:
+                # Get the Thursday of next week
+                next_thursday = get_thursday_of_next_week()
             
-            # Update each task
-            updated_count = 0
-            for task in tasks_without_planned_date:
-                task_id = task["id"]
-                task_name = "Unknown Task"
-                title_prop = task.get("properties", {}).get("Task", {}).get("title", [])
-                if title_prop and len(title_prop) > 0:
-                    task_name = title_prop[0].get("plain_text", "Unknown Task")
-                
-                logger.info(f"Processing task: {task_name} (ID: {task_id})")
-                
-                if update_task_planned_date(task_id, next_thursday):
-                    updated_count += 1
+                # Update each task
+                queued_count = update_tasks(tasks_without_planned_date, update_task_planned_date, next_thursday)
             
-            logger.info(f"Updated {updated_count} out of {len(tasks_without_planned_date)} tasks without planned dates.")
-            total_updated += updated_count
-        else:
-            logger.info("No active tasks found without planned dates")
+                logger.info(f"Queued updates for {queued_count} out of {len(tasks_without_planned_date)} tasks without planned dates.")
+            else:
+                logger.info("No active tasks found without planned dates")
         
-        # 2. Handle tasks without categories
-        logger.info("=== Processing tasks without categories ===")
-        tasks_without_category = get_active_tasks_without_category()
+            # 2. Handle tasks without categories
+            logger.info("=== Processing tasks without categories ===")
+            tasks_without_category = get_active_tasks_without_category()
         
-        if tasks_without_category:
-            # Update each task to Random/Monday category
-            updated_count = 0
-            for task in tasks_without_category:
-                task_id = task["id"]
-                task_name = "Unknown Task"
-                title_prop = task.get("properties", {}).get("Task", {}).get("title", [])
-                if title_prop and len(title_prop) > 0:
-                    task_name = title_prop[0].get("plain_text", "Unknown Task")
-                
-                logger.info(f"Processing task: {task_name} (ID: {task_id})")
-                
-                if update_task_category(task_id, "Random/Monday"):
-                    updated_count += 1
+            if tasks_without_category:
+                # Update each task to Random/Monday category
+                queued_count = update_tasks(tasks_without_category, update_task_category, "Random/Monday")
             
-            logger.info(f"Updated {updated_count} out of {len(tasks_without_category)} tasks without categories.")
-            total_updated += updated_count
-        else:
-            logger.info("No active tasks found without categories")
+                logger.info(f"Queued updates for {queued_count} out of {len(tasks_without_category)} tasks without categories.")
+            else:
+                logger.info("No active tasks found without categories")
         
-        # 3. Handle old incomplete tasks (planned date in the past)
-        logger.info("=== Processing old incomplete tasks ===")
-        old_incomplete_tasks = get_old_incomplete_tasks()
+            # 3. Handle old incomplete tasks (planned date in the past)
+            logger.info("=== Processing old incomplete tasks ===")
+            old_incomplete_tasks = get_old_incomplete_tasks()
         
-        if old_incomplete_tasks:
-            # Get the Thursday of next week
-            next_thursday = get_thursday_of_next_week()
+            if old_incomplete_tasks:
+                # Get the Thursday of next week
+                next_thursday = get_thursday_of_next_week()
             
-            # Update each task
-            updated_count = 0
-            for task in old_incomplete_tasks:
-                task_id = task["id"]
-                task_name = "Unknown Task"
-                title_prop = task.get("properties", {}).get("Task", {}).get("title", [])
-                if title_prop and len(title_prop) > 0:
-                    task_name = title_prop[0].get("plain_text", "Unknown Task")
-                
-                logger.info(f"Processing old task: {task_name} (ID: {task_id})")
-                
-                if update_task_planned_date(task_id, next_thursday):
-                    updated_count += 1
+                # Update each task
+                queued_count = update_tasks(old_incomplete_tasks, update_task_planned_date, next_thursday, label="old task")
             
-            logger.info(f"Updated {updated_count} out of {len(old_incomplete_tasks)} old incomplete tasks.")
-            total_updated += updated_count
-        else:
-            logger.info("No old incomplete tasks found")
+                logger.info(f"Queued updates for {queued_count} out of {len(old_incomplete_tasks)} old incomplete tasks.")
+            else:
+                logger.info("No old incomplete tasks found")
         
-        logger.info(f"Daily planned date review completed. Total tasks updated: {total_updated}")
+            page_updates.flush()
+            # Counted from what the flushes wrote, not what was queued
+            total_updated = sum(count for label, count in progress.items() if label.endswith(" updated"))
+            logger.info(
+                f"Daily planned date review completed. Total tasks updated: {total_updated} "
+                f"({page_updates.merged} merged into another update of the same page, "
+                f"{len(page_updates.failures)} page updates failed)"
+            )
         
+    except (DeadlineExceeded, CircuitOpenError) as e:
+        done = ", ".join(f"{count} {label}" for label, count in progress.items()) or "nothing"
+        logger.error(
+            f"Daily planned date review stopped early: {e}. Completed before stopping: {done}. "
+            f"{page_updates.pending} queued page updates were not written."
+        )
+        raise
     except Exception as e:
         logger.error(f"Error during daily planned date review: {e}")
         raise
+    finally:
+        logger.info(notion.stats.summary())
 
 if __name__ == "__main__":
     main()
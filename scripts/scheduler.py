@@ -6,6 +6,7 @@ Runs the task generation script weekly on Saturdays
 
 import os
 import sys
+import math
 import time
 import logging
 import schedule
@@ -17,6 +18,15 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.weekly_rollover.create_active_tasks_from_templates import main as run_task_generation
 from scripts.daily_planned_date_review import main as daily_planned_date_review_main
+from utils.notion_client import CIRCUIT_OPEN, CircuitOpenError, get_circuit_breaker, run_deadline
+
+# Longest each job may run before giving up, so a run stuck in rate-limit or
+# retry backoff fails instead of overlapping the next scheduled job
+WEEKLY_RUN_DEADLINE = 2 * 60 * 60  # seconds
+DAILY_RUN_DEADLINE = 60 * 60  # seconds
+
+# Shortest delay before retrying a job postponed because Notion is down
+MIN_POSTPONE_DELAY = 60  # seconds
 
 # Configure logging
 logging.basicConfig(
@@ -29,22 +39,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def run_once(job):
+    """Run a postponed job, then remove it from the schedule"""
+    job()
+    return schedule.CancelJob
+
+def postpone(job, job_name, delay):
+    """Schedule a one-off re-run of job after delay seconds"""
+    delay = max(MIN_POSTPONE_DELAY, math.ceil(delay))
+    logger.warning(f"Notion is unavailable; postponing {job_name} by {delay}s")
+    schedule.every(delay).seconds.do(run_once, job)
+
+def postpone_if_notion_down(job, job_name):
+    """Postpone job if the Notion circuit breaker is open; returns True if it was postponed"""
+    status = get_circuit_breaker().status()
+    if status["state"] != CIRCUIT_OPEN:
+        return False
+    postpone(job, job_name, status["retry_in"])
+    return True
+
 def run_weekly_tasks():
     """Run the weekly task generation"""
+    if postpone_if_notion_down(run_weekly_tasks, "weekly task generation"):
+        return
     try:
         logger.info("Starting weekly task generation...")
-        run_task_generation()
+        with run_deadline(WEEKLY_RUN_DEADLINE):
+            run_task_generation()
         logger.info("Weekly task generation completed successfully")
+    except CircuitOpenError as e:
+        logger.error(f"Weekly task generation stopped: {e}")
+        postpone(run_weekly_tasks, "weekly task generation", e.retry_in)
     except Exception as e:
         logger.error(f"Error during weekly task generation: {e}")
         # Don't raise the exception to keep the scheduler running
 
 def run_daily_planned_date_review():
     """Run the daily planned date review"""
+    if postpone_if_notion_down(run_daily_planned_date_review, "daily planned date review"):
+        return
     try:
         logger.info("Starting daily planned date review...")
-        daily_planned_date_review_main()
+        with run_deadline(DAILY_RUN_DEADLINE):
+            daily_planned_date_review_main()
         logger.info("Daily planned date review completed successfully")
+    except CircuitOpenError as e:
+        logger.error(f"Daily planned date review stopped: {e}")
+        postpone(run_daily_planned_date_review, "daily planned date review", e.retry_in)
     except Exception as e:
         logger.error(f"Error during daily planned date review: {e}")
         # Don't raise the exception to keep the scheduler running
@@ -4,7 +4,7 @@ import yaml
 
 # Add parent directory to path to import utils
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from utils.notion_client import create_rate_limited_client
+from utils.notion_client import create_rate_limited_client, paginate
 
 # Load config from YAML
 with open("notion_config.yaml", "r") as f:
@@ -73,18 +73,9 @@ def add_missing_select_options(database_id, schema, current_schema):
 def get_existing_task_ids(database_id):
     ids = set()
     id_to_page = {}
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            **{"database_id": database_id, "start_cursor": next_cursor} if next_cursor else {"database_id": database_id}
-        )
-        for page in response["results"]:
-            ids.add(page["id"])
-            id_to_page[page["id"]] = page
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
+    for page in paginate(notion.databases.query, prefetch=True, database_id=database_id):
+        ids.add(page["id"])
+        id_to_page[page["id"]] = page
     return ids, id_to_page
 
 def build_properties_dict(task, schema):
@@ -130,6 +121,7 @@ def main():
             create_task(DATABASE_ID, task, schema)
         else:
             update_task(task["id"], task, schema)
+    print(notion.stats.summary())
     print("Done.")
 
 if __name__ == "__main__":
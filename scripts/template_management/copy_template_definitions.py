@@ -4,7 +4,7 @@ import yaml
 
 # Add parent directory to path to import utils
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from utils.notion_client import create_rate_limited_client
+from utils.notion_client import create_rate_limited_client, paginate
 
 # Load config from YAML
 with open("notion_config.yaml", "r") as f:
@@ -36,20 +36,9 @@ def get_schema(database_id):
     return schema
 
 def get_template_tasks(database_id):
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            **{"database_id": database_id, "start_cursor": next_cursor} if next_cursor else {"database_id": database_id}
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
     # Only keep property values for each task
     tasks = []
-    for page in results:
+    for page in paginate(notion.databases.query, prefetch=True, database_id=database_id):
         task = {"id": page["id"], "properties": {}}
         for k, v in page["properties"].items():
             # Only keep the value, not the Notion property metadata
@@ -76,6 +65,7 @@ def main():
     with open("template_tasks.yaml", "w", encoding="utf-8") as f:
         yaml.safe_dump(backup, f, allow_unicode=True, sort_keys=False)
     print("Backup saved to template_tasks.yaml")
+    print(notion.stats.summary())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
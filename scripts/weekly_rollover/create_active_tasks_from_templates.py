@@ -1,8 +1,10 @@
 import os
 import sys
+import json
 import yaml
 import logging
 import argparse
+from collections import Counter, defaultdict
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from dateutil.parser import isoparse
@@ -11,7 +13,15 @@ import pytz
 
 # Add parent directory to path to import utils
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from utils.notion_client import create_rate_limited_client
+from utils.notion_client import (
+    create_rate_limited_client,
+    CircuitOpenError,
+    ConcurrentRequestExecutor,
+    DeadlineExceeded,
+    open_page_cache,
+    paginate,
+    run_deadline,
+)
 
 # Setup logging
 logging.basicConfig(
@@ -28,31 +38,43 @@ TEMPLATE_DB_ID = None
 ACTIVE_DB_ID = None
 COMPLETED_DB_ID = None
 notion = None
+# Write-behind buffer for page updates during a run (see get_page_updater)
+page_updates = None
+# On-disk page cache, if one is configured (see query_database)
+page_cache = None
+# Latest completions saved by the previous run, if a checkpoint file is configured
+# (see sync_latest_completions)
+completion_checkpoint = None
+# Active Tasks from one scan of the Active Tasks DB (see ActiveTaskIndex); the
+# lookups below query Notion directly when this isn't set
+active_index = None
 
 TEMPLATE_ID_PROPERTY = "TemplateId"
+# Template IDs per OR filter when Active Tasks are looked up in batches; Notion
+# allows 100 conditions in a compound filter, so this stays well inside it
+TEMPLATE_ID_FILTER_CHUNK = 50
+# How far before the previous run's start to look for edited tasks; last_edited_time
+# only has minute precision, and re-reading a task is harmless
+CHECKPOINT_OVERLAP = timedelta(minutes=2)
+
+# Work done so far in this run, reported if the run deadline or an outage cuts it short
+progress = Counter()
 
 def get_template_schema():
     logger.info(f"Retrieving template schema from Notion DB {TEMPLATE_DB_ID}")
     db = notion.databases.retrieve(database_id=TEMPLATE_DB_ID)
     return db["properties"]
 
+def query_database(database_id, **kwargs):
+    """All pages matching a query, served from the page cache where unchanged if one is configured"""
+    if page_cache is not None:
+        return page_cache.query(notion, database_id, **kwargs)
+    return paginate(notion.databases.query, prefetch=True, database_id=database_id, **kwargs)
+
 def get_template_tasks():
     logger.info(f"Querying all template tasks from Notion DB {TEMPLATE_DB_ID}")
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            database_id=TEMPLATE_DB_ID,
-            start_cursor=next_cursor if next_cursor else None
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
-    logger.info(f"Fetched {len(results)} template tasks.")
     tasks = []
-    for page in results:
+    for page in query_database(TEMPLATE_DB_ID):
         task = {"id": page["id"], "properties": {}}
         for k, v in page["properties"].items():
             if v["type"] == "select":
@@ -68,6 +90,7 @@ def get_template_tasks():
             else:
                 task["properties"][k] = v.get(v["type"])
         tasks.append(task)
+    logger.info(f"Fetched {len(tasks)} template tasks.")
     return tasks
 
 def get_active_schema():
@@ -142,25 +165,138 @@ def build_active_task_properties(template_task, template_schema, active_schema,
         properties["CreationDate"] = {"date": {"start": current_iso}}
     return properties
 
+class ActiveTaskIndex:
+    """
+    Active Tasks created from templates, from one scan of the Active Tasks DB
+    (or a few batched queries for the run's templates).
+
+    Answers the per-template and per-(template, category, planned date)
+    lookups the rollover makes for every template, which would otherwise be
+    one paginated query each.
+    """
+
+    def __init__(self, pages):
+        self._by_template = defaultdict(list)
+        self._by_slot = defaultdict(list)
+        self.size = 0
+        for page in pages:
+            props = page.get("properties", {})
+            template_id = get_template_id(page)
+            if not template_id:
+                continue
+            category = ((props.get("Category") or {}).get("select") or {}).get("name")
+            planned = ((props.get("Planned Date") or {}).get("date") or {}).get("start")
+            self._by_template[template_id].append(page)
+            self._by_slot[(template_id, category, planned[:10] if planned else None)].append(page)
+            self.size += 1
+
+    def for_template(self, template_id):
+        return list(self._by_template.get(template_id, []))
+
+    def for_template_and_category(self, template_id, category):
+        return [page for page in self._by_template.get(template_id, []) if self._category(page) == category]
+
+    def for_date(self, template_id, category, planned_date):
+        return list(self._by_slot.get((template_id, category, planned_date.isoformat()), []))
+
+    @staticmethod
+    def _category(page):
+        return ((page["properties"].get("Category") or {}).get("select") or {}).get("name")
+
+def get_template_id(page):
+    props = page.get("properties", {})
+    return "".join(part.get("plain_text", "") for part in (props.get(TEMPLATE_ID_PROPERTY) or {}).get("rich_text") or [])
+
+def _template_id_chunks(template_ids):
+    """Distinct template IDs in chunks of TEMPLATE_ID_FILTER_CHUNK, each with an OR filter matching their Active Tasks"""
+    template_ids = list(dict.fromkeys(template_ids))
+    for i in range(0, len(template_ids), TEMPLATE_ID_FILTER_CHUNK):
+        chunk = template_ids[i:i + TEMPLATE_ID_FILTER_CHUNK]
+        yield chunk, {"or": [{"property": TEMPLATE_ID_PROPERTY, "rich_text": {"equals": template_id}} for template_id in chunk]}
+
+def build_active_task_index(template_ids=None, open_status_filter=None):
+    """
+    Index the Active Tasks created from templates.
+
+    By default this scans every Active Task with a TemplateId. Given
+    template_ids, it instead asks for just those templates' tasks, with one
+    query per TEMPLATE_ID_FILTER_CHUNK templates OR-ing their TemplateIds,
+    for when the full scan would fetch far more than the run needs.
+    open_status_filter (see get_open_status_filter) narrows either to tasks
+    that aren't complete.
+    """
+    if template_ids is None:
+        logger.info(f"Scanning Active Tasks created from templates in Notion DB {ACTIVE_DB_ID}")
+        filter_ = {"property": TEMPLATE_ID_PROPERTY, "rich_text": {"is_not_empty": True}}
+        if open_status_filter:
+            filter_ = {"and": [filter_] + open_status_filter}
+        index = ActiveTaskIndex(query_database(ACTIVE_DB_ID, filter=filter_))
+    else:
+        logger.info(f"Querying Active Tasks for {len(set(template_ids))} templates in batches from Notion DB {ACTIVE_DB_ID}")
+        pages = []
+        for _, filter_ in _template_id_chunks(template_ids):
+            if open_status_filter:
+                filter_ = {"and": [filter_] + open_status_filter}
+            pages.extend(query_database(ACTIVE_DB_ID, filter=filter_))
+        index = ActiveTaskIndex(pages)
+    logger.info(f"Indexed {index.size} Active Tasks")
+    return index
+
+def get_open_status_filter(active_schema):
+    """Filter conditions excluding every status in the 'Complete' group, or [] if there is no such group"""
+    status_schema = (active_schema.get("Status") or {}).get("status") or {}
+    complete_ids = next((set(group.get("option_ids", [])) for group in status_schema.get("groups", []) if group.get("name") == "Complete"), set())
+    return [
+        {"property": "Status", "status": {"does_not_equal": option["name"]}}
+        for option in status_schema.get("options", []) if option.get("id") in complete_ids
+    ]
+
+def get_latest_completions(template_ids):
+    """
+    Most recent Completed Date of a Done Active Task, per template ID.
+
+    Notion does the filtering and ordering: each chunk of templates is one
+    query for Done tasks with a Completed Date, newest first, and paging
+    stops as soon as every template in the chunk has been seen. Templates
+    with no Done task are left out.
+    """
+    latest = {}
+    for chunk, template_filter in _template_id_chunks(template_ids):
+        filter_ = {
+            "and": [
+                template_filter,
+                {"property": "Status", "status": {"equals": "Done"}},
+                {"property": "Completed Date", "date": {"is_not_empty": True}},
+            ]
+        }
+        remaining = set(chunk)
+        pages = paginate(
+            notion.databases.query,
+            database_id=ACTIVE_DB_ID,
+            filter=filter_,
+            sorts=[{"property": "Completed Date", "direction": "descending"}],
+        )
+        for page in pages:
+            template_id = get_template_id(page)
+            if template_id in remaining:
+                latest[template_id] = extract_completed_date(page)
+                remaining.discard(template_id)
+                if not remaining:
+                    break
+    logger.info(f"Found completions for {len(latest)} of {len(set(template_ids))} templates")
+    return latest
+
 def get_active_tasks_for_template(template_id):
     # Retrieve all Active Tasks for the given TemplateId
+    if active_index is not None:
+        results = active_index.for_template(template_id)
+        logger.info(f"Found {len(results)} active tasks for template id {template_id}")
+        return results
     filter_ = {
         "property": TEMPLATE_ID_PROPERTY,
         "rich_text": {"equals": template_id}
     }
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            database_id=ACTIVE_DB_ID,
-            filter=filter_,
-            start_cursor=next_cursor if next_cursor else None
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
+    results = list(paginate(notion.databases.query, database_id=ACTIVE_DB_ID, filter=filter_))
     logger.info(f"Found {len(results)} active tasks for template id {template_id}")
     return results
 
@@ -216,9 +352,150 @@ def create_active_task(template_task, properties):
     new_page = notion.pages.create(parent={"database_id": ACTIVE_DB_ID}, properties=properties)
     return new_page
 
+def create_active_tasks(pending_creations):
+    """Create Active Tasks concurrently so request latency overlaps with rate limiting.
+
+    Args:
+        pending_creations: list of (template_task, properties, category, planned_date)
+    """
+    if not pending_creations:
+        return
+    logger.info(f"Creating {len(pending_creations)} Active Tasks...")
+    with ConcurrentRequestExecutor() as executor:
+        futures = [
+            (executor.submit(create_active_task, template_task, properties), template_task, category, planned_date)
+            for template_task, properties, category, planned_date in pending_creations
+        ]
+        for future, template_task, category, planned_date in futures:
+            future.result()
+            progress["Active Tasks created"] += 1
+            task_name = template_task["properties"].get("Task", "Unknown Task")
+            logger.info(f"Created Active Task '{task_name}' for template id {template_task['id']} with Category {category} and Planned Date {planned_date}")
+
+def get_page_updater():
+    """Where page updates go: the run's write-behind buffer if there is one, else straight to Notion"""
+    return page_updates if page_updates is not None else notion.pages
+
+def parse_completion_time(value):
+    """A Notion date or datetime string as an aware UTC datetime (dates are midnight UTC)"""
+    dt = isoparse(value)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=pytz.UTC)
+    return dt.astimezone(pytz.UTC)
+
+class CompletionCheckpoint:
+    """
+    Each template's latest completion as of the previous run, in a JSON file.
+
+    ``since`` is when that run started; ``completions`` maps every template
+    it covered to its latest Completed Date, or None if it had none.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.since = None
+        self.completions = {}
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            since = isoparse(data["since"])
+            completions = data["completions"]
+            if isinstance(completions, dict):
+                self.since, self.completions = since, completions
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save(self, since, completions):
+        self.since, self.completions = since, dict(completions)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"since": since.isoformat(), "completions": self.completions}, f)
+        os.replace(tmp_path, self.path)
+
+def open_completion_checkpoint(path=None):
+    path = path or os.environ.get("NOTION_COMPLETION_CHECKPOINT_FILE")
+    return CompletionCheckpoint(path) if path else None
+
+def sync_latest_completions(template_ids, checkpoint, run_started):
+    """
+    Latest completion per template, updated from the checkpoint instead of all history.
+
+    Only Done tasks edited since the checkpoint (less CHECKPOINT_OVERLAP) are
+    read and merged into the saved maxima, so the cost follows a week's
+    activity. Templates the checkpoint doesn't cover yet fall back to
+    get_latest_completions. The merged result is saved with run_started as
+    the new checkpoint.
+    """
+    template_ids = list(dict.fromkeys(template_ids))
+    if checkpoint.since is None:
+        latest = get_latest_completions(template_ids)
+    else:
+        latest = {template_id: checkpoint.completions[template_id] for template_id in template_ids if template_id in checkpoint.completions}
+        uncovered = [template_id for template_id in template_ids if template_id not in checkpoint.completions]
+        since = (checkpoint.since - CHECKPOINT_OVERLAP).astimezone(pytz.UTC)
+        logger.info(f"Reading Done Active Tasks edited since {since.isoformat()}")
+        filter_ = {
+            "and": [
+                {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since.isoformat()}},
+                {"property": TEMPLATE_ID_PROPERTY, "rich_text": {"is_not_empty": True}},
+                {"property": "Status", "status": {"equals": "Done"}},
+                {"property": "Completed Date", "date": {"is_not_empty": True}},
+            ]
+        }
+        edited = 0
+        for page in paginate(notion.databases.query, prefetch=True, database_id=ACTIVE_DB_ID, filter=filter_):
+            edited += 1
+            template_id = get_template_id(page)
+            completed_date = extract_completed_date(page)
+            if template_id not in latest or not completed_date:
+                continue
+            if latest[template_id] is None or parse_completion_time(completed_date) > parse_completion_time(latest[template_id]):
+                latest[template_id] = completed_date
+        logger.info(f"Merged {edited} recently edited Done tasks into the completion checkpoint")
+        if uncovered:
+            latest.update(get_latest_completions(uncovered))
+    latest = {template_id: latest.get(template_id) for template_id in template_ids}
+    try:
+        checkpoint.save(run_started, latest)
+    except OSError as e:
+        logger.warning(f"Could not save completion checkpoint to {checkpoint.path}: {e}")
+    return {template_id: completed for template_id, completed in latest.items() if completed}
+
+def get_most_recent_completion(template_id, active_schema):
+    """Latest Completed Date among the template's Done Active Tasks, or None"""
+    most_recent = None
+    for page in get_active_tasks_for_template(template_id):
+        # Only update Last Completed when task is specifically "Done"
+        # Not when marked "Not Needed" or "Duplicate?" (also in Complete group)
+        if is_status_done(page, active_schema):
+            completed_date = extract_completed_date(page)
+            logger.debug(f"Task {page.get('id')} completed_date: {completed_date}")
+            if completed_date and (most_recent is None or completed_date > most_recent):
+                most_recent = completed_date
+    return most_recent
+
+def last_completed_unchanged(template_task, most_recent):
+    """
+    Whether the template's fetched Last Completed is already most_recent.
+
+    Compared as UTC instants, so "2025-08-21" and "2025-08-21T00:00:00.000Z"
+    count as the same completion.
+    """
+    last_completed = template_task["properties"].get("Last Completed")
+    current = last_completed.get("start") if isinstance(last_completed, dict) else None
+    if not current:
+        return False
+    try:
+        return parse_completion_time(current) == parse_completion_time(most_recent)
+    except ValueError:
+        return False
+
 def update_template_last_completed(template_task_id, last_completed_date):
     logger.info(f"Updating Last Completed for template {template_task_id} to {last_completed_date}")
-    notion.pages.update(
+    get_page_updater().update(
         page_id=template_task_id,
         properties={"Last Completed": {"date": {"start": last_completed_date}}}
     )
@@ -273,27 +550,22 @@ def is_task_due(template_task, now=None):
 
 def get_uncompleted_active_tasks_for_template_and_category(template_id, category, active_schema):
     # Retrieve all Active Tasks for the given TemplateId and Category that are not in the 'Complete' group
+    if active_index is not None:
+        return [
+            page for page in active_index.for_template_and_category(template_id, category)
+            if not is_status_complete(page, active_schema)
+        ]
     filter_ = {
         "and": [
             {"property": TEMPLATE_ID_PROPERTY, "rich_text": {"equals": template_id}},
             {"property": "Category", "select": {"equals": category}}
         ]
     }
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            database_id=ACTIVE_DB_ID,
-            filter=filter_,
-            start_cursor=next_cursor if next_cursor else None
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
     # Only return those NOT in the Complete group
-    uncompleted = [page for page in results if not is_status_complete(page, active_schema)]
+    uncompleted = [
+        page for page in paginate(notion.databases.query, database_id=ACTIVE_DB_ID, filter=filter_)
+        if not is_status_complete(page, active_schema)
+    ]
     return uncompleted
 
 def get_next_week_dates(today=None):
@@ -339,6 +611,32 @@ def _parse_args():
             "Override current time (ISO-8601). Examples: 2025-01-02, 2025-01-02T14:30:00Z, 2025-01-02T14:30:00+00:00"
         ),
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Give up (and report partial progress) if the run would take longer than this many seconds.",
+    )
+    parser.add_argument(
+        "--page-cache",
+        help="JSON file to cache template and Active Task pages in between runs (default: $NOTION_PAGE_CACHE_FILE; off if unset).",
+    )
+    parser.add_argument(
+        "--completion-checkpoint",
+        help=(
+            "JSON file to keep each template's latest completion in, so later runs only read tasks edited since "
+            "(default: $NOTION_COMPLETION_CHECKPOINT_FILE; off if unset)."
+        ),
+    )
+    parser.add_argument(
+        "--active-lookup",
+        choices=("scan", "batched"),
+        default=os.environ.get("NOTION_ACTIVE_LOOKUP", "scan"),
+        help=(
+            "How to find existing Active Tasks: 'scan' reads every task with a TemplateId, 'batched' queries "
+            f"{TEMPLATE_ID_FILTER_CHUNK} templates at a time for open tasks and latest completions "
+            "(default: $NOTION_ACTIVE_LOOKUP or scan)."
+        ),
+    )
     return parser.parse_args()
 
 def _initialise_from_config(config_path):
@@ -380,6 +678,11 @@ def _parse_now(now_str):
 
 def uncompleted_task_exists_for_date(template_id, category, planned_date, active_schema):
     # Check for an uncompleted Active Task for this template, category, and planned date
+    if active_index is not None:
+        return any(
+            not is_status_complete(page, active_schema)
+            for page in active_index.for_date(template_id, category, planned_date)
+        )
     filter_ = {
         "and": [
             {"property": TEMPLATE_ID_PROPERTY, "rich_text": {"equals": template_id}},
@@ -387,22 +690,11 @@ def uncompleted_task_exists_for_date(template_id, category, planned_date, active
             {"property": "Planned Date", "date": {"equals": planned_date.isoformat()}}
         ]
     }
-    results = []
-    next_cursor = None
-    while True:
-        response = notion.databases.query(
-            database_id=ACTIVE_DB_ID,
-            filter=filter_,
-            start_cursor=next_cursor if next_cursor else None
-        )
-        results.extend(response["results"])
-        if response.get("has_more"):
-            next_cursor = response["next_cursor"]
-        else:
-            break
-    # Only return those NOT in the Complete group
-    uncompleted = [page for page in results if not is_status_complete(page, active_schema)]
-    return bool(uncompleted)
+    # Stops paging as soon as one uncompleted task turns up
+    return any(
+        not is_status_complete(page, active_schema)
+        for page in paginate(notion.databases.query, database_id=ACTIVE_DB_ID, filter=filter_)
+    )
 
 def is_task_due_for_week(template_task, week_start, planned_date):
     # Returns True if the task is due for the week of week_start, for the planned_date
@@ -455,28 +747,83 @@ def is_task_due_for_week(template_task, week_start, planned_date):
         return True
 
 def main():
+    global page_cache, completion_checkpoint
     args = _parse_args()
     _initialise_from_config(args.config)
     anchor_now = _parse_now(args.now)
+    progress.clear()
+    page_cache = open_page_cache(args.page_cache)
+    completion_checkpoint = open_completion_checkpoint(args.completion_checkpoint)
+    try:
+        with run_deadline(args.deadline):
+            run_rollover(anchor_now, batched_lookup=args.active_lookup == "batched")
+    except (DeadlineExceeded, CircuitOpenError) as e:
+        done = ", ".join(f"{count} {label}" for label, count in progress.items()) or "nothing"
+        logger.error(f"Weekly rollover stopped early: {e}. Completed before stopping: {done}.")
+        logger.info(notion.stats.summary())
+        raise
+    finally:
+        if page_cache is not None:
+            logger.info(page_cache.summary())
+            try:
+                page_cache.save()
+            except OSError as e:
+                logger.warning(f"Could not save page cache to {page_cache.path}: {e}")
+
+def run_rollover(anchor_now=None, batched_lookup=False):
+    """
+    Update Last Completed dates and create the coming week's Active Tasks.
+
+    With batched_lookup, Active Tasks are fetched with batched per-template
+    queries instead of one scan of every task with a TemplateId: Last
+    Completed comes from sorted queries for each template's latest Done task
+    (see get_latest_completions), and only open tasks are indexed for the
+    duplicate checks. With a completion checkpoint, Last Completed comes from
+    the checkpoint in either mode, so the index holds only open tasks too.
+    """
+    global active_index
+    run_started = datetime.now(pytz.UTC)
     logger.info("Fetching Template Tasks from Notion...")
     template_schema = get_template_schema()
     template_tasks = get_template_tasks()
-    logger.info("Updating Last Completed dates for Template Tasks...")
     active_schema = get_active_schema()
+    # Both phases look up Active Tasks per template; nothing this run writes
+    # before the final batch of creations changes an Active Task, so one scan
+    # answers them all
+    # When Last Completed doesn't come from the index, the index only needs the
+    # open tasks the duplicate checks look at, not every task's Done history
+    completions_from_index = not batched_lookup and completion_checkpoint is None
+    open_status_filter = None if completions_from_index else get_open_status_filter(active_schema)
+    if batched_lookup:
+        active_index = build_active_task_index([task["id"] for task in template_tasks], open_status_filter)
+    else:
+        active_index = build_active_task_index(open_status_filter=open_status_filter)
+    try:
+        _run_rollover_phases(template_tasks, template_schema, active_schema, anchor_now, run_started, aggregate_completions=batched_lookup)
+    finally:
+        active_index = None
 
+def _run_rollover_phases(template_tasks, template_schema, active_schema, anchor_now, run_started, aggregate_completions=False):
+    """Update Last Completed dates, then create the week's Active Tasks that don't exist yet."""
+    global page_updates
+    logger.info("Updating Last Completed dates for Template Tasks...")
+    template_ids = [task["id"] for task in template_tasks]
+    if completion_checkpoint is not None:
+        latest_completions = sync_latest_completions(template_ids, completion_checkpoint, run_started)
+    elif aggregate_completions:
+        latest_completions = get_latest_completions(template_ids)
+    else:
+        latest_completions = None
+
+    # Last Completed writes are queued and sent concurrently once every template
+    # has been checked, instead of one blocking PATCH between each query
+    page_updates = notion.page_update_buffer()
     for template_task in template_tasks:
-        active_tasks = get_active_tasks_for_template(template_task["id"])
-        most_recent = None
-        most_recent_page_id = None
-        for page in active_tasks:
-            # Only update Last Completed when task is specifically "Done"
-            # Not when marked "Not Needed" or "Duplicate?" (also in Complete group)
-            if is_status_done(page, active_schema):
-                completed_date = extract_completed_date(page)
-                logger.debug(f"Task {page.get('id')} completed_date: {completed_date}")
-                if completed_date and (most_recent is None or completed_date > most_recent):
-                    most_recent = completed_date
-                    most_recent_page_id = page.get("id")
+        if latest_completions is not None:
+            most_recent = latest_completions.get(template_task["id"])
+        else:
+            most_recent = get_most_recent_completion(template_task["id"], active_schema)
+        progress["templates checked"] += 1
         if most_recent:
             # Normalize date to include timezone if it doesn't already
             # Notion API returns dates as either "2025-08-21" or "2025-08-21T00:00:00.000Z"
@@ -486,16 +833,34 @@ def main():
                 date_obj = date_obj.replace(tzinfo=pytz.UTC)
                 most_recent = date_obj.isoformat()
 
+            if last_completed_unchanged(template_task, most_recent):
+                # Notion already has this completion, so a write would change nothing
+                progress["Last Completed writes skipped"] += 1
+                continue
             update_template_last_completed(template_task["id"], most_recent)
+            progress["Last Completed dates updated"] += 1
             # Update in-memory template object to reflect the new Last Completed date
             # This ensures is_task_due_for_week() uses current data, not stale data
             # Structure must match how get_template_tasks() extracts dates (line 65: v["date"])
             template_task["properties"]["Last Completed"] = {"start": most_recent}
+    try:
+        failed = page_updates.flush()["failed"]
+    finally:
+        page_updates = None
+    if failed:
+        # Creation decisions depend on Last Completed, so stop as a direct update would have
+        raise next(iter(failed.values()))
+    logger.info(
+        f"Updated Last Completed for {progress['Last Completed dates updated']} templates; "
+        f"skipped {progress['Last Completed writes skipped']} writes that wouldn't change it"
+    )
+    logger.info(f"Notion call budget remaining before task creation: {notion.remaining_budget()} calls")
     logger.info("Syncing select and status options in Active Tasks DB...")
     sync_options(active_schema, template_schema)
     logger.info("Creating Active Tasks for the coming week from templates...")
     week_dates = get_next_week_dates(anchor_now.date() if anchor_now else None)
     week_start = list(week_dates.values())[0]
+    pending_creations = []
     for template_task in template_tasks:
         freq = template_task["properties"].get("Frequency")
         # For Monday/Friday, always create both
@@ -514,8 +879,7 @@ def main():
                     properties[TEMPLATE_ID_PROPERTY] = {"rich_text": [{"text": {"content": template_task["id"]}}]}
                 properties["Category"] = {"select": {"name": category}}
                 properties["Planned Date"] = {"date": {"start": planned_date.isoformat()}}
-                create_active_task(template_task, properties)
-                logger.info(f"Created Active Task '{task_name}' for template id {template_task['id']} with Category {category} and Planned Date {planned_date}")
+                pending_creations.append((template_task, properties, category, planned_date))
         elif freq == "Daily":
             # For daily tasks, create for all three workdays
             for category, planned_date in week_dates.items():
@@ -530,8 +894,7 @@ def main():
                     properties[TEMPLATE_ID_PROPERTY] = {"rich_text": [{"text": {"content": template_task["id"]}}]}
                 properties["Category"] = {"select": {"name": category}}
                 properties["Planned Date"] = {"date": {"start": planned_date.isoformat()}}
-                create_active_task(template_task, properties)
-                logger.info(f"Created Active Task '{task_name}' for template id {template_task['id']} with Category {category} and Planned Date {planned_date}")
+                pending_creations.append((template_task, properties, category, planned_date))
         else:
             # For other frequencies, match category to day
             for category, planned_date in week_dates.items():
@@ -548,8 +911,9 @@ def main():
                     properties[TEMPLATE_ID_PROPERTY] = {"rich_text": [{"text": {"content": template_task["id"]}}]}
                 properties["Category"] = {"select": {"name": category}}
                 properties["Planned Date"] = {"date": {"start": planned_date.isoformat()}}
-                create_active_task(template_task, properties)
-                logger.info(f"Created Active Task '{task_name}' for template id {template_task['id']} with Category {category} and Planned Date {planned_date}")
+                pending_creations.append((template_task, properties, category, planned_date))
+    create_active_tasks(pending_creations)
+    logger.info(notion.stats.summary())
     logger.info("Done.")
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for analyze_notion_trace.py
+"""
+
+import sys
+import json
+import pytest
+
+sys.path.append('scripts')
+from analyze_notion_trace import (
+    load_trace,
+    top_callers,
+    repeated_queries,
+    critical_path,
+    format_report
+)
+
+
+def event(ts, duration, caller="script.main", method="databases.query", params_hash="a", **fields):
+    return {
+        "ts": ts,
+        "duration": duration,
+        "caller": caller,
+        "method": method,
+        "params_hash": params_hash,
+        "target": "db-id",
+        "queue_wait": 0.0,
+        "network_time": duration,
+        "retry_sleep": 0.0,
+        "retries": 0,
+        **fields,
+    }
+
+
+class TestLoadTrace:
+    """Test reading trace files"""
+
+    def test_skips_invalid_lines(self, tmp_path):
+        path = tmp_path / "trace.jsonl"
+        path.write_text(json.dumps(event(0, 1)) + "\n\n{\"ts\": 1, \"dura")
+
+        assert len(load_trace(str(path))) == 1
+
+
+class TestTopCallers:
+    """Test grouping time by calling function"""
+
+    def test_sorted_by_total_time(self):
+        events = [
+            event(0, 1.0, caller="script.get_templates"),
+            event(1, 2.0, caller="script.create_active_task"),
+            event(2, 2.0, caller="script.create_active_task", retries=1),
+        ]
+
+        callers = top_callers(events)
+
+        assert [c["caller"] for c in callers] == ["script.create_active_task", "script.get_templates"]
+        assert callers[0]["calls"] == 2
+        assert callers[0]["total_time"] == 4.0
+        assert callers[0]["retries"] == 1
+
+
+class TestRepeatedQueries:
+    """Test spotting identical calls"""
+
+    def test_groups_identical_calls(self):
+        events = [
+            event(0, 1.0, params_hash="a", caller="script.f"),
+            event(1, 1.5, params_hash="a", caller="script.g"),
+            event(2, 1.0, params_hash="b"),
+        ]
+
+        repeats = repeated_queries(events)
+
+        assert len(repeats) == 1
+        assert repeats[0]["count"] == 2
+        assert repeats[0]["wasted_time"] == 1.5
+        assert repeats[0]["callers"] == ["script.f", "script.g"]
+
+    def test_same_params_different_method_not_grouped(self):
+        events = [event(0, 1.0, method="pages.retrieve"), event(1, 1.0, method="pages.update")]
+        assert repeated_queries(events) == []
+
+
+class TestCriticalPath:
+    """Test finding the heaviest chain of sequential calls"""
+
+    def test_sequential_calls_are_all_on_path(self):
+        events = [event(0, 1.0), event(1, 1.0), event(2, 1.0)]
+        assert critical_path(events) == events
+
+    def test_picks_heaviest_of_overlapping_calls(self):
+        schema = event(0, 1.0, caller="script.get_schema")
+        fast = event(1, 0.5, caller="script.fast")
+        slow = event(1, 3.0, caller="script.slow")
+        last = event(4, 1.0, caller="script.update")
+
+        path = critical_path([fast, slow, schema, last])
+
+        assert [call["caller"] for call in path] == ["script.get_schema", "script.slow", "script.update"]
+
+    def test_empty(self):
+        assert critical_path([]) == []
+
+
+class TestFormatReport:
+    """Test the text report"""
+
+    def test_report_sections(self):
+        report = format_report([event(0, 1.0), event(1, 2.0)])
+
+        assert "2 calls over 3.0s" in report
+        assert "script.main: 2 calls, 3.0s total" in report
+        assert "databases.query on db-id: 2 times" in report
+        assert "Critical path: 2 sequential calls, 3.0s" in report
+
+    def test_empty_trace(self):
+        assert format_report([]) == "Trace is empty."
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
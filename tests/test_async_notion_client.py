@@ -0,0 +1,320 @@
+"""
+Tests for AsyncRateLimitedNotionClient in utils/notion_client.py
+
+These tests run the async client against a local fake transport
+(httpx.MockTransport) to verify:
+- Requests reach the right Notion endpoints
+- Requests overlap in flight while start times are rate limited
+- 429 responses are retried with the same semantics as the sync client
+- Other errors are raised immediately
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from notion_client.errors import APIResponseError, HTTPResponseError
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils import notion_client
+from utils.notion_client import (
+    AsyncRateLimitedNotionClient,
+    RetryPolicy,
+    SlidingWindowCallBudget,
+    TokenBucketRateLimiter,
+    create_async_rate_limited_client,
+    get_rate_limiter,
+    RATE_LIMIT_MODE_FIXED,
+)
+
+
+def json_response(status, body, headers=None):
+    return httpx.Response(status, json=body, headers=headers or {})
+
+
+def error_body(status, code):
+    return {"object": "error", "status": status, "code": code, "message": code}
+
+
+def make_client(handler, rate_limiter=None, call_budget=None, retry_policy=None):
+    """Build an async client whose HTTP traffic goes to `handler`"""
+    transport = httpx.MockTransport(handler)
+    return AsyncRateLimitedNotionClient(
+        auth="test-token",
+        client=httpx.AsyncClient(transport=transport),
+        rate_limiter=rate_limiter or TokenBucketRateLimiter(rate=1000.0, capacity=100),
+        call_budget=call_budget or SlidingWindowCallBudget(limits=((1000, 60.0),)),
+        retry_policy=retry_policy,
+    )
+
+
+class TestAsyncRequests:
+    """Test requests going through the fake transport"""
+
+    def test_query_hits_database_endpoint(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return json_response(200, {"object": "list", "results": [{"id": "page1"}], "has_more": False})
+
+        async def run():
+            async with make_client(handler) as client:
+                return await client.databases.query(
+                    database_id="db-id",
+                    filter={"property": "TemplateId", "rich_text": {"equals": "t1"}},
+                )
+
+        result = asyncio.run(run())
+
+        assert result["results"] == [{"id": "page1"}]
+        assert requests[0].method == "POST"
+        assert requests[0].url.path == "/v1/databases/db-id/query"
+        assert json.loads(requests[0].content)["filter"]["rich_text"] == {"equals": "t1"}
+        assert requests[0].headers["Authorization"] == "Bearer test-token"
+
+    def test_pages_update(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return json_response(200, {"object": "page", "id": "page1"})
+
+        async def run():
+            async with make_client(handler) as client:
+                return await client.pages.update(page_id="page1", properties={"Category": {"select": {"name": "Random/Monday"}}})
+
+        assert asyncio.run(run())["id"] == "page1"
+        assert requests[0].method == "PATCH"
+        assert requests[0].url.path == "/v1/pages/page1"
+
+    def test_requests_overlap_in_flight(self):
+        """Slow responses don't serialize concurrent requests"""
+        in_flight = {"now": 0, "max": 0}
+
+        async def handler(request):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.1)
+            in_flight["now"] -= 1
+            return json_response(200, {"object": "page", "id": request.url.path.rsplit("/", 1)[-1]})
+
+        async def run():
+            async with make_client(handler) as client:
+                return await asyncio.gather(*(client.pages.retrieve(page_id=f"page{i}") for i in range(5)))
+
+        start = time.monotonic()
+        results = asyncio.run(run())
+        elapsed = time.monotonic() - start
+
+        assert [r["id"] for r in results] == [f"page{i}" for i in range(5)]
+        assert in_flight["max"] == 5
+        assert elapsed < 0.4
+
+    def test_start_times_are_rate_limited(self):
+        """Request starts are spaced by the limiter even when issued together"""
+        start_times = []
+
+        def handler(request):
+            start_times.append(time.monotonic())
+            return json_response(200, {"object": "page", "id": "page"})
+
+        async def run():
+            limiter = TokenBucketRateLimiter(rate=20.0, capacity=1)
+            async with make_client(handler, rate_limiter=limiter) as client:
+                await asyncio.gather(*(client.pages.retrieve(page_id=f"page{i}") for i in range(4)))
+
+        asyncio.run(run())
+
+        gaps = [b - a for a, b in zip(start_times, start_times[1:])]
+        assert len(start_times) == 4
+        assert all(gap >= 0.04 for gap in gaps)
+
+    def test_identical_reads_coalesced(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.05)
+            return json_response(200, {"object": "list", "results": [{"id": "page1"}], "has_more": False})
+
+        async def run():
+            async with make_client(handler) as client:
+                results = await asyncio.gather(
+                    client.databases.query(database_id="db-id", filter={"property": "Done", "checkbox": {"equals": False}}),
+                    client.databases.query(database_id="db-id", filter={"property": "Done", "checkbox": {"equals": False}}),
+                    client.databases.query(database_id="db-id", filter={"property": "Done", "checkbox": {"equals": True}}),
+                )
+                return results, client.single_flight.coalesced
+
+        results, coalesced = asyncio.run(run())
+
+        assert len(requests) == 2
+        assert coalesced == 1
+        assert results[0] == results[1]
+
+    def test_calls_recorded_in_budget(self):
+        budget = SlidingWindowCallBudget(limits=((10, 60.0),))
+
+        def handler(request):
+            return json_response(200, {"object": "page", "id": "page"})
+
+        async def run():
+            async with make_client(handler, call_budget=budget) as client:
+                await client.pages.retrieve(page_id="page1")
+                await client.pages.retrieve(page_id="page2")
+                return client.remaining_budget()
+
+        assert asyncio.run(run()) == 8
+
+
+class TestAsyncRetry:
+    """Test retry semantics match the sync client"""
+
+    @patch('utils.notion_client.asyncio.sleep', new_callable=AsyncMock)
+    def test_retries_429_after_retry_after(self, mock_sleep):
+        responses = [
+            json_response(429, error_body(429, "rate_limited"), headers={"Retry-After": "2"}),
+            json_response(200, {"object": "page", "id": "page1"}),
+        ]
+        limiter = MagicMock()
+        limiter.reserve.return_value = 0.0
+
+        def handler(request):
+            return responses.pop(0)
+
+        async def run():
+            async with make_client(handler, rate_limiter=limiter) as client:
+                return await client.pages.retrieve(page_id="page1")
+
+        assert asyncio.run(run())["id"] == "page1"
+        mock_sleep.assert_called_once_with(2.0)
+        limiter.pause.assert_called_once_with(2.0)
+        limiter.record_rate_limited.assert_called_once()
+        limiter.record_success.assert_called_once()
+
+    @patch('utils.notion_client.asyncio.sleep', new_callable=AsyncMock)
+    def test_exponential_backoff_without_retry_after(self, mock_sleep):
+        responses = [
+            json_response(429, error_body(429, "rate_limited")),
+            json_response(429, error_body(429, "rate_limited")),
+            json_response(200, {"object": "page", "id": "page1"}),
+        ]
+        limiter = MagicMock()
+        limiter.reserve.return_value = 0.0
+
+        def handler(request):
+            return responses.pop(0)
+
+        async def run():
+            async with make_client(handler, rate_limiter=limiter, retry_policy=RetryPolicy(jitter=False)) as client:
+                return await client.pages.retrieve(page_id="page1")
+
+        asyncio.run(run())
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
+
+    @patch('utils.notion_client.asyncio.sleep', new_callable=AsyncMock)
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return json_response(429, error_body(429, "rate_limited"), headers={"Retry-After": "1"})
+
+        async def run():
+            async with make_client(handler) as client:
+                await client.pages.retrieve(page_id="page1")
+
+        with pytest.raises(APIResponseError):
+            asyncio.run(run())
+        assert len(calls) == notion_client.MAX_RETRIES
+
+    @patch('utils.notion_client.asyncio.sleep', new_callable=AsyncMock)
+    def test_retries_5xx(self, mock_sleep):
+        responses = [
+            json_response(503, error_body(503, "service_unavailable")),
+            json_response(200, {"object": "page", "id": "page1"}),
+        ]
+
+        def handler(request):
+            return responses.pop(0)
+
+        async def run():
+            async with make_client(handler) as client:
+                return await client.pages.retrieve(page_id="page1")
+
+        assert asyncio.run(run())["id"] == "page1"
+        mock_sleep.assert_called_once()
+
+    @patch('utils.notion_client.asyncio.sleep', new_callable=AsyncMock)
+    def test_create_not_retried_after_5xx(self, mock_sleep):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return json_response(502, error_body(502, "bad_gateway"))
+
+        async def run():
+            async with make_client(handler) as client:
+                await client.pages.create(parent={"database_id": "db-id"}, properties={})
+
+        with pytest.raises(HTTPResponseError):
+            asyncio.run(run())
+        assert len(calls) == 1
+
+    def test_other_errors_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return json_response(404, error_body(404, "object_not_found"))
+
+        async def run():
+            async with make_client(handler) as client:
+                await client.pages.retrieve(page_id="missing")
+
+        with pytest.raises(APIResponseError) as exc_info:
+            asyncio.run(run())
+        assert exc_info.value.code == "object_not_found"
+        assert len(calls) == 1
+
+
+class TestAsyncClientFactory:
+    """Test creating async clients"""
+
+    def test_shares_process_limiter_with_sync_clients(self):
+        client = create_async_rate_limited_client(auth="test-token", rate_limit_mode=RATE_LIMIT_MODE_FIXED)
+        assert client.rate_limiter is get_rate_limiter(RATE_LIMIT_MODE_FIXED)
+
+    def test_shared_limiter_reserves_in_thread(self, tmp_path):
+        """The shared limiter's file-locked reservation runs off the event loop"""
+        limiter = notion_client.SharedFileRateLimiter(path=str(tmp_path / "ledger.json"))
+        to_thread = asyncio.to_thread
+        offloaded = []
+
+        async def record_to_thread(func, *args, **kwargs):
+            offloaded.append(func)
+            return await to_thread(func, *args, **kwargs)
+
+        def handler(request):
+            return json_response(200, {"object": "page", "id": "page1"})
+
+        async def run():
+            async with make_client(handler, rate_limiter=limiter) as client:
+                return await client.pages.retrieve(page_id="page1")
+
+        with patch.object(notion_client.asyncio, "to_thread", record_to_thread):
+            assert asyncio.run(run())["id"] == "page1"
+        assert offloaded == [limiter.reserve]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
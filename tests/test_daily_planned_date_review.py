@@ -26,8 +26,12 @@ with patch.dict(os.environ, {'NOTION_INTEGRATION_SECRET': 'test-token'}, clear=T
                 get_active_tasks_without_category,
                 get_old_incomplete_tasks,
                 update_task_planned_date,
-                update_task_category
+                update_task_category,
+                get_task_name,
+                update_tasks
             )
+            import daily_planned_date_review
+            from utils.notion_client import DeadlineExceeded, PageUpdateBuffer
 
 class TestDateCalculations:
     """Test date calculation functionality"""
@@ -335,6 +339,113 @@ class TestIntegrationScenarios:
         assert updated_count == 2
         assert mock_update.call_count == 2
 
+class TestConcurrentUpdates:
+    """Test applying updates to many tasks concurrently"""
+
+    def test_get_task_name(self):
+        """Test extracting a task's display name"""
+        assert get_task_name({"properties": {"Task": {"title": [{"plain_text": "Task 1"}]}}}) == "Task 1"
+        assert get_task_name({"properties": {"Task": {"title": []}}}) == "Unknown Task"
+        assert get_task_name({}) == "Unknown Task"
+
+    def test_update_tasks_counts_successes(self):
+        """Test every task is updated and only successes are counted"""
+        tasks = [{"id": f"task{i}", "properties": {}} for i in range(5)]
+        update_func = Mock(side_effect=lambda task_id, value: task_id != "task3")
+
+        updated_count = update_tasks(tasks, update_func, date(2024, 1, 18))
+
+        assert updated_count == 4
+        assert sorted(c.args[0] for c in update_func.call_args_list) == [f"task{i}" for i in range(5)]
+        assert all(c.args[1] == date(2024, 1, 18) for c in update_func.call_args_list)
+
+    @patch('daily_planned_date_review.notion')
+    def test_update_tasks_with_real_update_function(self, mock_notion):
+        """Test update_tasks drives pages.update for each task"""
+        tasks = [{"id": "task1", "properties": {}}, {"id": "task2", "properties": {}}]
+
+        updated_count = update_tasks(tasks, update_task_category, "Random/Monday")
+
+        assert updated_count == 2
+        assert mock_notion.pages.update.call_count == 2
+
+    def test_update_tasks_empty(self):
+        """Test no work is done for an empty task list"""
+        update_func = Mock()
+        assert update_tasks([], update_func, "value") == 0
+        update_func.assert_not_called()
+
+    @patch('daily_planned_date_review.notion')
+    def test_deadline_stops_updates_and_records_progress(self, mock_notion):
+        """Test a run deadline isn't swallowed as a per-task failure"""
+        tasks = [{"id": "task1", "properties": {}}, {"id": "task2", "properties": {}}]
+        mock_notion.pages.update.side_effect = [{"id": "task1"}, DeadlineExceeded("out of time")]
+        daily_planned_date_review.progress.clear()
+
+        with pytest.raises(DeadlineExceeded):
+            update_tasks(tasks, update_task_planned_date, date(2024, 1, 18))
+
+        assert daily_planned_date_review.progress["tasks updated"] == 1
+
+class TestBufferedUpdateCounts:
+    """Test buffered updates are counted from what the flush wrote, not when queued"""
+
+    @staticmethod
+    def failing_for(page_id, error):
+        def update(**kwargs):
+            if kwargs["page_id"] == page_id:
+                raise error
+            return {"id": kwargs["page_id"]}
+        return update
+
+    @pytest.fixture
+    def buffered(self):
+        pages = Mock()
+        buffer = PageUpdateBuffer(pages, on_flush=daily_planned_date_review.record_flush)
+        daily_planned_date_review.progress.clear()
+        daily_planned_date_review.queued_updates.clear()
+        with patch.object(daily_planned_date_review, 'page_updates', buffer):
+            yield pages, buffer
+
+    def test_queued_updates_are_not_counted(self, buffered):
+        """Test nothing counts as updated until the buffer is flushed"""
+        pages, buffer = buffered
+        tasks = [{"id": "task1", "properties": {}}, {"id": "task2", "properties": {}}]
+
+        assert update_tasks(tasks, update_task_planned_date, date(2024, 1, 18)) == 2
+
+        pages.update.assert_not_called()
+        assert daily_planned_date_review.progress["tasks updated"] == 0
+        assert buffer.pending == 2
+
+    def test_failed_flush_counts_only_written_pages(self, buffered):
+        """Test a page whose write fails at flush time is counted as failed, not updated"""
+        pages, buffer = buffered
+        pages.update.side_effect = self.failing_for("task2", Exception("boom"))
+        tasks = [{"id": "task1", "properties": {}}, {"id": "task2", "properties": {}}]
+        update_tasks(tasks, update_task_planned_date, date(2024, 1, 18))
+        update_tasks(tasks[:1], update_task_category, "Random/Monday", label="old task")
+
+        buffer.flush()
+
+        # task1's two updates were merged into one PATCH and both count
+        assert daily_planned_date_review.progress["tasks updated"] == 1
+        assert daily_planned_date_review.progress["old tasks updated"] == 1
+        assert daily_planned_date_review.progress["task updates failed"] == 1
+
+    def test_flush_cut_off_by_deadline_counts_only_written_pages(self, buffered):
+        """Test a flush stopped by the run deadline counts the pages it managed to write"""
+        pages, buffer = buffered
+        pages.update.side_effect = self.failing_for("task2", DeadlineExceeded("out of time"))
+        tasks = [{"id": "task1", "properties": {}}, {"id": "task2", "properties": {}}]
+        update_tasks(tasks, update_task_planned_date, date(2024, 1, 18))
+
+        with pytest.raises(DeadlineExceeded):
+            buffer.flush()
+
+        assert daily_planned_date_review.progress["tasks updated"] == 1
+        assert daily_planned_date_review.progress["task updates failed"] == 1
+
 # Fixtures for common test data
 @pytest.fixture
 def sample_task():
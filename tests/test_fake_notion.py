@@ -0,0 +1,338 @@
+"""
+Tests for utils/fake_notion.py
+
+These tests verify the in-process fake Notion backend used for load tests:
+- Database retrieve/update and page create/retrieve/update
+- Query filters, sorts, pagination and filter_properties
+- Injected latency, 5xx errors and 429 rate limiting
+- The daily review running end to end against the fake
+"""
+
+import os
+import sys
+import time
+import asyncio
+import httpx
+import pytest
+from datetime import date
+from unittest.mock import patch, MagicMock
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from notion_client.errors import APIResponseError, HTTPResponseError
+from utils import notion_client as notion_client_module
+from utils.fake_notion import FakeNotion
+from utils.notion_client import (
+    AsyncRateLimitedNotionClient,
+    RateLimitedNotionClient,
+    RetryPolicy,
+    SchemaCache,
+    SlidingWindowCallBudget,
+    TokenBucketRateLimiter,
+    paginate,
+)
+
+sys.path.append('scripts')
+sys.path.append('scripts/weekly_rollover')
+
+
+def make_client(fake, retry_policy=None):
+    return RateLimitedNotionClient(
+        auth="test-token",
+        rate_limiter=MagicMock(),
+        call_budget=MagicMock(),
+        retry_policy=retry_policy,
+        schema_cache=SchemaCache(),
+        transport=fake,
+    )
+
+
+def text(value):
+    return {"rich_text": [{"text": {"content": value}}]}
+
+
+def add_task(fake, db_id, name, template_id=None, category=None, status="Not Started", planned=None):
+    properties = {
+        "Task": {"title": [{"text": {"content": name}}]},
+        "Status": {"status": {"name": status}},
+        "Planned Date": {"date": {"start": planned} if planned else None},
+    }
+    if template_id:
+        properties["TemplateId"] = text(template_id)
+    if category:
+        properties["Category"] = {"select": {"name": category}}
+    return fake.add_page(db_id, properties)
+
+
+def names(results):
+    return sorted(page["properties"]["Task"]["title"][0]["plain_text"] for page in results)
+
+
+@pytest.fixture
+def fake():
+    return FakeNotion()
+
+
+@pytest.fixture
+def active_db(fake):
+    _, active_db_id = fake.add_task_manager_databases()
+    add_task(fake, active_db_id, "a", template_id="t1", category="Random/Monday", planned="2025-01-06")
+    add_task(fake, active_db_id, "b", template_id="t1", category="Cleaning/Friday", status="Done", planned="2025-01-10")
+    add_task(fake, active_db_id, "c", category="Cooking/Tuesday")
+    add_task(fake, active_db_id, "d", planned="2024-12-30")
+    return active_db_id
+
+
+class TestDatabasesAndPages:
+    """Test schema and page endpoints"""
+
+    def test_retrieve_returns_schema_with_status_groups(self, fake, active_db):
+        schema = make_client(fake).databases.retrieve(database_id=active_db)["properties"]
+
+        status = schema["Status"]["status"]
+        complete = next(group for group in status["groups"] if group["name"] == "Complete")
+        done = next(option for option in status["options"] if option["name"] == "Done")
+        assert done["id"] in complete["option_ids"]
+
+    def test_unknown_database_is_not_found(self, fake):
+        with pytest.raises(APIResponseError) as excinfo:
+            make_client(fake).databases.retrieve(database_id="missing")
+
+        assert excinfo.value.code == "object_not_found"
+
+    def test_create_and_update_page_in_response_format(self, fake, active_db):
+        client = make_client(fake)
+
+        page = client.pages.create(
+            parent={"database_id": active_db},
+            properties={"Task": {"title": [{"text": {"content": "New"}}]}, "Category": {"select": {"name": "Random/Monday"}}},
+        )
+        client.pages.update(page_id=page["id"], properties={"Planned Date": {"date": {"start": "2025-01-09"}}})
+        stored = client.pages.retrieve(page_id=page["id"])
+
+        assert stored["properties"]["Task"]["title"][0]["plain_text"] == "New"
+        assert stored["properties"]["Category"]["select"]["name"] == "Random/Monday"
+        assert stored["properties"]["Planned Date"]["date"]["start"] == "2025-01-09"
+        assert stored["properties"]["TemplateId"]["rich_text"] == []
+
+    def test_unknown_property_is_validation_error(self, fake, active_db):
+        with pytest.raises(APIResponseError) as excinfo:
+            make_client(fake).pages.create(parent={"database_id": active_db}, properties={"Nope": {"url": "x"}})
+
+        assert excinfo.value.code == "validation_error"
+
+    def test_database_update_adds_select_options(self, fake, active_db):
+        client = make_client(fake)
+        options = client.databases.retrieve(database_id=active_db)["properties"]["Priority"]["select"]["options"]
+
+        client.databases.update(
+            database_id=active_db,
+            properties={"Priority": {"select": {"options": options + [{"name": "Urgent", "color": "red"}]}}},
+        )
+
+        updated = client.databases.retrieve(database_id=active_db)["properties"]["Priority"]["select"]["options"]
+        assert [option["name"] for option in updated] == ["High", "Medium", "Low", "Urgent"]
+
+
+class TestQuery:
+    """Test database queries"""
+
+    def query(self, fake, db_id, **kwargs):
+        return list(paginate(make_client(fake).databases.query, database_id=db_id, **kwargs))
+
+    @pytest.mark.parametrize("filter_, expected", [
+        ({"property": "TemplateId", "rich_text": {"equals": "t1"}}, ["a", "b"]),
+        ({"property": "TemplateId", "rich_text": {"is_empty": True}}, ["c", "d"]),
+        ({"property": "Category", "select": {"equals": "Cooking/Tuesday"}}, ["c"]),
+        ({"property": "Category", "select": {"is_empty": True}}, ["d"]),
+        ({"property": "Planned Date", "date": {"equals": "2025-01-06"}}, ["a"]),
+        ({"property": "Planned Date", "date": {"before": "2025-01-07"}}, ["a", "d"]),
+        ({"property": "Planned Date", "date": {"is_empty": True}}, ["c"]),
+        ({"property": "Status", "status": {"equals": "Done"}}, ["b"]),
+        ({"and": [
+            {"property": "TemplateId", "rich_text": {"equals": "t1"}},
+            {"or": [
+                {"property": "Status", "status": {"equals": "Not Started"}},
+                {"property": "Status", "status": {"equals": "In Progress"}},
+            ]},
+        ]}, ["a"]),
+    ])
+    def test_filters(self, fake, active_db, filter_, expected):
+        assert names(self.query(fake, active_db, filter=filter_)) == expected
+
+    def test_filter_on_unknown_property_is_validation_error(self, fake, active_db):
+        with pytest.raises(APIResponseError) as excinfo:
+            self.query(fake, active_db, filter={"property": "Nope", "select": {"is_empty": True}})
+
+        assert excinfo.value.code == "validation_error"
+
+    def test_sort_puts_empty_values_last(self, fake, active_db):
+        results = self.query(fake, active_db, sorts=[{"property": "Planned Date", "direction": "descending"}])
+
+        assert [page["properties"]["Task"]["title"][0]["plain_text"] for page in results] == ["b", "a", "d", "c"]
+
+    def test_paginates_at_100_results(self, fake, active_db):
+        for i in range(246):
+            add_task(fake, active_db, f"bulk {i}")
+
+        results = self.query(fake, active_db)
+
+        assert len(results) == 250
+        assert len({page["id"] for page in results}) == 250
+        assert fake.requests["databases.query"] == 3
+
+    def test_filter_properties_limits_returned_properties(self, fake, active_db):
+        client = make_client(fake)
+        response = client.databases.query(database_id=active_db, filter_properties=["Task", "Status"])
+
+        assert set(response["results"][0]["properties"]) == {"Task", "Status"}
+
+
+class TestInjection:
+    """Test injected latency, errors and rate limiting"""
+
+    def test_latency_is_added_to_responses(self):
+        fake = FakeNotion(latency=0.05)
+        _, active_db = fake.add_task_manager_databases()
+        client = make_client(fake)
+
+        start = time.monotonic()
+        client.databases.query(database_id=active_db)
+
+        assert time.monotonic() - start >= 0.05
+
+    def test_server_side_rate_limit_answers_429_and_client_retries(self):
+        fake = FakeNotion(rate_limit_rps=50, rate_limit_burst=1, retry_after=0.05)
+        _, active_db = fake.add_task_manager_databases()
+        client = make_client(fake, retry_policy=RetryPolicy(jitter=False))
+
+        client.databases.query(database_id=active_db)
+        client.databases.query(database_id=active_db, page_size=10)
+
+        assert fake.requests["rate_limited"] >= 1
+        assert client.stats.snapshot()["rate_limited"] >= 1
+
+    def test_error_rate_fails_requests_with_5xx(self):
+        fake = FakeNotion(error_rate=1.0, seed=1)
+        _, active_db = fake.add_task_manager_databases()
+        client = make_client(fake, retry_policy=RetryPolicy(max_retries=2, initial_delay=0.01))
+
+        with pytest.raises(HTTPResponseError):
+            client.databases.query(database_id=active_db)
+
+        assert fake.requests["errors"] == 2
+
+
+class TestAsync:
+    """Test serving an async client"""
+
+    def test_async_client_queries_fake(self, fake, active_db):
+        async def run():
+            client = AsyncRateLimitedNotionClient(
+                auth="test-token",
+                rate_limiter=TokenBucketRateLimiter(rate=1000.0, capacity=100),
+                call_budget=SlidingWindowCallBudget(limits=((1000, 60.0),)),
+                schema_cache=SchemaCache(),
+                client=httpx.AsyncClient(transport=fake),
+            )
+            return await client.databases.query(database_id=active_db, filter={"property": "Status", "status": {"equals": "Done"}})
+
+        assert names(asyncio.run(run())["results"]) == ["b"]
+
+
+class TestDailyReviewAgainstFake:
+    """Test running the daily review end to end against the fake"""
+
+    def test_sets_planned_date_and_category(self, fake, active_db, tmp_path, monkeypatch):
+        import daily_planned_date_review
+
+        config = tmp_path / "config.yaml"
+        config.write_text(f"active_tasks_db_id: {active_db}\n")
+        monkeypatch.setenv("NOTION_INTEGRATION_SECRET", "test-token")
+        monkeypatch.setattr(sys, "argv", ["daily_planned_date_review.py", "--config", str(config)])
+        monkeypatch.setattr(notion_client_module, "_global_rate_limiter", MagicMock())
+        monkeypatch.setattr(notion_client_module, "_global_call_budget", MagicMock())
+        monkeypatch.setattr(notion_client_module, "_global_schema_cache", SchemaCache())
+        notion_client_module.set_shared_transport(fake)
+        try:
+            with patch.object(daily_planned_date_review, "get_thursday_of_next_week", return_value=date(2025, 1, 9)):
+                daily_planned_date_review.main()
+        finally:
+            notion_client_module.set_shared_transport(None)
+
+        pages = {page["properties"]["Task"]["title"][0]["plain_text"]: page for page in fake.pages(active_db)}
+        # c had no planned date, d was overdue; a and b come from a template
+        assert pages["c"]["properties"]["Planned Date"]["date"]["start"] == "2025-01-09"
+        assert pages["d"]["properties"]["Planned Date"]["date"]["start"] == "2025-01-09"
+        assert pages["d"]["properties"]["Category"]["select"]["name"] == "Random/Monday"
+        assert pages["a"]["properties"]["Planned Date"]["date"]["start"] == "2025-01-06"
+        # d's category and planned date changes were merged into one PATCH
+        assert fake.requests["pages.update"] == 2
+
+
+class TestWeeklyRolloverAgainstFake:
+    """Test running the weekly rollover end to end against the fake"""
+
+    @pytest.mark.parametrize("lookup, checkpoint, queries, indexed", [
+        ("scan", False, 2, 2),
+        ("batched", False, 3, 1),
+        # With a checkpoint the scan skips Done history; Last Completed comes from its own query
+        ("scan", True, 3, 1),
+    ])
+    def test_answers_active_task_lookups_from_one_scan(self, fake, tmp_path, monkeypatch, lookup, checkpoint, queries, indexed):
+        import create_active_tasks_from_templates as rollover
+
+        template_db, active_db = fake.add_task_manager_databases()
+        weekly = fake.add_page(template_db, {
+            "Task": {"title": [{"text": {"content": "Water plants"}}]},
+            "Frequency": {"select": {"name": "Weekly"}},
+            "Category": {"select": {"name": "Random/Monday"}},
+        })
+        daily = fake.add_page(template_db, {
+            "Task": {"title": [{"text": {"content": "Dishes"}}]},
+            "Frequency": {"select": {"name": "Daily"}},
+            "Category": {"select": {"name": "Cooking/Tuesday"}},
+        })
+        week_dates = rollover.get_next_week_dates(date(2025, 1, 4))
+        add_task(fake, active_db, "Water plants", template_id=weekly["id"], category="Random/Monday", status="Done", planned="2024-12-30")
+        fake.pages(active_db)[-1]["properties"]["Completed Date"]["date"] = {"start": "2024-12-30"}
+        add_task(fake, active_db, "Water plants", template_id=weekly["id"], category="Random/Monday",
+                 planned=week_dates["Random/Monday"].isoformat())
+
+        config = tmp_path / "config.yaml"
+        config.write_text(f"template_tasks_db_id: {template_db}\nactive_tasks_db_id: {active_db}\n")
+        monkeypatch.setenv("NOTION_INTEGRATION_SECRET", "test-token")
+        monkeypatch.setattr(sys, "argv", ["create_active_tasks_from_templates.py", "--config", str(config), "--now", "2025-01-04", "--active-lookup", lookup])
+        monkeypatch.delenv("NOTION_COMPLETION_CHECKPOINT_FILE", raising=False)
+        if checkpoint:
+            sys.argv += ["--completion-checkpoint", str(tmp_path / "checkpoint.json")]
+        indexes = []
+        build_index = rollover.build_active_task_index
+        monkeypatch.setattr(rollover, "build_active_task_index", lambda *args, **kwargs: indexes.append(build_index(*args, **kwargs)) or indexes[-1])
+        # main() sets these from the config; put them back for other tests using the module
+        for name in ("config", "NOTION_TOKEN", "TEMPLATE_DB_ID", "ACTIVE_DB_ID", "notion", "page_cache", "completion_checkpoint"):
+            monkeypatch.setattr(rollover, name, getattr(rollover, name))
+        monkeypatch.setattr(notion_client_module, "_global_rate_limiter", MagicMock())
+        monkeypatch.setattr(notion_client_module, "_global_call_budget", MagicMock())
+        monkeypatch.setattr(notion_client_module, "_global_schema_cache", SchemaCache())
+        notion_client_module.set_shared_transport(fake)
+        try:
+            rollover.main()
+        finally:
+            notion_client_module.set_shared_transport(None)
+
+        created = [page for page in fake.pages(active_db) if page["properties"]["Task"]["title"][0]["plain_text"] == "Dishes"]
+        assert sorted(page["properties"]["Category"]["select"]["name"] for page in created) == [
+            "Cleaning/Friday", "Cooking/Tuesday", "Random/Monday",
+        ]
+        assert {page["properties"]["TemplateId"]["rich_text"][0]["plain_text"] for page in created} == {daily["id"]}
+        # The open Water plants task for next Monday means no duplicate was created
+        assert len(fake.pages(active_db)) == 5
+        assert fake.pages(template_db)[0]["properties"]["Last Completed"]["date"]["start"].startswith("2024-12-30")
+        # One query for the templates and one scan of the Active Tasks DB, or with
+        # batched lookups one query for open tasks and one for latest completions
+        assert fake.requests["databases.query"] == queries
+        assert indexes[0].size == indexed
@@ -0,0 +1,237 @@
+"""
+Tests for utils/notion_cassette.py
+
+These tests verify recording Notion traffic to a cassette and replaying it
+without a network:
+- Record mode passes requests through and writes one line per interaction
+- Replay mode serves recorded responses in order, with body-insensitive fallback
+- Recorded latencies can be replayed
+- Clients can run entirely from a cassette
+"""
+
+import os
+import sys
+import json
+import gzip
+import zlib
+import httpx
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.notion_cassette import (
+    CassetteMissError,
+    CassetteTransport,
+    CASSETTE_MODE_RECORD,
+    CASSETTE_MODE_REPLAY,
+)
+from utils.notion_client import RateLimitedNotionClient, SchemaCache
+
+sys.path.append(os.path.join(project_root, 'scripts', 'benchmarks'))
+import replay_benchmark
+
+
+def notion_handler(request):
+    """Fake Notion answering page retrieves and database queries"""
+    if request.url.path.startswith("/v1/pages/"):
+        return httpx.Response(200, json={"object": "page", "id": request.url.path.rsplit("/", 1)[-1]})
+    body = json.loads(request.content)
+    return httpx.Response(200, json={"object": "list", "results": [{"id": "page1"}], "has_more": False, "echo": body})
+
+
+def make_client(transport):
+    return RateLimitedNotionClient(
+        auth="test-token",
+        rate_limiter=MagicMock(),
+        schema_cache=SchemaCache(),
+        transport=transport,
+    )
+
+
+def record(path, calls):
+    """Record calls(client) against the fake Notion into a cassette"""
+    transport = CassetteTransport(path, mode=CASSETTE_MODE_RECORD, inner=httpx.MockTransport(notion_handler))
+    return calls(make_client(transport))
+
+
+class TestRecord:
+    """Test recording interactions"""
+
+    def test_records_one_line_per_interaction(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+
+        result = record(path, lambda client: client.pages.retrieve(page_id="page1"))
+
+        assert result["id"] == "page1"
+        with open(path) as f:
+            interaction, = [json.loads(line) for line in f]
+        assert interaction["method"] == "GET"
+        assert interaction["url"] == "/v1/pages/page1"
+        assert interaction["status"] == 200
+        assert interaction["response"] == {"object": "page", "id": "page1"}
+        assert "latency" in interaction
+
+    def test_auth_header_not_recorded(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        record(path, lambda client: client.pages.retrieve(page_id="page1"))
+
+        with open(path) as f:
+            assert "test-token" not in f.read()
+
+    def test_gzip_cassette(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl.gz")
+        record(path, lambda client: client.pages.retrieve(page_id="page1"))
+
+        with gzip.open(path, "rt") as f:
+            assert json.loads(f.readline())["url"] == "/v1/pages/page1"
+
+    def test_gzip_cassette_is_single_stream(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl.gz")
+        transport = CassetteTransport(path, mode=CASSETTE_MODE_RECORD, inner=httpx.MockTransport(notion_handler))
+        client = make_client(transport)
+        for i in range(100):
+            client.pages.retrieve(page_id=f"page{i}")
+        transport.close()
+
+        with open(path, "rb") as f:
+            data = f.read()
+        decompressor = zlib.decompressobj(wbits=31)
+        lines = decompressor.decompress(data).decode().splitlines()
+        assert len(lines) == 100
+        # Everything in the first gzip member; one member per line would leave the rest unread
+        assert decompressor.eof
+        assert decompressor.unused_data == b""
+        assert len(data) < len(lines) * 40
+
+    def test_recording_killed_before_close_still_replays(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl.gz")
+        transport = CassetteTransport(path, mode=CASSETTE_MODE_RECORD, inner=httpx.MockTransport(notion_handler))
+        make_client(transport).pages.retrieve(page_id="page1")
+
+        replay = CassetteTransport(path, mode=CASSETTE_MODE_REPLAY)
+        assert make_client(replay).pages.retrieve(page_id="page1")["id"] == "page1"
+        transport.close()
+
+    def test_invalid_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            CassetteTransport(str(tmp_path / "cassette.jsonl"), mode="rewind")
+
+
+class TestReplay:
+    """Test replaying interactions"""
+
+    def test_replays_without_network(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl.gz")
+        recorded = record(path, lambda client: client.databases.query(database_id="db-id", filter={"property": "Done"}))
+
+        client = make_client(CassetteTransport(path, mode=CASSETTE_MODE_REPLAY))
+        replayed = client.databases.query(database_id="db-id", filter={"property": "Done"})
+
+        assert replayed == recorded
+
+    def test_exact_match_preferred(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        record(path, lambda client: [
+            client.databases.query(database_id="db-id", filter={"n": 1}),
+            client.databases.query(database_id="db-id", filter={"n": 2}),
+        ])
+
+        client = make_client(CassetteTransport(path))
+
+        assert client.databases.query(database_id="db-id", filter={"n": 2})["echo"]["filter"] == {"n": 2}
+        assert client.databases.query(database_id="db-id", filter={"n": 1})["echo"]["filter"] == {"n": 1}
+
+    def test_falls_back_to_same_path_when_body_differs(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        record(path, lambda client: client.databases.query(database_id="db-id", filter={"date": "2025-01-04"}))
+
+        client = make_client(CassetteTransport(path))
+        result = client.databases.query(database_id="db-id", filter={"date": "2025-02-01"})
+
+        assert result["echo"]["filter"] == {"date": "2025-01-04"}
+
+    def test_repeats_last_response_when_used_up(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        record(path, lambda client: client.pages.retrieve(page_id="page1"))
+
+        client = make_client(CassetteTransport(path))
+
+        assert client.pages.retrieve(page_id="page1")["id"] == "page1"
+        assert client.pages.retrieve(page_id="page1")["id"] == "page1"
+
+    def test_unknown_request_raises(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        record(path, lambda client: client.pages.retrieve(page_id="page1"))
+
+        client = make_client(CassetteTransport(path))
+
+        with pytest.raises(CassetteMissError):
+            client.pages.retrieve(page_id="page2")
+
+    def test_replays_error_responses(self, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps({
+                "method": "GET", "url": "/v1/pages/missing", "body": None, "status": 404,
+                "headers": {"content-type": "application/json"},
+                "response": {"object": "error", "status": 404, "code": "object_not_found", "message": "Not found"},
+                "text": None, "latency": 0.2,
+            }) + "\n")
+
+        transport = CassetteTransport(path)
+        response = transport.handle_request(httpx.Request("GET", "https://api.notion.com/v1/pages/missing"))
+
+        assert response.status_code == 404
+        assert response.json()["code"] == "object_not_found"
+
+    @patch('utils.notion_cassette.time.sleep')
+    def test_replays_recorded_latency(self, mock_sleep, tmp_path):
+        path = str(tmp_path / "cassette.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps({
+                "method": "GET", "url": "/v1/pages/page1", "body": None, "status": 200,
+                "headers": {}, "response": {"id": "page1"}, "text": None, "latency": 0.4,
+            }) + "\n")
+
+        transport = CassetteTransport(path, replay_latency=True, latency_scale=0.5)
+        transport.handle_request(httpx.Request("GET", "https://api.notion.com/v1/pages/page1"))
+
+        mock_sleep.assert_called_once_with(0.2)
+
+
+class TestReplayBenchmark:
+    """Test the replay benchmark's command line and replay environment"""
+
+    def test_parses_documented_usage(self):
+        args = replay_benchmark.parse_args([
+            "rollover.jsonl.gz", "--script", "weekly", "--config", "notion_config.yaml", "--latency",
+            "--", "--now", "2025-01-04T09:00:00Z",
+        ])
+
+        assert args.cassette == "rollover.jsonl.gz"
+        assert args.script == "weekly"
+        assert args.latency
+        assert args.extra_args == ["--now", "2025-01-04T09:00:00Z"]
+
+    def test_no_pass_through_arguments(self):
+        assert replay_benchmark.parse_args(["c.jsonl.gz"]).extra_args == []
+
+    @patch('replay_benchmark.subprocess.run')
+    def test_replays_without_rate_limiting(self, mock_run, monkeypatch):
+        """Replays don't pace calls or touch the host's shared limiter ledger"""
+        monkeypatch.setenv("NOTION_RATE_LIMIT_MODE", "shared")
+
+        replay_benchmark.run_replay("c.jsonl.gz", "weekly", "cfg.yaml", False, ["--now", "2025-01-04"])
+
+        env = mock_run.call_args.kwargs["env"]
+        assert env["NOTION_RATE_LIMIT_MODE"] == "none"
+        assert env["NOTION_CASSETTE_MODE"] == "replay"
+        assert mock_run.call_args.args[0][-2:] == ["--now", "2025-01-04"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,1466 @@
+"""
+Tests for utils/notion_client.py
+
+These tests verify the rate-limited Notion client wrapper, including:
+- Token bucket, fixed-spacing and adaptive (AIMD) rate limiters
+- Cross-process shared rate limiter
+- Sliding-window call budget
+- Bounded-concurrency request executor
+- Rate limiter selection by mode
+- Retry wrapper wiring and Retry-After handling
+- Retry policy for transient errors (5xx, timeouts, connection resets)
+- Per-endpoint call stats and latency histograms
+- JSON-lines call tracing
+- Process-wide pooled HTTP transport
+- Database schema TTL cache
+- Single-flight coalescing of identical reads
+- Paginating iterator with prefetch
+- Run-wide deadline for rate-limit waits and retry sleeps
+- Circuit breaker for Notion outages
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import httpx
+import pytest
+from unittest.mock import patch, MagicMock
+from notion_client.errors import APIResponseError, RequestTimeoutError
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils import notion_client
+from utils.fake_notion import FakeNotion
+from utils.notion_client import (
+    AdaptiveRateLimiter,
+    CircuitBreaker,
+    CircuitOpenError,
+    ClientStats,
+    ConcurrentRequestExecutor,
+    DeadlineExceeded,
+    PageCache,
+    PageUpdateBuffer,
+    ProactiveRateLimiter,
+    TokenBucketRateLimiter,
+    RateLimitedNotionClient,
+    RetryPolicy,
+    SchemaCache,
+    SharedFileRateLimiter,
+    SharedHTTPTransport,
+    SingleFlight,
+    SlidingWindowCallBudget,
+    TraceSink,
+    UnthrottledRateLimiter,
+    create_rate_limiter,
+    create_rate_limited_client,
+    get_rate_limiter,
+    get_retry_after,
+    get_run_deadline,
+    get_shared_transport,
+    paginate,
+    run_deadline,
+    set_shared_transport,
+    with_retry,
+    RATE_LIMIT_MODE_ADAPTIVE,
+    RATE_LIMIT_MODE_FIXED,
+    RATE_LIMIT_MODE_NONE,
+    RATE_LIMIT_MODE_SHARED,
+    RATE_LIMIT_MODE_TOKEN_BUCKET,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_global_state(monkeypatch):
+    """Keep one test's calls from using up the process-wide budget, filling the schema cache or tripping the circuit breaker for the next"""
+    monkeypatch.setattr(notion_client, "_global_call_budget", SlidingWindowCallBudget())
+    monkeypatch.setattr(notion_client, "_global_schema_cache", SchemaCache())
+    monkeypatch.setattr(notion_client, "_global_circuit_breaker", CircuitBreaker())
+
+
+class TestTokenBucketRateLimiter:
+    """Test the token bucket rate limiter"""
+
+    @patch('utils.notion_client.time')
+    def test_burst_up_to_capacity_without_waiting(self, mock_time):
+        """A full bucket lets `capacity` calls through immediately"""
+        mock_time.monotonic.return_value = 100.0
+        limiter = TokenBucketRateLimiter(rate=2.0, capacity=5)
+
+        for _ in range(5):
+            limiter.wait_if_needed()
+
+        mock_time.sleep.assert_not_called()
+
+    @patch('utils.notion_client.time')
+    def test_waits_for_refill_when_empty(self, mock_time):
+        """Calls beyond the burst wait 1/rate seconds each"""
+        mock_time.monotonic.return_value = 100.0
+        limiter = TokenBucketRateLimiter(rate=2.0, capacity=2)
+
+        limiter.wait_if_needed()
+        limiter.wait_if_needed()
+        limiter.wait_if_needed()
+        limiter.wait_if_needed()
+
+        waits = [c.args[0] for c in mock_time.sleep.call_args_list]
+        assert waits == pytest.approx([0.5, 1.0])
+
+    @patch('utils.notion_client.time')
+    def test_refills_over_time(self, mock_time):
+        """Tokens are refilled at `rate` per second up to capacity"""
+        mock_time.monotonic.return_value = 100.0
+        limiter = TokenBucketRateLimiter(rate=2.0, capacity=3)
+        for _ in range(3):
+            limiter.wait_if_needed()
+
+        # One second later two tokens are back
+        mock_time.monotonic.return_value = 101.0
+        limiter.wait_if_needed()
+        limiter.wait_if_needed()
+        mock_time.sleep.assert_not_called()
+
+        limiter.wait_if_needed()
+        mock_time.sleep.assert_called_once()
+
+    @patch('utils.notion_client.time')
+    def test_refill_capped_at_capacity(self, mock_time):
+        """A long idle period doesn't accumulate more than `capacity` tokens"""
+        mock_time.monotonic.return_value = 100.0
+        limiter = TokenBucketRateLimiter(rate=2.0, capacity=2)
+
+        mock_time.monotonic.return_value = 1000.0
+        for _ in range(3):
+            limiter.wait_if_needed()
+
+        mock_time.sleep.assert_called_once()
+
+    @patch('utils.notion_client.time')
+    def test_pause_holds_back_calls(self, mock_time):
+        """A paused bucket makes the next caller wait out the pause"""
+        mock_time.monotonic.return_value = 100.0
+        limiter = TokenBucketRateLimiter(rate=2.0, capacity=5)
+
+        limiter.pause(3.0)
+        limiter.wait_if_needed()
+        limiter.wait_if_needed()
+
+        waits = [c.args[0] for c in mock_time.sleep.call_args_list]
+        # First call waits out the pause, the second one also waits for a refill
+        assert waits == pytest.approx([3.0, 3.5])
+
+    def test_invalid_configuration(self):
+        """Rate and capacity are validated"""
+        with pytest.raises(ValueError):
+            TokenBucketRateLimiter(rate=0)
+        with pytest.raises(ValueError):
+            TokenBucketRateLimiter(capacity=0)
+
+
+class TestProactiveRateLimiter:
+    """Test the fixed-spacing rate limiter"""
+
+    @patch('utils.notion_client.time')
+    def test_pause_delays_next_call(self, mock_time):
+        mock_time.time.return_value = 100.0
+        limiter = ProactiveRateLimiter(min_delay=0.35)
+
+        limiter.pause(2.0)
+        limiter.wait_if_needed()
+
+        mock_time.sleep.assert_called_once()
+        assert mock_time.sleep.call_args.args[0] == pytest.approx(2.0)
+
+
+class TestAdaptiveRateLimiter:
+    """Test the AIMD adaptive rate limiter"""
+
+    def make_limiter(self, **kwargs):
+        options = dict(initial_rate=2.0, min_rate=0.5, max_rate=3.0, increase_step=0.5,
+                       decrease_factor=0.5, latency_threshold=2.0, decrease_cooldown=1.0)
+        options.update(kwargs)
+        return AdaptiveRateLimiter(**options)
+
+    def test_additive_increase_on_success(self):
+        limiter = self.make_limiter()
+
+        limiter.record_success(0.2)
+        limiter.record_success(0.2)
+
+        assert limiter.rate == pytest.approx(3.0)
+
+    def test_increase_capped_at_max_rate(self):
+        limiter = self.make_limiter()
+        for _ in range(10):
+            limiter.record_success(0.2)
+
+        assert limiter.rate == pytest.approx(3.0)
+        # Only actual changes are recorded
+        assert len(limiter.history) == 2
+
+    def test_multiplicative_decrease_on_rate_limit(self):
+        limiter = self.make_limiter()
+
+        limiter.record_rate_limited()
+
+        assert limiter.rate == pytest.approx(1.0)
+        assert limiter.history[-1]["reason"] == "rate_limited"
+        assert limiter.history[-1]["previous_rate"] == pytest.approx(2.0)
+
+    def test_decrease_on_latency_spike(self):
+        limiter = self.make_limiter()
+
+        limiter.record_success(5.0)
+
+        assert limiter.rate == pytest.approx(1.0)
+        assert limiter.history[-1]["reason"] == "latency"
+
+    @patch('utils.notion_client.time')
+    def test_decrease_cooldown(self, mock_time):
+        """Several 429s from one congestion event only cut the rate once"""
+        mock_time.monotonic.return_value = 100.0
+        mock_time.time.return_value = 1000.0
+        limiter = self.make_limiter()
+
+        limiter.record_rate_limited()
+        limiter.record_rate_limited()
+        assert limiter.rate == pytest.approx(1.0)
+
+        mock_time.monotonic.return_value = 102.0
+        limiter.record_rate_limited()
+        assert limiter.rate == pytest.approx(0.5)
+
+        # Never below the floor
+        mock_time.monotonic.return_value = 104.0
+        limiter.record_rate_limited()
+        assert limiter.rate == pytest.approx(0.5)
+
+    def test_invalid_configuration(self):
+        with pytest.raises(ValueError):
+            self.make_limiter(initial_rate=5.0)
+        with pytest.raises(ValueError):
+            self.make_limiter(decrease_factor=1.5)
+
+    @patch('utils.notion_client.time.sleep')
+    def test_with_retry_feeds_back_results(self, mock_sleep):
+        limiter = self.make_limiter()
+        func = MagicMock(side_effect=[make_rate_limited_error({"Retry-After": "1"}), "ok"], __name__="func")
+
+        assert with_retry(func, rate_limiter=limiter)() == "ok"
+
+        reasons = [entry["reason"] for entry in limiter.history]
+        assert reasons == ["rate_limited", "increase"]
+        assert limiter.rate == pytest.approx(1.5)
+
+
+class TestSharedFileRateLimiter:
+    """Test the cross-process rate limiter backed by a lock file and ledger"""
+
+    @patch('utils.notion_client.time')
+    def test_instances_share_one_budget(self, mock_time, tmp_path):
+        """Two limiters on the same ledger (i.e. two processes) share the bucket"""
+        mock_time.time.return_value = 1000.0
+        ledger = str(tmp_path / "ledger.json")
+        first = SharedFileRateLimiter(path=ledger, rate=2.0, capacity=3)
+        second = SharedFileRateLimiter(path=ledger, rate=2.0, capacity=3)
+
+        first.wait_if_needed()
+        first.wait_if_needed()
+        second.wait_if_needed()
+        mock_time.sleep.assert_not_called()
+
+        second.wait_if_needed()
+        mock_time.sleep.assert_called_once()
+        assert mock_time.sleep.call_args.args[0] == pytest.approx(0.5)
+
+    @patch('utils.notion_client.time')
+    def test_pause_is_shared(self, mock_time, tmp_path):
+        """A 429 pause recorded by one process holds back the others"""
+        mock_time.time.return_value = 1000.0
+        ledger = str(tmp_path / "ledger.json")
+        first = SharedFileRateLimiter(path=ledger, rate=2.0, capacity=3)
+        second = SharedFileRateLimiter(path=ledger, rate=2.0, capacity=3)
+
+        first.pause(4.0)
+        second.wait_if_needed()
+
+        assert mock_time.sleep.call_args.args[0] == pytest.approx(4.0)
+
+    @patch('utils.notion_client.time')
+    def test_corrupt_ledger_starts_full(self, mock_time, tmp_path):
+        mock_time.time.return_value = 1000.0
+        ledger = tmp_path / "ledger.json"
+        ledger.write_text("not json")
+        limiter = SharedFileRateLimiter(path=str(ledger), rate=2.0, capacity=2)
+
+        limiter.wait_if_needed()
+        limiter.wait_if_needed()
+
+        mock_time.sleep.assert_not_called()
+        assert json.loads(ledger.read_text())["tokens"] == pytest.approx(0.0)
+
+    def test_create_shared(self):
+        assert isinstance(create_rate_limiter(RATE_LIMIT_MODE_SHARED), SharedFileRateLimiter)
+
+
+class TestSlidingWindowCallBudget:
+    """Test the sliding-window call ledger"""
+
+    @patch('utils.notion_client.time')
+    def test_calls_within_budget_do_not_wait(self, mock_time):
+        mock_time.monotonic.return_value = 100.0
+        budget = SlidingWindowCallBudget(limits=((3, 10.0), (5, 60.0)))
+
+        for _ in range(3):
+            budget.acquire()
+
+        mock_time.sleep.assert_not_called()
+        assert budget.remaining() == 0
+        assert budget.status() == [
+            {"window": 10.0, "limit": 3, "used": 3, "remaining": 0},
+            {"window": 60.0, "limit": 5, "used": 3, "remaining": 2},
+        ]
+
+    @patch('utils.notion_client.time')
+    def test_waits_for_oldest_call_to_expire(self, mock_time):
+        """A full window waits until its oldest call slides out"""
+        clock = {"now": 100.0}
+        mock_time.monotonic.side_effect = lambda: clock["now"]
+        mock_time.sleep.side_effect = lambda seconds: clock.__setitem__("now", clock["now"] + seconds)
+        budget = SlidingWindowCallBudget(limits=((2, 10.0),))
+
+        budget.acquire()
+        clock["now"] = 104.0
+        budget.acquire()
+        budget.acquire()
+
+        mock_time.sleep.assert_called_once()
+        assert mock_time.sleep.call_args.args[0] == pytest.approx(6.0)
+        assert clock["now"] == pytest.approx(110.0)
+
+    @patch('utils.notion_client.time')
+    def test_long_window_enforced(self, mock_time):
+        """The 15-minute style window is enforced even when the short one has room"""
+        clock = {"now": 0.0}
+        mock_time.monotonic.side_effect = lambda: clock["now"]
+        mock_time.sleep.side_effect = lambda seconds: clock.__setitem__("now", clock["now"] + seconds)
+        budget = SlidingWindowCallBudget(limits=((2, 1.0), (4, 100.0)))
+
+        for i in range(4):
+            clock["now"] = i * 5.0
+            budget.acquire()
+        clock["now"] = 20.0
+        budget.acquire()
+
+        assert clock["now"] == pytest.approx(100.0)
+        assert budget.status()[1]["used"] == 4
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            SlidingWindowCallBudget(limits=())
+        with pytest.raises(ValueError):
+            SlidingWindowCallBudget(limits=((0, 10.0),))
+
+    def test_default_limits_match_notion(self):
+        assert SlidingWindowCallBudget().limits[-1] == (2700, 900.0)
+
+    def test_with_retry_records_each_attempt(self):
+        budget = MagicMock()
+        func = MagicMock(side_effect=[make_rate_limited_error({"Retry-After": "0"}), "ok"], __name__="func")
+
+        with patch('utils.notion_client.time.sleep'):
+            assert with_retry(func, rate_limiter=MagicMock(), call_budget=budget)() == "ok"
+
+        assert budget.acquire.call_count == 2
+
+    def test_client_reports_remaining_budget(self):
+        budget = SlidingWindowCallBudget(limits=((10, 60.0),))
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock(), call_budget=budget)
+
+        with patch.object(client._client.databases, 'retrieve', return_value={}):
+            client.databases.retrieve(database_id="db-id")
+
+        assert client.call_budget is budget
+        assert client.remaining_budget() == 9
+
+
+class TestConcurrentRequestExecutor:
+    """Test overlapping request latency with rate spacing"""
+
+    def test_fixed_limiter_reserves_consecutive_slots(self):
+        """Concurrent callers get consecutive slots instead of queueing on the lock"""
+        limiter = ProactiveRateLimiter(min_delay=0.35)
+        with patch('utils.notion_client.time') as mock_time:
+            mock_time.time.return_value = 100.0
+            waits = [limiter.reserve() for _ in range(3)]
+
+        assert waits == pytest.approx([0.0, 0.35, 0.70])
+
+    def test_requests_overlap_while_starts_are_spaced(self):
+        limiter = TokenBucketRateLimiter(rate=20.0, capacity=1)
+        budget = SlidingWindowCallBudget(limits=((1000, 60.0),))
+        start_times = []
+        lock = threading.Lock()
+
+        def slow_call(i):
+            with lock:
+                start_times.append(time.monotonic())
+            time.sleep(0.2)
+            return i
+
+        call = with_retry(slow_call, rate_limiter=limiter, call_budget=budget)
+        started = time.monotonic()
+        with ConcurrentRequestExecutor(max_workers=4) as executor:
+            results = list(executor.map(call, range(8)))
+        elapsed = time.monotonic() - started
+
+        assert results == list(range(8))
+        start_times.sort()
+        gaps = [b - a for a, b in zip(start_times, start_times[1:])]
+        assert all(gap >= 0.04 for gap in gaps)
+        # Serially this would take 8 * (0.05 + 0.2) = 2s
+        assert elapsed < 1.2
+
+    def test_default_worker_count(self):
+        with ConcurrentRequestExecutor() as executor:
+            assert executor._max_workers == notion_client.MAX_CONCURRENT_REQUESTS
+
+
+class TestRateLimiterSelection:
+    """Test rate limiter creation and mode selection"""
+
+    def test_create_token_bucket(self):
+        assert isinstance(create_rate_limiter(RATE_LIMIT_MODE_TOKEN_BUCKET), TokenBucketRateLimiter)
+
+    def test_create_fixed(self):
+        """The original single-delay behavior is still available"""
+        assert isinstance(create_rate_limiter(RATE_LIMIT_MODE_FIXED), ProactiveRateLimiter)
+
+    def test_create_adaptive(self):
+        assert isinstance(create_rate_limiter(RATE_LIMIT_MODE_ADAPTIVE), AdaptiveRateLimiter)
+
+    def test_create_unthrottled(self):
+        limiter = create_rate_limiter(RATE_LIMIT_MODE_NONE)
+        assert isinstance(limiter, UnthrottledRateLimiter)
+        assert limiter.reserve() == 0.0
+
+    def test_unthrottled_client_skips_call_budget(self):
+        """Replays shouldn't wait on the global call budget either"""
+        client = create_rate_limited_client(auth="test-token", rate_limit_mode=RATE_LIMIT_MODE_NONE)
+        assert client.call_budget is not notion_client._global_call_budget
+        for _ in range(100):
+            assert client.call_budget.try_acquire() == 0.0
+
+    def test_create_unknown_mode(self):
+        with pytest.raises(ValueError, match="Unknown rate limit mode"):
+            create_rate_limiter("bogus")
+
+    def test_default_mode_returns_global_limiter(self):
+        assert get_rate_limiter() is notion_client._global_rate_limiter
+        assert isinstance(get_rate_limiter(), TokenBucketRateLimiter)
+
+    def test_same_mode_shares_limiter(self):
+        assert get_rate_limiter(RATE_LIMIT_MODE_FIXED) is get_rate_limiter(RATE_LIMIT_MODE_FIXED)
+
+    def test_client_uses_selected_limiter(self):
+        client = create_rate_limited_client(auth="test-token", rate_limit_mode=RATE_LIMIT_MODE_FIXED)
+        assert client.rate_limiter is get_rate_limiter(RATE_LIMIT_MODE_FIXED)
+
+    def test_client_defaults_to_global_limiter(self):
+        client = RateLimitedNotionClient(auth="test-token")
+        assert client.rate_limiter is notion_client._global_rate_limiter
+
+
+class TestWithRetry:
+    """Test the retry wrapper"""
+
+    def test_waits_on_given_limiter(self):
+        limiter = MagicMock()
+        func = MagicMock(return_value="ok", __name__="func")
+
+        result = with_retry(func, rate_limiter=limiter)(1, a=2)
+
+        assert result == "ok"
+        limiter.wait_if_needed.assert_called_once()
+        func.assert_called_once_with(1, a=2)
+
+    def test_decorator_without_arguments_uses_global_limiter(self):
+        with patch.object(notion_client, '_global_rate_limiter') as mock_limiter:
+            @with_retry
+            def func():
+                return "ok"
+
+            assert func() == "ok"
+            mock_limiter.wait_if_needed.assert_called_once()
+
+    def test_endpoint_calls_go_through_client_limiter(self):
+        limiter = MagicMock()
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=limiter)
+
+        with patch.object(client._client.databases, 'retrieve', return_value={"properties": {}}) as mock_retrieve:
+            result = client.databases.retrieve(database_id="db-id")
+
+        assert result == {"properties": {}}
+        mock_retrieve.assert_called_once_with(database_id="db-id")
+        limiter.wait_if_needed.assert_called_once()
+
+
+def make_rate_limited_error(headers=None):
+    """Build the APIResponseError notion_client raises for a 429"""
+    response = httpx.Response(
+        429,
+        headers=headers or {},
+        json={"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"},
+    )
+    return APIResponseError(response, "Rate limited", "rate_limited")
+
+
+def make_api_error(status, code):
+    response = httpx.Response(status, json={"object": "error", "status": status, "code": code, "message": code})
+    return APIResponseError(response, code, code)
+
+
+class TestRetryAfter:
+    """Test Retry-After handling on 429 responses"""
+
+    def test_parses_seconds(self):
+        assert get_retry_after(make_rate_limited_error({"Retry-After": "3"})) == 3.0
+
+    def test_parses_http_date(self):
+        with patch('utils.notion_client.datetime') as mock_datetime:
+            from datetime import datetime, timezone
+            mock_datetime.now.return_value = datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc)
+            error = make_rate_limited_error({"Retry-After": "Mon, 15 Jan 2024 12:00:05 GMT"})
+            assert get_retry_after(error) == pytest.approx(5.0)
+
+    def test_missing_or_invalid_header(self):
+        assert get_retry_after(make_rate_limited_error()) is None
+        assert get_retry_after(make_rate_limited_error({"Retry-After": "soon"})) is None
+
+    def test_negative_is_clamped(self):
+        assert get_retry_after(make_rate_limited_error({"Retry-After": "-2"})) == 0.0
+
+    @patch('utils.notion_client.time.sleep')
+    def test_sleeps_retry_after_and_pauses_limiter(self, mock_sleep):
+        limiter = MagicMock()
+        func = MagicMock(side_effect=[make_rate_limited_error({"Retry-After": "7"}), "ok"], __name__="func")
+
+        assert with_retry(func, rate_limiter=limiter)() == "ok"
+
+        mock_sleep.assert_called_once_with(7.0)
+        limiter.pause.assert_called_once_with(7.0)
+        assert func.call_count == 2
+
+    @patch('utils.notion_client.time.sleep')
+    def test_falls_back_to_exponential_backoff(self, mock_sleep):
+        limiter = MagicMock()
+        func = MagicMock(
+            side_effect=[make_rate_limited_error(), make_rate_limited_error(), "ok"],
+            __name__="func",
+        )
+
+        assert with_retry(func, rate_limiter=limiter, retry_policy=RetryPolicy(jitter=False))() == "ok"
+
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
+
+    @patch('utils.notion_client.time.sleep')
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        func = MagicMock(side_effect=make_rate_limited_error({"Retry-After": "1"}), __name__="func")
+
+        with pytest.raises(APIResponseError):
+            with_retry(func, rate_limiter=MagicMock())()
+
+        assert func.call_count == notion_client.MAX_RETRIES
+
+    @patch('utils.notion_client.time.sleep')
+    def test_other_api_errors_are_not_retried(self, mock_sleep):
+        func = MagicMock(side_effect=make_api_error(404, "object_not_found"), __name__="func")
+
+        with pytest.raises(APIResponseError):
+            with_retry(func, rate_limiter=MagicMock())()
+
+        func.assert_called_once()
+        mock_sleep.assert_not_called()
+
+
+class TestClientStats:
+    """Test per-endpoint call counts, latency histograms and wait times"""
+
+    def test_histogram_buckets(self):
+        stats = ClientStats(buckets=(0.5, 1.0))
+        stats.record_call("pages.update", 0.2)
+        stats.record_call("pages.update", 0.7)
+        stats.record_call("pages.update", 3.0, error=True)
+
+        entry = stats.snapshot()["methods"]["pages.update"]
+
+        assert entry["calls"] == 3
+        assert entry["errors"] == 1
+        assert entry["max_latency"] == 3.0
+        assert entry["mean_latency"] == pytest.approx(1.3)
+        assert entry["histogram"] == {"<=0.5s": 1, "<=1s": 1, ">1s": 1}
+
+    def test_client_records_calls_by_endpoint_method(self):
+        stats = ClientStats()
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock(), stats=stats)
+
+        with patch.object(client._client.databases, 'query', return_value={}), \
+                patch.object(client._client.pages, 'create', return_value={}):
+            client.databases.query(database_id="db-id")
+            client.databases.query(database_id="db-id")
+            client.pages.create(parent={}, properties={})
+
+        methods = stats.snapshot()["methods"]
+        assert client.stats is stats
+        assert methods["databases.query"]["calls"] == 2
+        assert methods["pages.create"]["calls"] == 1
+
+    def test_records_rate_limits_and_retry_sleep(self):
+        stats = ClientStats()
+        func = MagicMock(side_effect=[make_rate_limited_error({"Retry-After": "3"}), "ok"], __name__="func")
+
+        with patch('utils.notion_client.time.sleep'):
+            with_retry(func, rate_limiter=MagicMock(), stats=stats, name="pages.update")()
+
+        snapshot = stats.snapshot()
+        assert snapshot["rate_limited"] == 1
+        assert snapshot["retry_sleep"] == 3.0
+        assert snapshot["methods"]["pages.update"]["calls"] == 2
+        assert snapshot["methods"]["pages.update"]["errors"] == 1
+
+    def test_records_limiter_wait(self):
+        stats = ClientStats()
+        limiter = MagicMock()
+        limiter.wait_if_needed.side_effect = lambda: time.sleep(0.05)
+
+        with_retry(MagicMock(return_value="ok", __name__="func"), rate_limiter=limiter, stats=stats)()
+
+        assert stats.snapshot()["limiter_wait"] >= 0.05
+
+    def test_summary_lists_methods(self):
+        stats = ClientStats()
+        stats.record_call("databases.query", 0.4)
+        stats.record_rate_limited()
+
+        summary = stats.summary()
+
+        assert "1 calls" in summary
+        assert "1 rate limited" in summary
+        assert "databases.query: 1 calls (0 failed)" in summary
+
+    def test_reset(self):
+        stats = ClientStats()
+        stats.record_call("databases.query", 0.4)
+        stats.reset()
+        assert stats.snapshot()["methods"] == {}
+
+
+class TestTraceSink:
+    """Test the JSON-lines trace of API calls"""
+
+    def read_events(self, path):
+        with open(path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_records_call(self, tmp_path):
+        sink = TraceSink(str(tmp_path / "trace.jsonl"))
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock(), trace_sink=sink)
+        response = {"object": "list", "results": [{"id": "page1"}, {"id": "page2"}], "has_more": False}
+
+        def get_tasks():
+            return client.databases.query(database_id="db-id", filter={"property": "Done", "checkbox": {"equals": False}})
+
+        with patch.object(client._client.databases, 'query', return_value=response):
+            get_tasks()
+
+        event, = self.read_events(sink.path)
+        assert event["method"] == "databases.query"
+        assert event["caller"] == "test_notion_client.get_tasks"
+        assert event["target"] == "db-id"
+        assert event["params"] == {"database_id": "str", "filter": {"property": "str", "checkbox": {"equals": "bool"}}}
+        assert event["result_count"] == 2
+        assert event["response_bytes"] == len(json.dumps(response))
+        assert event["retries"] == 0
+        assert event["status"] == "ok"
+
+    def test_identical_calls_share_params_hash(self, tmp_path):
+        sink = TraceSink(str(tmp_path / "trace.jsonl"))
+        func = MagicMock(return_value={}, __name__="retrieve")
+        traced = with_retry(func, rate_limiter=MagicMock(), trace_sink=sink)
+
+        traced(page_id="page1")
+        traced(page_id="page1")
+        traced(page_id="page2")
+
+        hashes = [event["params_hash"] for event in self.read_events(sink.path)]
+        assert hashes[0] == hashes[1] != hashes[2]
+
+    def test_records_retries_and_failure(self, tmp_path):
+        sink = TraceSink(str(tmp_path / "trace.jsonl"))
+        func = MagicMock(
+            side_effect=[make_rate_limited_error({"Retry-After": "2"}), make_api_error(404, "object_not_found")],
+            __name__="retrieve",
+        )
+
+        with patch('utils.notion_client.time.sleep'):
+            with pytest.raises(APIResponseError):
+                with_retry(func, rate_limiter=MagicMock(), trace_sink=sink)(page_id="missing")
+
+        event, = self.read_events(sink.path)
+        assert event["retries"] == 1
+        assert event["retry_sleep"] == 2.0
+        assert event["status"] == "APIResponseError"
+
+    def test_tracing_off_by_default(self):
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock())
+        assert client.trace_sink is None
+
+    def test_worker_thread_calls_traced_to_submitting_function(self, tmp_path):
+        """Prefetched pages, executor calls and buffered writes name the function that queued them"""
+        sink = TraceSink(str(tmp_path / "trace.jsonl"))
+        responses = {
+            None: {"results": [{"id": "a"}], "has_more": True, "next_cursor": "c1"},
+            "c1": {"results": [{"id": "b"}], "has_more": False},
+        }
+        query = with_retry(
+            MagicMock(side_effect=lambda start_cursor=None, **kwargs: responses[start_cursor], __name__="query"),
+            rate_limiter=MagicMock(), trace_sink=sink, name="databases.query",
+        )
+        update = with_retry(MagicMock(return_value={}, __name__="update"), rate_limiter=MagicMock(), trace_sink=sink, name="pages.update")
+        pages = MagicMock()
+        pages.update = update
+
+        def scan_tasks():
+            return list(paginate(query, prefetch=True, database_id="db-id"))
+
+        def update_tasks():
+            with ConcurrentRequestExecutor() as executor:
+                executor.submit(update, page_id="a").result()
+
+        def queue_updates():
+            buffer = PageUpdateBuffer(pages)
+            buffer.update(page_id="b", properties={})
+            return buffer
+
+        scan_tasks()
+        update_tasks()
+        buffer = queue_updates()
+        buffer.flush()
+
+        callers = [(event["method"], event["caller"]) for event in self.read_events(sink.path)]
+        assert callers == [
+            ("databases.query", "test_notion_client.scan_tasks"),
+            ("databases.query", "test_notion_client.scan_tasks"),
+            ("pages.update", "test_notion_client.update_tasks"),
+            ("pages.update", "test_notion_client.queue_updates"),
+        ]
+
+
+class TestSharedHTTPTransport:
+    """Test the process-wide pooled transport"""
+
+    def test_clients_share_one_transport(self):
+        first = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock())
+        second = create_rate_limited_client(auth="test-token")
+
+        assert first._client.client._transport is get_shared_transport()
+        assert second._client.client._transport is get_shared_transport()
+
+    def test_pool_tuning(self):
+        pool = SharedHTTPTransport(http2=False)._pool
+
+        assert pool._max_connections == notion_client.HTTP_MAX_CONNECTIONS
+        assert pool._keepalive_expiry == notion_client.HTTP_KEEPALIVE_EXPIRY
+
+    def test_closing_a_client_keeps_pool_open(self):
+        transport = SharedHTTPTransport(http2=False)
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock(), transport=transport)
+
+        with patch.object(httpx.HTTPTransport, 'close') as mock_close:
+            client.close()
+            mock_close.assert_not_called()
+            transport.shutdown()
+            mock_close.assert_called_once()
+
+    def test_requests_go_through_given_transport(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"object": "page", "id": "page1"})
+
+        client = RateLimitedNotionClient(
+            auth="test-token", rate_limiter=MagicMock(), transport=httpx.MockTransport(handler)
+        )
+
+        assert client.pages.retrieve(page_id="page1")["id"] == "page1"
+        assert requests[0].url.path == "/v1/pages/page1"
+
+    def test_http2_falls_back_without_h2(self):
+        with patch('utils.notion_client.importlib.util.find_spec', return_value=None):
+            assert notion_client._transport_options(True)["http2"] is False
+
+    def test_set_shared_transport_shuts_down_previous(self):
+        previous = get_shared_transport()
+        replacement = SharedHTTPTransport(http2=False)
+
+        with patch.object(previous, 'shutdown') as mock_shutdown:
+            set_shared_transport(replacement)
+            assert get_shared_transport() is replacement
+            mock_shutdown.assert_called_once()
+        set_shared_transport(None)
+
+
+class TestSchemaCache:
+    """Test the databases.retrieve TTL cache"""
+
+    def make_client(self, cache=None):
+        return RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock(), schema_cache=cache or SchemaCache())
+
+    def test_repeat_retrieves_served_from_cache(self):
+        client = self.make_client()
+        database = {"id": "db-id", "properties": {"Category": {"type": "select"}}}
+
+        with patch.object(client._client.databases, 'retrieve', return_value=database) as mock_retrieve:
+            first = client.databases.retrieve(database_id="db-id")
+            second = client.databases.retrieve(database_id="db-id")
+
+        assert first == second == database
+        mock_retrieve.assert_called_once()
+        assert client.schema_cache.hits == 1
+
+    def test_cached_copy_is_not_shared(self):
+        client = self.make_client()
+
+        with patch.object(client._client.databases, 'retrieve', return_value={"properties": {}}):
+            client.databases.retrieve(database_id="db-id")["properties"]["Added"] = {}
+            assert client.databases.retrieve(database_id="db-id") == {"properties": {}}
+
+    def test_entries_expire(self):
+        client = self.make_client(SchemaCache(ttl=60.0))
+
+        clock = {"now": 0.0}
+
+        with patch.object(client._client.databases, 'retrieve', return_value={"properties": {}}) as mock_retrieve, \
+                patch('utils.notion_client.time.monotonic', side_effect=lambda: clock["now"]):
+            client.databases.retrieve(database_id="db-id")
+            clock["now"] = 30.0
+            client.databases.retrieve(database_id="db-id")
+            clock["now"] = 61.0
+            client.databases.retrieve(database_id="db-id")
+
+        assert mock_retrieve.call_count == 2
+
+    def test_update_refreshes_entry(self):
+        client = self.make_client()
+        updated = {"properties": {"Category": {"type": "select", "select": {"options": [{"name": "New"}]}}}}
+
+        with patch.object(client._client.databases, 'retrieve', return_value={"properties": {}}) as mock_retrieve, \
+                patch.object(client._client.databases, 'update', return_value=updated):
+            client.databases.retrieve(database_id="db-id")
+            client.databases.update(database_id="db-id", properties={})
+            assert client.databases.retrieve(database_id="db-id") == updated
+
+        mock_retrieve.assert_called_once()
+
+    def test_failed_update_invalidates_entry(self):
+        client = self.make_client()
+
+        with patch.object(client._client.databases, 'retrieve', return_value={"properties": {}}) as mock_retrieve, \
+                patch.object(client._client.databases, 'update', side_effect=make_api_error(400, "validation_error")):
+            client.databases.retrieve(database_id="db-id")
+            with pytest.raises(APIResponseError):
+                client.databases.update(database_id="db-id", properties={})
+            client.databases.retrieve(database_id="db-id")
+
+        assert mock_retrieve.call_count == 2
+
+    def test_explicit_invalidation(self):
+        cache = SchemaCache()
+        cache.set("db-1", {"id": "db-1"})
+        cache.set("db-2", {"id": "db-2"})
+
+        cache.invalidate("db-1")
+        assert cache.get("db-1") is None
+        assert cache.get("db-2") == {"id": "db-2"}
+
+        cache.invalidate()
+        assert cache.get("db-2") is None
+
+    def test_invalid_ttl(self):
+        with pytest.raises(ValueError):
+            SchemaCache(ttl=-1)
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical reads"""
+
+    def run_concurrently(self, calls):
+        with ConcurrentRequestExecutor(max_workers=len(calls)) as executor:
+            futures = [executor.submit(call) for call in calls]
+            return [future.result() for future in futures]
+
+    def blocking(self, release, result=None, error=None):
+        """Underlying call that stays in flight until released"""
+        calls = []
+
+        def call(**kwargs):
+            calls.append(kwargs)
+            release.wait(timeout=5)
+            if error is not None:
+                raise error
+            return result if result is not None else {"object": "list", "results": [kwargs], "has_more": False}
+
+        return call, calls
+
+    def test_identical_queries_share_one_request(self):
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock())
+        release = threading.Event()
+        query, calls = self.blocking(release)
+
+        def run_query():
+            return client.databases.query(database_id="db-id", filter={"property": "Done", "checkbox": {"equals": False}})
+
+        with patch.object(client._client.databases, 'query', side_effect=query):
+            threading.Timer(0.1, release.set).start()
+            results = self.run_concurrently([run_query, run_query, run_query])
+
+        assert len(calls) == 1
+        assert results[0] == results[1] == results[2]
+        assert results[0] is not results[1]
+        assert client.single_flight.coalesced == 2
+
+    def test_different_arguments_not_coalesced(self):
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock())
+        release = threading.Event()
+        query, calls = self.blocking(release)
+
+        with patch.object(client._client.databases, 'query', side_effect=query):
+            threading.Timer(0.1, release.set).start()
+            self.run_concurrently([
+                lambda: client.databases.query(database_id="db-id", start_cursor=None),
+                lambda: client.databases.query(database_id="db-id", start_cursor="cursor-2"),
+            ])
+
+        assert len(calls) == 2
+
+    def test_writes_never_coalesced(self):
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock())
+        release = threading.Event()
+        update, calls = self.blocking(release, result={"object": "page"})
+
+        def run_update():
+            return client.pages.update(page_id="page1", properties={"Done": {"checkbox": True}})
+
+        with patch.object(client._client.pages, 'update', side_effect=update):
+            threading.Timer(0.1, release.set).start()
+            self.run_concurrently([run_update, run_update])
+
+        assert len(calls) == 2
+        assert client.single_flight.coalesced == 0
+
+    def test_error_shared_with_waiters(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        call, calls = self.blocking(release, error=make_api_error(404, "object_not_found"))
+
+        def run():
+            try:
+                flights.do("key", call)
+            except APIResponseError as e:
+                return e.code
+
+        threading.Timer(0.1, release.set).start()
+        assert self.run_concurrently([run, run]) == ["object_not_found", "object_not_found"]
+        assert len(calls) == 1
+
+    def test_sequential_calls_not_coalesced(self):
+        flights = SingleFlight()
+        func = MagicMock(return_value="ok")
+
+        flights.do("key", func)
+        flights.do("key", func)
+
+        assert func.call_count == 2
+
+
+class TestPaginate:
+    """Test the paginating iterator"""
+
+    def pages(self, *batches):
+        """Responses for consecutive API pages of the given result batches"""
+        return [
+            {"results": batch, "has_more": i < len(batches) - 1, "next_cursor": f"cursor{i + 1}" if i < len(batches) - 1 else None}
+            for i, batch in enumerate(batches)
+        ]
+
+    def test_yields_results_across_pages(self):
+        query = MagicMock(side_effect=self.pages([1, 2], [3], [4, 5]))
+
+        assert list(paginate(query, database_id="db-id", filter={"x": 1})) == [1, 2, 3, 4, 5]
+
+        assert query.call_args_list[0].kwargs == {"database_id": "db-id", "filter": {"x": 1}}
+        assert query.call_args_list[1].kwargs == {"database_id": "db-id", "filter": {"x": 1}, "start_cursor": "cursor1"}
+        assert query.call_args_list[2].kwargs["start_cursor"] == "cursor2"
+
+    def test_stopping_early_skips_remaining_pages(self):
+        query = MagicMock(side_effect=self.pages([1, 2], [3]))
+
+        assert next(iter(paginate(query, database_id="db-id"))) == 1
+        query.assert_called_once()
+
+    def test_prefetch_overlaps_next_request(self):
+        fetched = threading.Event()
+        responses = self.pages([1], [2])
+
+        def query(**kwargs):
+            if "start_cursor" in kwargs:
+                fetched.set()
+            return responses.pop(0)
+
+        results = paginate(query, prefetch=True, database_id="db-id")
+
+        assert next(results) == 1
+        # The second page was requested while the first was still being consumed
+        assert fetched.wait(timeout=1)
+        assert list(results) == [2]
+
+    def test_prefetch_error_raised_to_caller(self):
+        query = MagicMock(side_effect=[self.pages([1], [2])[0], make_api_error(404, "object_not_found")])
+
+        with pytest.raises(APIResponseError):
+            list(paginate(query, prefetch=True, database_id="db-id"))
+
+    def test_empty_results(self):
+        query = MagicMock(return_value={"results": [], "has_more": False, "next_cursor": None})
+        assert list(paginate(query, prefetch=True, database_id="db-id")) == []
+
+
+class TestRetryPolicy:
+    """Test retries of transient errors other than 429"""
+
+    @patch('utils.notion_client.time.sleep')
+    def test_retries_transient_5xx(self, mock_sleep):
+        policy = RetryPolicy(jitter=False)
+        func = MagicMock(side_effect=[make_api_error(503, "service_unavailable"), make_api_error(502, "bad_gateway"), "ok"], __name__="func")
+
+        assert with_retry(func, rate_limiter=MagicMock(), retry_policy=policy)() == "ok"
+
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
+        assert policy.counters == {"http_503": 1, "http_502": 1}
+
+    @patch('utils.notion_client.time.sleep')
+    def test_5xx_does_not_pause_limiter(self, mock_sleep):
+        limiter = MagicMock()
+        func = MagicMock(side_effect=[make_api_error(500, "internal_server_error"), "ok"], __name__="func")
+
+        with_retry(func, rate_limiter=limiter, retry_policy=RetryPolicy())()
+
+        limiter.pause.assert_not_called()
+        limiter.record_rate_limited.assert_not_called()
+
+    @patch('utils.notion_client.time.sleep')
+    def test_retries_timeouts_and_connection_resets(self, mock_sleep):
+        policy = RetryPolicy()
+        func = MagicMock(
+            side_effect=[RequestTimeoutError(), httpx.ReadError("connection reset"), httpx.ConnectError("refused"), "ok"],
+            __name__="func",
+        )
+
+        assert with_retry(func, rate_limiter=MagicMock(), retry_policy=policy)() == "ok"
+
+        assert policy.counters == {"timeout": 1, "connection": 2}
+
+    @patch('utils.notion_client.time.sleep')
+    def test_non_retryable_status_is_raised(self, mock_sleep):
+        func = MagicMock(side_effect=make_api_error(400, "validation_error"), __name__="func")
+
+        with pytest.raises(APIResponseError):
+            with_retry(func, rate_limiter=MagicMock(), retry_policy=RetryPolicy())()
+
+        func.assert_called_once()
+
+    @patch('utils.notion_client.time.sleep')
+    def test_non_idempotent_calls_only_retry_when_safe(self, mock_sleep):
+        policy = RetryPolicy()
+        timeout = MagicMock(side_effect=RequestTimeoutError(), __name__="create")
+        server_error = MagicMock(side_effect=make_api_error(503, "service_unavailable"), __name__="create")
+        rate_limited = MagicMock(side_effect=[make_rate_limited_error(), "ok"], __name__="create")
+
+        with pytest.raises(RequestTimeoutError):
+            with_retry(timeout, rate_limiter=MagicMock(), retry_policy=policy, idempotent=False)()
+        with pytest.raises(APIResponseError):
+            with_retry(server_error, rate_limiter=MagicMock(), retry_policy=policy, idempotent=False)()
+        assert with_retry(rate_limited, rate_limiter=MagicMock(), retry_policy=policy, idempotent=False)() == "ok"
+
+        timeout.assert_called_once()
+        server_error.assert_called_once()
+
+    def test_client_marks_creates_non_idempotent(self):
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock())
+
+        with patch('utils.notion_client.with_retry') as mock_with_retry:
+            client.pages.create
+            client.pages.update
+
+        assert mock_with_retry.call_args_list[0].kwargs["idempotent"] is False
+        assert mock_with_retry.call_args_list[1].kwargs["idempotent"] is True
+        assert mock_with_retry.call_args_list[0].kwargs["retry_policy"] is client.retry_policy
+
+    @patch('utils.notion_client.time.sleep')
+    def test_full_jitter_stays_within_backoff(self, mock_sleep):
+        policy = RetryPolicy(initial_delay=1.0, max_delay=5.0)
+
+        for attempt in range(1, 6):
+            assert 0 <= policy.backoff(attempt) <= min(5.0, 2.0 ** (attempt - 1))
+
+    def test_gives_up_at_deadline(self):
+        clock = {"now": 0.0}
+
+        def sleep(seconds):
+            clock["now"] += seconds
+
+        policy = RetryPolicy(jitter=False, deadline=5.0)
+        func = MagicMock(side_effect=make_api_error(503, "service_unavailable"), __name__="func")
+
+        with patch('utils.notion_client.time.monotonic', side_effect=lambda: clock["now"]), \
+                patch('utils.notion_client.time.sleep', side_effect=sleep) as mock_sleep:
+            with pytest.raises(APIResponseError):
+                with_retry(func, rate_limiter=MagicMock(), call_budget=MagicMock(), retry_policy=policy)()
+
+        # Waits of 1s and 2s fit in the deadline; the next 4s wait would pass it
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
+        assert func.call_count == 3
+
+    def test_invalid_configuration(self):
+        with pytest.raises(ValueError):
+            RetryPolicy(max_retries=0)
+
+
+class TestRunDeadline:
+    """Test the run-wide deadline"""
+
+    def test_nested_deadline_never_extends_outer(self):
+        with run_deadline(10) as outer:
+            with run_deadline(60) as inner:
+                assert inner is outer
+            with run_deadline(5) as inner:
+                assert inner.seconds == 5
+            assert get_run_deadline() is outer
+        assert get_run_deadline() is None
+
+    @patch('utils.notion_client.time.sleep')
+    def test_retry_sleep_past_deadline_raises(self, mock_sleep):
+        func = MagicMock(side_effect=make_api_error(503, "service_unavailable"), __name__="func")
+        policy = RetryPolicy(initial_delay=30.0, jitter=False)
+
+        with run_deadline(10):
+            with pytest.raises(DeadlineExceeded) as excinfo:
+                with_retry(func, rate_limiter=MagicMock(), retry_policy=policy)()
+
+        mock_sleep.assert_not_called()
+        assert isinstance(excinfo.value.__cause__, APIResponseError)
+        assert "retry of func" in str(excinfo.value)
+
+    @patch('utils.notion_client.time.sleep')
+    def test_rate_limiter_wait_past_deadline_raises(self, mock_sleep):
+        limiter = TokenBucketRateLimiter(rate=0.01, capacity=1)
+        limiter.wait_if_needed()
+
+        with run_deadline(10):
+            with pytest.raises(DeadlineExceeded):
+                limiter.wait_if_needed()
+
+        mock_sleep.assert_not_called()
+
+    @patch('utils.notion_client.time.sleep')
+    def test_call_budget_wait_past_deadline_raises(self, mock_sleep):
+        budget = SlidingWindowCallBudget(limits=((1, 60.0),))
+        budget.acquire()
+
+        with run_deadline(10):
+            with pytest.raises(DeadlineExceeded):
+                budget.acquire()
+
+    def test_expired_deadline_stops_new_calls(self):
+        clock = {"now": 0.0}
+        func = MagicMock(return_value="ok", __name__="func")
+
+        with patch('utils.notion_client.time.monotonic', side_effect=lambda: clock["now"]):
+            with run_deadline(10):
+                assert with_retry(func, rate_limiter=MagicMock(), call_budget=MagicMock())() == "ok"
+                clock["now"] = 11.0
+                with pytest.raises(DeadlineExceeded):
+                    with_retry(func, rate_limiter=MagicMock(), call_budget=MagicMock())()
+
+        func.assert_called_once()
+
+
+class TestCircuitBreaker:
+    """Test failing fast while Notion is down"""
+
+    def trip(self, breaker, count=10):
+        for _ in range(count):
+            breaker.record_failure(make_api_error(503, "service_unavailable"))
+
+    def test_opens_at_failure_rate(self):
+        breaker = CircuitBreaker(failure_rate=0.5, window_size=10, min_calls=4)
+
+        breaker.record_success()
+        breaker.record_success()
+        self.trip(breaker, 1)
+        assert breaker.state == notion_client.CIRCUIT_CLOSED
+        self.trip(breaker, 1)
+
+        assert breaker.state == notion_client.CIRCUIT_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.allow()
+
+    def test_non_outage_errors_do_not_count(self):
+        breaker = CircuitBreaker(min_calls=2, window_size=2)
+
+        breaker.record_failure(make_api_error(400, "validation_error"))
+        breaker.record_failure(make_rate_limited_error())
+
+        assert breaker.status()["failure_rate"] == 0.0
+        assert breaker.state == notion_client.CIRCUIT_CLOSED
+
+    def test_half_open_trial_closes_or_reopens(self):
+        clock = {"now": 0.0}
+        with patch('utils.notion_client.time.monotonic', side_effect=lambda: clock["now"]):
+            breaker = CircuitBreaker(open_duration=30.0)
+            self.trip(breaker)
+            assert breaker.status()["retry_in"] == 30.0
+
+            clock["now"] = 30.0
+            assert breaker.state == notion_client.CIRCUIT_HALF_OPEN
+            breaker.allow()
+            with pytest.raises(CircuitOpenError):
+                breaker.allow()  # only one trial at a time
+            breaker.record_failure(httpx.ConnectError("refused"))
+            assert breaker.state == notion_client.CIRCUIT_OPEN
+
+            clock["now"] = 60.0
+            breaker.allow()
+            breaker.record_success()
+            assert breaker.state == notion_client.CIRCUIT_CLOSED
+
+    def test_open_breaker_fails_fast_without_waiting(self):
+        breaker = CircuitBreaker()
+        self.trip(breaker)
+        limiter = MagicMock()
+        func = MagicMock(__name__="func")
+
+        with pytest.raises(CircuitOpenError):
+            with_retry(func, rate_limiter=limiter, circuit_breaker=breaker)()
+
+        func.assert_not_called()
+        limiter.wait_if_needed.assert_not_called()
+
+    @patch('utils.notion_client.time.sleep')
+    def test_retries_stop_once_breaker_opens(self, mock_sleep):
+        breaker = CircuitBreaker(window_size=2, min_calls=2)
+        func = MagicMock(side_effect=make_api_error(503, "service_unavailable"), __name__="func")
+
+        with pytest.raises(CircuitOpenError):
+            with_retry(func, rate_limiter=MagicMock(), retry_policy=RetryPolicy(), circuit_breaker=breaker)()
+
+        assert func.call_count == 2
+
+    def test_client_uses_global_breaker_by_default(self):
+        client = RateLimitedNotionClient(auth="test-token", rate_limiter=MagicMock())
+
+        assert client.circuit_breaker is notion_client.get_circuit_breaker()
+
+
+class TestPageUpdateBuffer:
+    """Test merging page updates into one PATCH per page"""
+
+    def failing_pages(self, failing_id, error):
+        def update(page_id, **kwargs):
+            if page_id == failing_id:
+                raise error
+            return {"id": page_id}
+        return MagicMock(**{"update.side_effect": update})
+
+    def test_merges_updates_to_same_page(self):
+        pages = MagicMock()
+        buffer = PageUpdateBuffer(pages)
+
+        buffer.update(page_id="p1", properties={"Planned Date": {"date": {"start": "2025-01-09"}}})
+        buffer.update(page_id="p1", properties={"Category": {"select": {"name": "Random/Monday"}}})
+        buffer.update(page_id="p2", properties={"Category": {"select": {"name": "Cooking/Tuesday"}}})
+        result = buffer.flush()
+
+        assert pages.update.call_count == 2
+        pages.update.assert_any_call(page_id="p1", properties={
+            "Planned Date": {"date": {"start": "2025-01-09"}},
+            "Category": {"select": {"name": "Random/Monday"}},
+        })
+        assert sorted(result["updated"]) == ["p1", "p2"]
+        assert buffer.merged == 1
+        assert buffer.pending == 0
+
+    def test_later_value_wins(self):
+        pages = MagicMock()
+        buffer = PageUpdateBuffer(pages)
+
+        buffer.update(page_id="p1", properties={"Category": {"select": {"name": "Random/Monday"}}})
+        buffer.update(page_id="p1", properties={"Category": {"select": {"name": "Cleaning/Friday"}}}, archived=True)
+        buffer.flush()
+
+        pages.update.assert_called_once_with(
+            page_id="p1", properties={"Category": {"select": {"name": "Cleaning/Friday"}}}, archived=True
+        )
+
+    def test_flushes_when_full(self):
+        pages = MagicMock()
+        buffer = PageUpdateBuffer(pages, max_pending=2)
+
+        buffer.update(page_id="p1", properties={})
+        assert pages.update.call_count == 0
+        buffer.update(page_id="p2", properties={})
+
+        assert pages.update.call_count == 2
+        assert buffer.pending == 0
+
+    def test_failed_page_does_not_stop_others(self):
+        pages = self.failing_pages("p1", Exception("boom"))
+        buffer = PageUpdateBuffer(pages)
+
+        buffer.update(page_id="p1", properties={"A": {}})
+        buffer.update(page_id="p2", properties={"A": {}})
+        result = buffer.flush()
+
+        assert result["updated"] == ["p2"]
+        assert list(result["failed"]) == ["p1"]
+        assert list(buffer.failures) == ["p1"]
+
+    def test_deadline_error_is_raised_after_flush(self):
+        pages = self.failing_pages("p1", DeadlineExceeded("out of time"))
+        buffer = PageUpdateBuffer(pages)
+        buffer.update(page_id="p1", properties={"A": {}})
+        buffer.update(page_id="p2", properties={"A": {}})
+
+        with pytest.raises(DeadlineExceeded):
+            buffer.flush()
+
+        assert pages.update.call_count == 2
+
+    def test_context_manager_flushes_only_on_clean_exit(self):
+        pages = MagicMock()
+        with PageUpdateBuffer(pages) as buffer:
+            buffer.update(page_id="p1", properties={"A": {}})
+        assert pages.update.call_count == 1
+
+        with pytest.raises(ValueError):
+            with PageUpdateBuffer(pages) as buffer:
+                buffer.update(page_id="p2", properties={"A": {}})
+                raise ValueError("stop")
+        assert pages.update.call_count == 1
+
+
+class TestPageCache:
+    """Test serving unchanged pages from the on-disk cache"""
+
+    @pytest.fixture
+    def workspace(self):
+        fake = FakeNotion()
+        template_db_id, _ = fake.add_task_manager_databases()
+        for i in range(150):
+            fake.add_page(template_db_id, {"Task": {"title": [{"text": {"content": f"Template {i}"}}]}})
+        client = RateLimitedNotionClient(
+            auth="test-token", rate_limiter=MagicMock(), call_budget=MagicMock(), schema_cache=SchemaCache(), transport=fake,
+        )
+        return fake, template_db_id, client
+
+    def test_unchanged_pages_are_served_from_cache_file(self, workspace, tmp_path):
+        fake, db_id, client = workspace
+        path = str(tmp_path / "pages.json")
+
+        first = PageCache(path, settle_time=0)
+        pages = first.query(client, db_id)
+        first.save()
+        assert (first.hits, first.misses) == (0, 150)
+        queries = fake.requests["databases.query"]
+
+        second = PageCache(path, settle_time=0)
+        cached = second.query(client, db_id)
+
+        assert cached == pages
+        assert (second.hits, second.misses) == (150, 0)
+        assert second.hit_rate() == 1.0
+        # Only the title-only first pass was needed
+        assert fake.requests["databases.query"] - queries == 2
+
+    def test_changed_page_is_fetched_again(self, workspace, tmp_path):
+        fake, db_id, client = workspace
+        path = str(tmp_path / "pages.json")
+        first = PageCache(path, settle_time=0)
+        first.query(client, db_id)
+        first.save()
+
+        changed = fake.pages(db_id)[7]
+        client.pages.update(page_id=changed["id"], properties={"Frequency": {"select": {"name": "Weekly"}}})
+        changed["last_edited_time"] = "2099-01-01T00:00:00.000Z"
+        second = PageCache(path, settle_time=0)
+        pages = {page["id"]: page for page in second.query(client, db_id)}
+
+        assert (second.hits, second.misses) == (149, 1)
+        assert pages[changed["id"]]["properties"]["Frequency"]["select"]["name"] == "Weekly"
+
+    def test_recently_edited_pages_are_not_cached(self, workspace, tmp_path):
+        _, db_id, client = workspace
+        path = str(tmp_path / "pages.json")
+        first = PageCache(path)
+        first.query(client, db_id)
+        first.save()
+
+        second = PageCache(path)
+        pages = second.query(client, db_id)
+
+        assert len(pages) == 150
+        assert second.misses == 150
+
+    def test_save_drops_pages_no_query_returned(self, workspace, tmp_path):
+        fake, db_id, client = workspace
+        path = str(tmp_path / "pages.json")
+        first = PageCache(path, settle_time=0)
+        first.query(client, db_id)
+        first.save()
+
+        client.pages.update(page_id=fake.pages(db_id)[0]["id"], archived=True)
+        second = PageCache(path, settle_time=0)
+        second.query(client, db_id)
+        second.save()
+
+        with open(path) as f:
+            assert len(json.load(f)["pages"]) == 149
+
+    def test_unreadable_cache_file_starts_empty(self, workspace, tmp_path):
+        _, db_id, client = workspace
+        path = tmp_path / "pages.json"
+        path.write_text("not json")
+
+        cache = PageCache(str(path), settle_time=0)
+
+        assert len(cache.query(client, db_id)) == 150
+        assert cache.misses == 150
+
+    @pytest.mark.parametrize("filter_, expected", [
+        (None, "since"),
+        ({"property": "A", "checkbox": {"equals": True}}, {"and": [{"property": "A", "checkbox": {"equals": True}}, "since"]}),
+        ({"and": ["x", "y"]}, {"and": ["x", "y", "since"]}),
+        ({"or": ["x", "y"]}, {"and": [{"or": ["x", "y"]}, "since"]}),
+        ({"or": [{"and": ["x", "y"]}, "z"]}, None),
+    ])
+    def test_and_filter_respects_nesting_limit(self, filter_, expected):
+        assert notion_client._and_filter(filter_, "since") == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -29,6 +29,7 @@ sys.modules['scripts.daily_planned_date_review'] = MagicMock()
 
 # Now we can import scheduler
 from scripts import scheduler
+from utils.notion_client import get_run_deadline
 
 
 class TestRunWeeklyTasks:
@@ -59,6 +60,40 @@ class TestRunWeeklyTasks:
         mock_logger.error.assert_called_once()
         assert "Error during weekly task generation" in str(mock_logger.error.call_args)
 
+    @patch('scripts.scheduler.run_task_generation')
+    def test_runs_under_deadline(self, mock_run_gen):
+        """Test the weekly run is bounded by a run deadline"""
+        deadlines = []
+        mock_run_gen.side_effect = lambda: deadlines.append(get_run_deadline())
+
+        scheduler.run_weekly_tasks()
+
+        assert deadlines[0].seconds == scheduler.WEEKLY_RUN_DEADLINE
+        assert get_run_deadline() is None
+
+    @patch('scripts.scheduler.schedule')
+    @patch('scripts.scheduler.get_circuit_breaker')
+    @patch('scripts.scheduler.run_task_generation')
+    def test_postponed_while_notion_down(self, mock_run_gen, mock_breaker, mock_schedule):
+        """Test the run is postponed instead of started while the circuit breaker is open"""
+        mock_breaker.return_value.status.return_value = {"state": "open", "retry_in": 90.5}
+
+        scheduler.run_weekly_tasks()
+
+        mock_run_gen.assert_not_called()
+        mock_schedule.every.assert_called_once_with(91)
+        mock_schedule.every.return_value.seconds.do.assert_called_once_with(scheduler.run_once, scheduler.run_weekly_tasks)
+
+    @patch('scripts.scheduler.schedule')
+    @patch('scripts.scheduler.run_task_generation')
+    def test_postponed_when_breaker_opens_mid_run(self, mock_run_gen, mock_schedule):
+        """Test a run stopped by the circuit breaker is retried later"""
+        mock_run_gen.side_effect = scheduler.CircuitOpenError("open", retry_in=5.0)
+
+        scheduler.run_weekly_tasks()
+
+        mock_schedule.every.assert_called_once_with(scheduler.MIN_POSTPONE_DELAY)
+
 
 class TestRunDailyPlannedDateReview:
     """Test the run_daily_planned_date_review function"""
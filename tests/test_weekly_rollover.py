@@ -6,6 +6,7 @@ Tests the create_active_tasks_from_templates.py module
 
 import pytest
 import os
+import json
 import yaml
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timedelta, date
@@ -37,7 +38,8 @@ with patch.dict(os.environ, {'NOTION_INTEGRATION_SECRET': 'test-token'}, clear=T
                 get_uncompleted_active_tasks_for_template_and_category,
                 get_next_week_dates,
                 uncompleted_task_exists_for_date,
-                is_task_due_for_week
+                is_task_due_for_week,
+                create_active_tasks
             )
             # Set up the global variables for testing
             import create_active_tasks_from_templates
@@ -190,6 +192,21 @@ class TestTemplateTaskRetrieval:
         assert result[0]["properties"]["EmptySelect"] is None
         assert result[0]["properties"]["EmptyRichText"] is None
 
+    @patch('create_active_tasks_from_templates.notion')
+    def test_get_template_tasks_uses_page_cache(self, mock_notion):
+        """Test template pages come from the page cache when one is configured"""
+        cache = MagicMock()
+        cache.query.return_value = [
+            {"id": "template1", "properties": {"Task": {"type": "title", "title": [{"plain_text": "Cached Task"}]}}}
+        ]
+
+        with patch('create_active_tasks_from_templates.page_cache', cache):
+            result = get_template_tasks()
+
+        assert result[0]["properties"]["Task"] == "Cached Task"
+        cache.query.assert_called_once_with(mock_notion, "template-db-id")
+        mock_notion.databases.query.assert_not_called()
+
 class TestActiveTaskRetrieval:
     """Test active task retrieval functionality"""
     
@@ -253,6 +270,214 @@ class TestActiveTaskRetrieval:
         assert len(result) == 1
         assert result[0]["id"] == "active1"
 
+class TestActiveTaskIndex:
+    """Test answering Active Task lookups from one scan of the Active Tasks DB"""
+
+    schema = {
+        "Status": {
+            "status": {
+                "groups": [{"name": "Complete", "option_ids": ["done"]}],
+                "options": [{"id": "open", "name": "Not Started"}, {"id": "done", "name": "Done"}],
+            }
+        }
+    }
+
+    def page(self, page_id, template_id, category, planned, status="open"):
+        return {
+            "id": page_id,
+            "properties": {
+                "TemplateId": {"type": "rich_text", "rich_text": [{"plain_text": template_id}] if template_id else []},
+                "Category": {"type": "select", "select": {"name": category}},
+                "Planned Date": {"type": "date", "date": {"start": planned}},
+                "Status": {"type": "status", "status": {"id": status}},
+            },
+        }
+
+    @pytest.fixture
+    def index(self):
+        return create_active_tasks_from_templates.ActiveTaskIndex([
+            self.page("a1", "template1", "Random/Monday", "2025-01-06"),
+            self.page("a2", "template1", "Cleaning/Friday", "2025-01-10T09:00:00.000Z", status="done"),
+            self.page("a3", "template2", "Random/Monday", "2025-01-06"),
+            self.page("a4", None, "Random/Monday", "2025-01-06"),
+        ])
+
+    def test_lookups(self, index):
+        """Test pages are found by template and by template, category and date"""
+        assert index.size == 3
+        assert [page["id"] for page in index.for_template("template1")] == ["a1", "a2"]
+        assert [page["id"] for page in index.for_template_and_category("template1", "Random/Monday")] == ["a1"]
+        assert [page["id"] for page in index.for_date("template1", "Cleaning/Friday", date(2025, 1, 10))] == ["a2"]
+        assert index.for_template("missing") == []
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_lookup_functions_answer_from_index(self, mock_notion, index):
+        """Test the rollover's lookups make no queries while an index is set"""
+        with patch('create_active_tasks_from_templates.active_index', index):
+            assert [page["id"] for page in get_active_tasks_for_template("template1")] == ["a1", "a2"]
+            assert uncompleted_task_exists_for_date("template1", "Random/Monday", date(2025, 1, 6), self.schema)
+            assert not uncompleted_task_exists_for_date("template1", "Cleaning/Friday", date(2025, 1, 10), self.schema)
+            assert get_uncompleted_active_tasks_for_template_and_category("template1", "Cleaning/Friday", self.schema) == []
+
+        mock_notion.databases.query.assert_not_called()
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_build_scans_tasks_with_template_id(self, mock_notion):
+        """Test the index is built from one query for pages with a TemplateId"""
+        mock_notion.databases.query.return_value = {
+            "results": [self.page("a1", "template1", "Random/Monday", "2025-01-06")],
+            "has_more": False,
+        }
+
+        index = create_active_tasks_from_templates.build_active_task_index()
+
+        assert index.size == 1
+        mock_notion.databases.query.assert_called_once_with(
+            database_id="active-db-id",
+            filter={"property": "TemplateId", "rich_text": {"is_not_empty": True}},
+        )
+
+    @patch('create_active_tasks_from_templates.TEMPLATE_ID_FILTER_CHUNK', 2)
+    @patch('create_active_tasks_from_templates.notion')
+    def test_build_batches_template_ids(self, mock_notion):
+        """Test batched lookups OR the TemplateIds of each chunk of templates into one query"""
+        mock_notion.databases.query.side_effect = [
+            {"results": [self.page("a1", "t1", "Random/Monday", "2025-01-06"), self.page("a2", "t2", "Random/Monday", "2025-01-06")], "has_more": False},
+            {"results": [self.page("a3", "t3", "Random/Monday", "2025-01-06")], "has_more": False},
+        ]
+
+        index = create_active_tasks_from_templates.build_active_task_index(["t1", "t2", "t3", "t1"])
+
+        assert [page["id"] for page in index.for_template("t2")] == ["a2"]
+        assert [page["id"] for page in index.for_template("t3")] == ["a3"]
+        assert mock_notion.databases.query.call_count == 2
+        assert mock_notion.databases.query.call_args_list[0].kwargs["filter"] == {"or": [
+            {"property": "TemplateId", "rich_text": {"equals": "t1"}},
+            {"property": "TemplateId", "rich_text": {"equals": "t2"}},
+        ]}
+        assert mock_notion.databases.query.call_args_list[1].kwargs["filter"] == {"or": [
+            {"property": "TemplateId", "rich_text": {"equals": "t3"}},
+        ]}
+
+    def test_open_status_filter_excludes_complete_group(self):
+        """Test the open-task filter excludes each status in the Complete group"""
+        assert create_active_tasks_from_templates.get_open_status_filter(self.schema) == [
+            {"property": "Status", "status": {"does_not_equal": "Done"}},
+        ]
+        assert create_active_tasks_from_templates.get_open_status_filter({}) == []
+
+class TestLatestCompletions:
+    """Test finding each template's latest completion with sorted Done-only queries"""
+
+    def page(self, template_id, completed):
+        return {
+            "id": f"{template_id}-{completed}",
+            "properties": {
+                "TemplateId": {"type": "rich_text", "rich_text": [{"plain_text": template_id}]},
+                "Completed Date": {"type": "date", "date": {"start": completed}},
+            },
+        }
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_stops_paging_once_every_template_is_seen(self, mock_notion):
+        """Test the first (newest) Done task per template wins and later pages aren't fetched"""
+        mock_notion.databases.query.return_value = {
+            "results": [self.page("t1", "2025-01-05"), self.page("t2", "2025-01-03"), self.page("t1", "2024-12-01")],
+            "has_more": True,
+            "next_cursor": "more",
+        }
+
+        latest = create_active_tasks_from_templates.get_latest_completions(["t1", "t2"])
+
+        assert latest == {"t1": "2025-01-05", "t2": "2025-01-03"}
+        mock_notion.databases.query.assert_called_once_with(
+            database_id="active-db-id",
+            filter={"and": [
+                {"or": [
+                    {"property": "TemplateId", "rich_text": {"equals": "t1"}},
+                    {"property": "TemplateId", "rich_text": {"equals": "t2"}},
+                ]},
+                {"property": "Status", "status": {"equals": "Done"}},
+                {"property": "Completed Date", "date": {"is_not_empty": True}},
+            ]},
+            sorts=[{"property": "Completed Date", "direction": "descending"}],
+        )
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_templates_without_completions_are_left_out(self, mock_notion):
+        """Test a template with no Done task reads the chunk to the end and gets no entry"""
+        mock_notion.databases.query.side_effect = [
+            {"results": [self.page("t1", "2025-01-05")], "has_more": True, "next_cursor": "more"},
+            {"results": [self.page("t1", "2024-12-01")], "has_more": False},
+        ]
+
+        assert create_active_tasks_from_templates.get_latest_completions(["t1", "t2"]) == {"t1": "2025-01-05"}
+        assert mock_notion.databases.query.call_count == 2
+
+class TestCompletionCheckpoint:
+    """Test keeping latest completions between runs and merging only recent edits"""
+
+    def page(self, template_id, completed):
+        return {
+            "id": f"{template_id}-{completed}",
+            "properties": {
+                "TemplateId": {"type": "rich_text", "rich_text": [{"plain_text": template_id}]},
+                "Completed Date": {"type": "date", "date": {"start": completed}},
+            },
+        }
+
+    @patch('create_active_tasks_from_templates.get_latest_completions')
+    @patch('create_active_tasks_from_templates.notion')
+    def test_first_run_reads_all_history_and_saves(self, mock_notion, mock_latest, tmp_path):
+        """Test a run without a checkpoint aggregates every template and saves the result"""
+        mock_latest.return_value = {"t1": "2025-01-05"}
+        path = tmp_path / "checkpoint.json"
+        started = datetime(2025, 1, 4, 12, 0, tzinfo=pytz.UTC)
+
+        checkpoint = create_active_tasks_from_templates.CompletionCheckpoint(str(path))
+        latest = create_active_tasks_from_templates.sync_latest_completions(["t1", "t2"], checkpoint, started)
+
+        assert latest == {"t1": "2025-01-05"}
+        mock_latest.assert_called_once_with(["t1", "t2"])
+        mock_notion.databases.query.assert_not_called()
+        reloaded = create_active_tasks_from_templates.CompletionCheckpoint(str(path))
+        assert reloaded.since == started
+        assert reloaded.completions == {"t1": "2025-01-05", "t2": None}
+
+    @patch('create_active_tasks_from_templates.get_latest_completions')
+    @patch('create_active_tasks_from_templates.notion')
+    def test_later_run_merges_tasks_edited_since_checkpoint(self, mock_notion, mock_latest, tmp_path):
+        """Test only recently edited Done tasks are read, and only newer completions replace saved ones"""
+        path = tmp_path / "checkpoint.json"
+        path.write_text(json.dumps({
+            "since": "2025-01-04T12:00:00+00:00",
+            "completions": {"t1": "2025-01-05T10:00:00.000Z", "t2": None},
+        }))
+        mock_notion.databases.query.return_value = {
+            "results": [self.page("t1", "2025-01-05"), self.page("t2", "2025-01-09"), self.page("gone", "2025-01-09")],
+            "has_more": False,
+        }
+        mock_latest.return_value = {"t3": "2024-12-01"}
+
+        checkpoint = create_active_tasks_from_templates.CompletionCheckpoint(str(path))
+        latest = create_active_tasks_from_templates.sync_latest_completions(
+            ["t1", "t2", "t3"], checkpoint, datetime(2025, 1, 11, 12, 0, tzinfo=pytz.UTC))
+
+        # 2025-01-05 (midnight) is older than the saved 10:00 completion
+        assert latest == {"t1": "2025-01-05T10:00:00.000Z", "t2": "2025-01-09", "t3": "2024-12-01"}
+        # Only the template the checkpoint didn't cover reads its history
+        mock_latest.assert_called_once_with(["t3"])
+        filter_ = mock_notion.databases.query.call_args.kwargs["filter"]
+        assert filter_["and"][0] == {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": "2025-01-04T11:58:00+00:00"}}
+        assert json.loads(path.read_text())["since"] == "2025-01-11T12:00:00+00:00"
+
+    def test_unreadable_checkpoint_starts_over(self, tmp_path):
+        """Test a missing or corrupt checkpoint file is treated as no checkpoint"""
+        path = tmp_path / "checkpoint.json"
+        path.write_text("not json")
+        assert create_active_tasks_from_templates.CompletionCheckpoint(str(path)).since is None
+        assert create_active_tasks_from_templates.CompletionCheckpoint(str(tmp_path / "missing.json")).since is None
+
 class TestStatusCompletion:
     """Test status completion checking functionality"""
     
@@ -506,6 +731,41 @@ class TestTemplateLastCompletedUpdate:
             properties={"Last Completed": {"date": {"start": "2024-01-15"}}}
         )
 
+    def test_last_completed_unchanged_compares_utc_instants(self):
+        """Test date-only and datetime values for the same instant count as unchanged"""
+        unchanged = create_active_tasks_from_templates.last_completed_unchanged
+        task = {"id": "template1", "properties": {"Last Completed": {"start": "2024-01-15"}}}
+
+        assert unchanged(task, "2024-01-15T00:00:00+00:00")
+        assert unchanged(task, "2024-01-14T19:00:00.000-05:00")
+        assert not unchanged(task, "2024-01-16T00:00:00+00:00")
+        assert not unchanged({"id": "template1", "properties": {"Last Completed": None}}, "2024-01-15T00:00:00+00:00")
+        assert not unchanged({"id": "template1", "properties": {}}, "2024-01-15T00:00:00+00:00")
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_rollover_skips_writes_that_change_nothing(self, mock_notion):
+        """Test only templates whose Last Completed actually changed are written"""
+        module = create_active_tasks_from_templates
+        templates = [
+            {"id": "same", "properties": {"Frequency": "Weekly", "Last Completed": {"start": "2024-01-15"}}},
+            {"id": "newer", "properties": {"Frequency": "Weekly", "Last Completed": {"start": "2024-01-08"}}},
+        ]
+        buffer = MagicMock()
+        buffer.flush.return_value = {"failed": {}}
+        mock_notion.page_update_buffer.return_value = buffer
+        module.progress.clear()
+
+        with patch.object(module, 'get_latest_completions', return_value={"same": "2024-01-15", "newer": "2024-01-15"}), \
+                patch.object(module, 'sync_options'), patch.object(module, 'create_active_tasks'), \
+                patch.object(module, 'uncompleted_task_exists_for_date', return_value=True):
+            module._run_rollover_phases(templates, {}, {}, None, datetime.now(pytz.UTC), aggregate_completions=True)
+
+        buffer.update.assert_called_once_with(
+            page_id="newer",
+            properties={"Last Completed": {"date": {"start": "2024-01-15T00:00:00+00:00"}}}
+        )
+        assert module.progress["Last Completed writes skipped"] == 1
+
 class TestTaskDueLogic:
     """Test task due logic functionality"""
     
@@ -962,6 +1222,42 @@ class TestUncompletedTaskExistence:
         result = uncompleted_task_exists_for_date("template1", "Random/Monday", date(2024, 1, 22), active_schema)
         assert result is False
 
+class TestActiveTaskCreation:
+    """Test concurrent creation of Active Tasks"""
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_create_active_tasks_creates_each_pending_task(self, mock_notion):
+        """Test every pending Active Task is created in the active DB"""
+        template = {"id": "template1", "properties": {"Task": "Test Task"}}
+        pending = [
+            (template, {"Category": {"select": {"name": category}}}, category, date(2024, 1, 15))
+            for category in ("Random/Monday", "Cooking/Tuesday", "Cleaning/Friday")
+        ]
+
+        create_active_tasks(pending)
+
+        assert mock_notion.pages.create.call_count == 3
+        created_categories = sorted(
+            c.kwargs["properties"]["Category"]["select"]["name"] for c in mock_notion.pages.create.call_args_list
+        )
+        assert created_categories == ["Cleaning/Friday", "Cooking/Tuesday", "Random/Monday"]
+        assert all(c.kwargs["parent"] == {"database_id": "active-db-id"} for c in mock_notion.pages.create.call_args_list)
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_create_active_tasks_propagates_errors(self, mock_notion):
+        """Test a failed creation still fails the run"""
+        mock_notion.pages.create.side_effect = Exception("API Error")
+        template = {"id": "template1", "properties": {}}
+
+        with pytest.raises(Exception, match="API Error"):
+            create_active_tasks([(template, {}, "Random/Monday", date(2024, 1, 15))])
+
+    @patch('create_active_tasks_from_templates.notion')
+    def test_create_active_tasks_nothing_pending(self, mock_notion):
+        """Test no API calls are made when nothing is pending"""
+        create_active_tasks([])
+        mock_notion.pages.create.assert_not_called()
+
 class TestPropertyBuilding:
     """Test active task property building functionality"""
     
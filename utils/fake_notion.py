@@ -0,0 +1,556 @@
+"""
+In-process fake of the Notion API for load tests and offline runs.
+
+``FakeNotion`` is an httpx transport holding databases and pages in memory.
+Mount it as a client's transport (or the process-wide transport) and the
+scripts run against it unchanged::
+
+    fake = FakeNotion(latency=0.05, rate_limit_rps=3)
+    db_id = fake.add_database({"Task": {"type": "title", "title": {}}})
+    client = RateLimitedNotionClient(auth="fake", transport=fake)
+
+It implements the parts of the API the scripts use:
+- ``databases.retrieve``, ``databases.update`` and ``databases.query`` with
+  pagination, sorts, ``filter_properties`` and the filter subset we rely on
+  (text, select, status, date, checkbox and number conditions, timestamp
+  conditions, and nested ``and``/``or``)
+- ``pages.create``, ``pages.retrieve`` and ``pages.update``
+
+Latency, random 5xx errors and 429s (random, or from a server-side rate
+limit) can be injected to load-test the client's limiter and retry logic.
+"""
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional, Union
+import httpx
+
+# Notion returns at most this many results per query page
+MAX_PAGE_SIZE = 100
+
+DATE_OPERATORS = ("equals", "before", "after", "on_or_before", "on_or_after")
+
+# Schemas of the template and active task databases (see schemas.md)
+TEMPLATE_TASKS_SCHEMA = {
+    "Task": {"type": "title"},
+    "Priority": {"type": "select", "select": {"options": [{"name": "High"}, {"name": "Medium"}, {"name": "Low"}]}},
+    "Frequency": {"type": "select", "select": {"options": [
+        {"name": name} for name in ("Daily", "Weekly", "Monthly", "Quarterly", "Yearly", "Monday/Friday")
+    ]}},
+    "Category": {"type": "select", "select": {"options": [
+        {"name": "Random/Monday"}, {"name": "Cooking/Tuesday"}, {"name": "Cleaning/Friday"}
+    ]}},
+    "Documentation": {"type": "url"},
+    "Last Completed": {"type": "date"},
+}
+ACTIVE_TASKS_SCHEMA = {
+    "Task": {"type": "title"},
+    "Priority": {"type": "select", "select": {"options": [{"name": "High"}, {"name": "Medium"}, {"name": "Low"}]}},
+    "Category": {"type": "select", "select": {"options": [
+        {"name": "Random/Monday"}, {"name": "Cooking/Tuesday"}, {"name": "Cleaning/Friday"}
+    ]}},
+    "Documentation": {"type": "url"},
+    "Status": {"type": "status", "status": {
+        "options": [{"name": name} for name in ("Not Started", "In Progress", "Done", "Not Needed", "Duplicate?")],
+        "groups": [
+            {"name": "To-do", "options": ["Not Started"]},
+            {"name": "In progress", "options": ["In Progress"]},
+            {"name": "Complete", "options": ["Done", "Not Needed", "Duplicate?"]},
+        ],
+    }},
+    "CreationDate": {"type": "date"},
+    "Planned Date": {"type": "date"},
+    "Completed Date": {"type": "date"},
+    "TemplateId": {"type": "rich_text"},
+}
+
+
+class FakeNotionError(Exception):
+    """An API error the fake answers with, e.g. validation_error or object_not_found."""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _parse_date(value: str) -> datetime:
+    """Parse a Notion date or datetime; date-only values are midnight UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _plain_text(rich_text: list) -> str:
+    return "".join(item.get("plain_text", item.get("text", {}).get("content", "")) for item in rich_text or [])
+
+
+def _rich_text(value: list) -> list:
+    """Normalize request rich text ({"text": {"content": ...}}) to the response shape."""
+    items = []
+    for item in value or []:
+        content = item.get("text", {}).get("content", item.get("plain_text", ""))
+        items.append({"type": "text", "text": {"content": content, "link": None}, "plain_text": content})
+    return items
+
+
+class FakeNotion(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    In-memory Notion API served as an httpx transport.
+
+    Args:
+        latency: Seconds added to every response, or a (min, max) range to draw from
+        error_rate: Fraction of requests answered with a random 500/502/503
+        rate_limit_probability: Fraction of requests answered with a 429
+        rate_limit_rps: Sustained requests per second allowed before answering 429,
+            like Notion's own limit (None for no limit)
+        rate_limit_burst: Requests allowed in a burst on top of ``rate_limit_rps``
+        retry_after: Retry-After seconds sent with 429 responses
+        seed: Seed for the injected latency and failures
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, tuple] = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_probability: float = 0.0,
+        rate_limit_rps: Optional[float] = None,
+        rate_limit_burst: int = 1,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_probability = rate_limit_probability
+        self.rate_limit_rps = rate_limit_rps
+        self.rate_limit_burst = rate_limit_burst
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._databases = {}
+        self._pages = {}
+        self._database_pages = {}
+        self._tokens = float(rate_limit_burst)
+        self._last_refill = time.monotonic()
+        self.requests = Counter()
+        # Seconds spent serving requests (filtering, sorting, serializing), excluding injected latency
+        self.processing_time = 0.0
+
+    # Seeding --------------------------------------------------------------
+
+    def add_database(self, properties: dict, database_id: str = None, title: str = "Fake database") -> str:
+        """Create a database from a schema in Notion's format and return its ID."""
+        database_id = database_id or str(uuid.uuid4())
+        schema = {}
+        for name, prop in properties.items():
+            schema[name] = self._schema_property(name, prop)
+        with self._lock:
+            self._databases[database_id] = {
+                "object": "database",
+                "id": database_id,
+                "title": [{"type": "text", "text": {"content": title}, "plain_text": title}],
+                "created_time": _now_iso(),
+                "last_edited_time": _now_iso(),
+                "properties": schema,
+            }
+            self._database_pages[database_id] = []
+        return database_id
+
+    def add_task_manager_databases(self) -> tuple:
+        """Create empty template and active task databases; returns (template_db_id, active_db_id)."""
+        return (
+            self.add_database(TEMPLATE_TASKS_SCHEMA, title="Template Tasks"),
+            self.add_database(ACTIVE_TASKS_SCHEMA, title="Active Tasks"),
+        )
+
+    def add_page(self, database_id: str, properties: dict) -> dict:
+        """Create a page from properties in the pages.create request format."""
+        with self._lock:
+            return self._create_page({"parent": {"database_id": database_id}, "properties": properties})
+
+    def pages(self, database_id: str) -> list:
+        """All unarchived pages in a database, in creation order."""
+        with self._lock:
+            return [page for page in self._database_pages[database_id] if not page["archived"]]
+
+    def _schema_property(self, name: str, prop: dict) -> dict:
+        prop_type = prop["type"]
+        config = dict(prop.get(prop_type) or {})
+        if "options" in config:
+            config["options"] = [self._option(option) for option in config["options"]]
+        if prop_type == "status":
+            config.setdefault("options", [])
+            # Groups may list their options by name for convenience; Notion lists IDs
+            ids = {option["name"]: option["id"] for option in config["options"]}
+            config["groups"] = [
+                {
+                    "id": group.get("id", str(uuid.uuid4())),
+                    "name": group["name"],
+                    "option_ids": group.get("option_ids") or [ids[name] for name in group.get("options", [])],
+                }
+                for group in config.get("groups", [])
+            ]
+        # Notion always gives the title property the ID "title"
+        default_id = "title" if prop_type == "title" else name
+        return {"id": prop.get("id", default_id), "name": name, "type": prop_type, prop_type: config}
+
+    def _option(self, option: dict) -> dict:
+        return {"id": option.get("id", str(uuid.uuid4())), "name": option["name"], "color": option.get("color", "default")}
+
+    # Transport ------------------------------------------------------------
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        delay, response = self._handle(request)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay, response = self._handle(request)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+
+    def shutdown(self):
+        """Nothing to release; lets the fake be installed with set_shared_transport."""
+
+    def _delay(self) -> float:
+        if isinstance(self.latency, tuple):
+            return self._random.uniform(*self.latency)
+        return self.latency
+
+    def _rate_limited(self) -> bool:
+        if self.rate_limit_probability and self._random.random() < self.rate_limit_probability:
+            return True
+        if self.rate_limit_rps is None:
+            return False
+        now = time.monotonic()
+        self._tokens = min(self.rate_limit_burst, self._tokens + (now - self._last_refill) * self.rate_limit_rps)
+        self._last_refill = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    def _handle(self, request: httpx.Request):
+        start = time.perf_counter()
+        try:
+            return self._serve(request)
+        finally:
+            with self._lock:
+                self.processing_time += time.perf_counter() - start
+
+    def _serve(self, request: httpx.Request):
+        with self._lock:
+            delay = self._delay()
+            if self._rate_limited():
+                self.requests["rate_limited"] += 1
+                return delay, self._error(request, 429, "rate_limited", "Rate limited", {"Retry-After": f"{self.retry_after:g}"})
+            if self.error_rate and self._random.random() < self.error_rate:
+                status, code = self._random.choice(
+                    [(500, "internal_server_error"), (502, "bad_gateway"), (503, "service_unavailable")]
+                )
+                self.requests["errors"] += 1
+                return delay, self._error(request, status, code, "Injected failure")
+            try:
+                body = json.loads(request.content) if request.content else {}
+                result = self._route(request, body)
+            except FakeNotionError as e:
+                return delay, self._error(request, e.status, e.code, e.message)
+            return delay, httpx.Response(200, json=result, request=request)
+
+    def _error(self, request, status, code, message, headers=None):
+        return httpx.Response(
+            status,
+            json={"object": "error", "status": status, "code": code, "message": message},
+            headers=headers,
+            request=request,
+        )
+
+    def _route(self, request: httpx.Request, body: dict) -> dict:
+        parts = request.url.path.strip("/").split("/")[1:]  # drop the "v1" prefix
+        method = request.method
+        if parts[:1] == ["databases"] and len(parts) == 2:
+            self.requests[f"databases.{'retrieve' if method == 'GET' else 'update'}"] += 1
+            if method == "GET":
+                return self._get_database(parts[1])
+            if method == "PATCH":
+                return self._update_database(parts[1], body)
+        if parts[:1] == ["databases"] and len(parts) == 3 and parts[2] == "query" and method == "POST":
+            self.requests["databases.query"] += 1
+            return self._query(parts[1], body, request.url.params.get_list("filter_properties"))
+        if parts == ["pages"] and method == "POST":
+            self.requests["pages.create"] += 1
+            return self._create_page(body)
+        if parts[:1] == ["pages"] and len(parts) == 2:
+            self.requests[f"pages.{'retrieve' if method == 'GET' else 'update'}"] += 1
+            if method == "GET":
+                return self._get_page(parts[1])
+            if method == "PATCH":
+                return self._update_page(parts[1], body)
+        raise FakeNotionError(400, "invalid_request_url", f"Invalid request URL: {method} {request.url.path}")
+
+    # Databases ------------------------------------------------------------
+
+    def _get_database(self, database_id: str) -> dict:
+        database = self._databases.get(database_id)
+        if database is None:
+            raise FakeNotionError(404, "object_not_found", f"Could not find database with ID: {database_id}.")
+        return database
+
+    def _update_database(self, database_id: str, body: dict) -> dict:
+        database = self._get_database(database_id)
+        for name, prop in body.get("properties", {}).items():
+            if prop is None:
+                database["properties"].pop(name, None)
+                continue
+            existing = database["properties"].get(name)
+            prop_type = prop.get("type") or next(key for key in prop if key not in ("name", "id"))
+            if existing is None:
+                database["properties"][name] = self._schema_property(name, {"type": prop_type, prop_type: prop.get(prop_type)})
+                continue
+            config = prop.get(prop_type) or {}
+            if "options" in config:
+                config = {**config, "options": [self._option(option) for option in config["options"]]}
+            existing[prop_type] = {**existing.get(prop_type, {}), **config}
+        database["last_edited_time"] = _now_iso()
+        return database
+
+    def _query(self, database_id: str, body: dict, filter_properties: list) -> dict:
+        database = self._get_database(database_id)
+        schema = database["properties"]
+        pages = self.pages(database_id)
+        if body.get("filter"):
+            pages = [page for page in pages if self._matches(page, body["filter"], schema)]
+        for sort in reversed(body.get("sorts") or []):
+            pages = self._sorted(pages, sort, schema)
+
+        page_size = min(body.get("page_size", MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        start = int(body.get("start_cursor") or 0)
+        batch = pages[start:start + page_size]
+        has_more = start + page_size < len(pages)
+        if filter_properties:
+            batch = [self._project(page, filter_properties) for page in batch]
+        return {
+            "object": "list",
+            "results": batch,
+            "has_more": has_more,
+            "next_cursor": str(start + page_size) if has_more else None,
+            "type": "page_or_database",
+        }
+
+    def _project(self, page: dict, filter_properties: list) -> dict:
+        """Copy of page with only the requested properties (by ID or name)."""
+        properties = {
+            name: value for name, value in page["properties"].items()
+            if name in filter_properties or value["id"] in filter_properties
+        }
+        return {**page, "properties": properties}
+
+    # Pages ----------------------------------------------------------------
+
+    def _get_page(self, page_id: str) -> dict:
+        page = self._pages.get(page_id)
+        if page is None:
+            raise FakeNotionError(404, "object_not_found", f"Could not find page with ID: {page_id}.")
+        return page
+
+    def _create_page(self, body: dict) -> dict:
+        database_id = body.get("parent", {}).get("database_id")
+        database = self._get_database(database_id)
+        now = _now_iso()
+        page_id = str(uuid.uuid4())
+        page = {
+            "object": "page",
+            "id": page_id,
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "parent": {"type": "database_id", "database_id": database_id},
+            "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+            "properties": {},
+        }
+        for name, prop in database["properties"].items():
+            page["properties"][name] = {"id": prop["id"], "type": prop["type"], prop["type"]: self._empty_value(prop["type"])}
+        self._set_properties(page, body.get("properties", {}), database)
+        self._pages[page_id] = page
+        self._database_pages[database_id].append(page)
+        return page
+
+    def _update_page(self, page_id: str, body: dict) -> dict:
+        page = self._get_page(page_id)
+        database = self._get_database(page["parent"]["database_id"])
+        self._set_properties(page, body.get("properties", {}), database)
+        if "archived" in body:
+            page["archived"] = bool(body["archived"])
+        page["last_edited_time"] = _now_iso()
+        return page
+
+    def _empty_value(self, prop_type: str):
+        if prop_type in ("title", "rich_text", "multi_select", "relation", "people", "files"):
+            return []
+        if prop_type == "checkbox":
+            return False
+        return None
+
+    def _set_properties(self, page: dict, properties: dict, database: dict):
+        schema = database["properties"]
+        for name, value in properties.items():
+            prop = schema.get(name)
+            if prop is None:
+                raise FakeNotionError(400, "validation_error", f"{name} is not a property that exists.")
+            prop_type = prop["type"]
+            page["properties"][name] = {"id": prop["id"], "type": prop_type, prop_type: self._value(prop, value.get(prop_type))}
+
+    def _value(self, prop: dict, value):
+        """Normalize a request property value to the shape Notion returns."""
+        prop_type = prop["type"]
+        if prop_type in ("title", "rich_text"):
+            return _rich_text(value)
+        if prop_type in ("select", "status"):
+            if value is None:
+                return None
+            options = prop[prop_type].setdefault("options", [])
+            option = next((o for o in options if o["name"] == value["name"]), None)
+            if option is None:
+                if prop_type == "status":
+                    raise FakeNotionError(400, "validation_error", f"Invalid status option: {value['name']}")
+                # Notion adds unknown select options to the schema
+                option = self._option(value)
+                options.append(option)
+            return option
+        if prop_type == "multi_select":
+            return [{"name": item["name"]} for item in value or []]
+        if prop_type == "date":
+            if value is None:
+                return None
+            return {"start": value["start"], "end": value.get("end"), "time_zone": value.get("time_zone")}
+        return value
+
+    # Filters and sorts ----------------------------------------------------
+
+    def _matches(self, page: dict, filter_: dict, schema: dict) -> bool:
+        if "and" in filter_:
+            return all(self._matches(page, condition, schema) for condition in filter_["and"])
+        if "or" in filter_:
+            return any(self._matches(page, condition, schema) for condition in filter_["or"])
+        if "timestamp" in filter_:
+            timestamp = filter_["timestamp"]
+            return self._date_matches(page[timestamp], filter_[timestamp])
+
+        name = filter_.get("property")
+        prop = schema.get(name)
+        if prop is None:
+            raise FakeNotionError(400, "validation_error", f"Could not find property with name or id: {name}")
+        condition_type = next(key for key in filter_ if key != "property")
+        condition = filter_[condition_type]
+        value = page["properties"].get(name, {}).get(prop["type"])
+        if condition_type == "date" or (condition_type in ("created_time", "last_edited_time")):
+            return self._date_matches((value or {}).get("start") if prop["type"] == "date" else value, condition)
+        if condition_type in ("title", "rich_text", "url", "email", "phone_number"):
+            text = _plain_text(value) if prop["type"] in ("title", "rich_text") else (value or "")
+            return self._text_matches(text, condition)
+        if condition_type in ("select", "status"):
+            return self._equality_matches((value or {}).get("name"), condition)
+        if condition_type == "multi_select":
+            names = [item["name"] for item in value or []]
+            if "contains" in condition:
+                return condition["contains"] in names
+            if "does_not_contain" in condition:
+                return condition["does_not_contain"] not in names
+            return self._emptiness_matches(names, condition)
+        if condition_type in ("checkbox", "number"):
+            return self._number_matches(value, condition)
+        raise FakeNotionError(400, "validation_error", f"Unsupported filter type: {condition_type}")
+
+    def _emptiness_matches(self, value, condition: dict) -> bool:
+        if condition.get("is_empty"):
+            return not value
+        if condition.get("is_not_empty"):
+            return bool(value)
+        raise FakeNotionError(400, "validation_error", f"Unsupported filter condition: {condition}")
+
+    def _equality_matches(self, value, condition: dict) -> bool:
+        if "equals" in condition:
+            return value == condition["equals"]
+        if "does_not_equal" in condition:
+            return value != condition["does_not_equal"]
+        return self._emptiness_matches(value, condition)
+
+    def _text_matches(self, text: str, condition: dict) -> bool:
+        if "contains" in condition:
+            return condition["contains"] in text
+        if "does_not_contain" in condition:
+            return condition["does_not_contain"] not in text
+        if "starts_with" in condition:
+            return text.startswith(condition["starts_with"])
+        if "ends_with" in condition:
+            return text.endswith(condition["ends_with"])
+        return self._equality_matches(text, condition)
+
+    def _number_matches(self, value, condition: dict) -> bool:
+        comparisons = {
+            "greater_than": lambda a, b: a > b,
+            "less_than": lambda a, b: a < b,
+            "greater_than_or_equal_to": lambda a, b: a >= b,
+            "less_than_or_equal_to": lambda a, b: a <= b,
+        }
+        for operator, compare in comparisons.items():
+            if operator in condition:
+                return value is not None and compare(value, condition[operator])
+        return self._equality_matches(value, condition)
+
+    def _date_matches(self, value: Optional[str], condition: dict) -> bool:
+        operator = next((op for op in DATE_OPERATORS if op in condition), None)
+        if operator is None:
+            return self._emptiness_matches(value, condition)
+        if value is None:
+            return False
+        target = condition[operator]
+        if "T" not in target:
+            # Date-only conditions compare calendar dates
+            actual, expected = _parse_date(value).date(), _parse_date(target).date()
+        else:
+            actual, expected = _parse_date(value), _parse_date(target)
+        return {
+            "equals": actual == expected,
+            "before": actual < expected,
+            "after": actual > expected,
+            "on_or_before": actual <= expected,
+            "on_or_after": actual >= expected,
+        }[operator]
+
+    def _sorted(self, pages: list, sort: dict, schema: dict) -> list:
+        descending = sort.get("direction") == "descending"
+        if "timestamp" in sort:
+            return sorted(pages, key=lambda page: page[sort["timestamp"]], reverse=descending)
+
+        prop = schema.get(sort["property"])
+        if prop is None:
+            raise FakeNotionError(400, "validation_error", f"Could not find sort property with name or id: {sort['property']}")
+
+        def key(page):
+            value = page["properties"].get(sort["property"], {}).get(prop["type"])
+            if prop["type"] == "date":
+                value = value and value["start"]
+            elif prop["type"] in ("title", "rich_text"):
+                value = _plain_text(value) or None
+            elif prop["type"] in ("select", "status"):
+                value = value and value["name"]
+            return value
+
+        present = sorted((page for page in pages if key(page) is not None), key=key, reverse=descending)
+        # Notion sorts empty values last in both directions
+        return present + [page for page in pages if key(page) is None]
@@ -0,0 +1,251 @@
+"""
+Record/replay HTTP transport for the Notion client.
+
+A cassette is a gzip-compressed (for ``.gz`` paths) JSON-lines file with one
+recorded request/response pair per line. Record mode sends requests through
+to Notion and appends each interaction to the cassette; replay mode serves
+the recorded responses back without touching the network, optionally
+sleeping for the recorded latencies. This lets a real rollover or daily
+review be replayed on a laptop to benchmark the scripts deterministically.
+
+Enable it for every client in a process with environment variables::
+
+    NOTION_CASSETTE=/tmp/rollover.jsonl.gz NOTION_CASSETTE_MODE=record python scripts/...
+    NOTION_CASSETTE=/tmp/rollover.jsonl.gz NOTION_CASSETTE_MODE=replay python scripts/...
+
+or pass a ``CassetteTransport`` to ``RateLimitedNotionClient(transport=...)``.
+"""
+
+import os
+import gzip
+import atexit
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODE_RECORD = "record"
+CASSETTE_MODE_REPLAY = "replay"
+
+# Cassette enabled for every client in the process (see cassette_from_env)
+CASSETTE_FILE = os.environ.get("NOTION_CASSETTE")
+CASSETTE_MODE = os.environ.get("NOTION_CASSETTE_MODE", CASSETTE_MODE_REPLAY)
+# Sleep for the recorded latency of each response when replaying
+CASSETTE_REPLAY_LATENCY = os.environ.get("NOTION_CASSETTE_LATENCY", "").lower() in ("1", "true", "yes")
+
+# Response headers worth keeping; everything else (dates, tracing IDs, cookies)
+# only bloats the cassette
+RECORDED_HEADERS = ("content-type", "retry-after")
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode for a request the cassette has no response for."""
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _request_body(request: httpx.Request) -> Optional[str]:
+    """Request body as canonical JSON (stable key order) so equal bodies match."""
+    content = request.content
+    if not content:
+        return None
+    try:
+        return json.dumps(json.loads(content), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _request_url(request: httpx.Request) -> str:
+    """Path and query string, without the host."""
+    return request.url.raw_path.decode("ascii")
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """
+    httpx transport that records interactions to, or replays them from, a cassette.
+
+    Replay matches a request on method, path and query, and body. Requests
+    whose bodies embed the current time (e.g. ``pages.create`` with a
+    CreationDate) won't match exactly when replayed on another day, so a
+    request with no exact match falls back to the next recorded response for
+    the same method and path. Recorded responses for a request are served in
+    order; once used up, the last one is repeated. Requests never seen for
+    that method and path raise ``CassetteMissError``.
+
+    Args:
+        path: Cassette file; ``.gz`` paths are gzip-compressed
+        mode: CASSETTE_MODE_RECORD or CASSETTE_MODE_REPLAY
+        inner: Transport that record mode sends requests through
+        replay_latency: Sleep for the recorded latency when replaying
+        latency_scale: Multiplier applied to replayed latencies
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = CASSETTE_MODE_REPLAY,
+        inner: httpx.BaseTransport = None,
+        replay_latency: bool = False,
+        latency_scale: float = 1.0,
+    ):
+        if mode not in (CASSETTE_MODE_RECORD, CASSETTE_MODE_REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self._path = path
+        self._mode = mode
+        self._inner = inner
+        self._replay_latency = replay_latency
+        self._latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._exact = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        self._last = {}
+        self._served = set()
+        self._writer = None
+        if mode == CASSETTE_MODE_RECORD:
+            if self._inner is None:
+                self._inner = httpx.HTTPTransport()
+            # One writer for the whole recording, so a .gz cassette is a single
+            # gzip stream compressed across lines rather than a member per line
+            self._writer = _open(self._path, "a")
+            atexit.register(self._close_writer)
+        else:
+            self._load()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    def _load(self):
+        with _open(self._path, "r") as f:
+            try:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    interaction = json.loads(line)
+                    exact = (interaction["method"], interaction["url"], interaction["body"])
+                    loose = (interaction["method"], interaction["url"].split("?")[0])
+                    self._exact[exact].append(interaction)
+                    self._loose[loose].append(interaction)
+            except EOFError:
+                # A recording that was killed before closing its writer has every
+                # flushed line but no gzip trailer
+                logger.warning(f"Cassette {self._path} ends without a gzip trailer; using the interactions before it")
+        logger.info(f"Loaded {sum(len(q) for q in self._exact.values())} interactions from cassette {self._path}")
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self._mode == CASSETTE_MODE_RECORD:
+            return self._record(request)
+        return self._replay(request)
+
+    def _record(self, request: httpx.Request) -> httpx.Response:
+        start = time.monotonic()
+        response = self._inner.handle_request(request)
+        content = response.read()
+        latency = time.monotonic() - start
+        headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        try:
+            body = json.loads(content) if content else None
+            text = None
+        except ValueError:
+            body = None
+            text = content.decode("utf-8", errors="replace")
+        interaction = {
+            "method": request.method,
+            "url": _request_url(request),
+            "body": _request_body(request),
+            "status": response.status_code,
+            "headers": headers,
+            "response": body,
+            "text": text,
+            "latency": round(latency, 4),
+        }
+        line = json.dumps(interaction, separators=(",", ":"))
+        with self._lock:
+            if self._writer is None:
+                self._writer = _open(self._path, "a")
+            self._writer.write(line + "\n")
+            # Flushed per line so a crashed recording keeps what it captured
+            self._writer.flush()
+        response.close()
+        return self._build_response(request, interaction)
+
+    def _replay(self, request: httpx.Request) -> httpx.Response:
+        url = _request_url(request)
+        exact = (request.method, url, _request_body(request))
+        loose = (request.method, url.split("?")[0])
+        with self._lock:
+            interaction = self._take(self._exact.get(exact)) or self._take(self._loose.get(loose))
+            if interaction is not None:
+                self._last[exact] = self._last[loose] = interaction
+            else:
+                interaction = self._last.get(exact) or self._last.get(loose)
+        if interaction is None:
+            raise CassetteMissError(f"No recorded response for {request.method} {url}")
+        if self._replay_latency:
+            time.sleep(interaction["latency"] * self._latency_scale)
+        return self._build_response(request, interaction)
+
+    def _take(self, queue: Optional[deque]) -> Optional[dict]:
+        """Next interaction in queue not already served through another match."""
+        while queue:
+            interaction = queue.popleft()
+            if id(interaction) not in self._served:
+                self._served.add(id(interaction))
+                return interaction
+        return None
+
+    def _build_response(self, request: httpx.Request, interaction: dict) -> httpx.Response:
+        if interaction["response"] is not None:
+            content = json.dumps(interaction["response"]).encode()
+        else:
+            content = (interaction.get("text") or "").encode()
+        return httpx.Response(
+            interaction["status"],
+            headers=interaction["headers"],
+            content=content,
+            request=request,
+        )
+
+    def _close_writer(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+
+    def close(self):
+        self._close_writer()
+        if self._inner is not None:
+            self._inner.close()
+
+    def shutdown(self):
+        """Close the inner transport's pool when replacing a process-wide cassette."""
+        self._close_writer()
+        shutdown = getattr(self._inner, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
+
+
+def cassette_from_env(inner: httpx.BaseTransport = None) -> Optional[CassetteTransport]:
+    """Build the cassette configured by NOTION_CASSETTE, or return None if it isn't set."""
+    if not CASSETTE_FILE:
+        return None
+    logger.info(f"Using Notion cassette {CASSETTE_FILE} in {CASSETTE_MODE} mode")
+    return CassetteTransport(
+        CASSETTE_FILE,
+        mode=CASSETTE_MODE,
+        inner=inner,
+        replay_latency=CASSETTE_REPLAY_LATENCY,
+    )
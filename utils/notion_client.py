@@ -2,19 +2,62 @@
 Rate-limited Notion client wrapper with retry logic.
 
 This module provides a wrapper around the Notion client that handles:
-- Proactive rate limiting (delays between calls to prevent 429 errors)
-- Reactive rate limiting (429 errors) with exponential backoff
-- Automatic retries for transient failures
+- Proactive rate limiting (token bucket with burst headroom, or fixed spacing),
+  optionally shared between processes through a lock file and ledger file
+- Sliding-window call budgets matching Notion's published limits
+- Reactive rate limiting (429 errors) honoring Retry-After
+- Automatic retries for transient failures (5xx, timeouts, connection resets)
+  with full-jitter exponential backoff and a per-call deadline
 - Consistent error handling
+- Bounded-concurrency execution so request latency overlaps with rate spacing
+- Per-endpoint call counts and latency histograms, plus time spent waiting
+  on the rate limiter and sleeping between retries
+- Optional JSON-lines trace of every call for offline profiling
+- A process-wide pooled HTTP transport with long keep-alive (and optional
+  HTTP/2) so clients reuse TLS connections instead of repeating handshakes
+- A TTL cache of database schemas so repeated databases.retrieve calls are free
+- Single-flight coalescing so concurrent identical reads share one request
+- A paginating iterator that can prefetch the next page in the background
+- A run-wide deadline that cancels rate-limit waits and retry sleeps which
+  would run past it, so a stuck run fails fast
+- A circuit breaker that fails calls fast while Notion is down instead of
+  running every call's full retry sequence
+- A write-behind buffer that merges updates to the same page into one request
+- An optional on-disk page cache validated by last_edited_time, so unchanged
+  pages aren't downloaded in full on every run
 """
 
+import os
+import sys
+import json
+import hashlib
 import time
+import random
+import asyncio
 import logging
+import tempfile
+import importlib.util
 import threading
+import copy
+import contextvars
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from functools import wraps
-from typing import Any, Callable
-from notion_client import Client
-from notion_client.errors import APIResponseError
+from typing import Any, Callable, Iterator, Optional
+import httpx
+from notion_client import AsyncClient, Client
+from notion_client.errors import APIResponseError, HTTPResponseError, RequestTimeoutError
+
+from .notion_cassette import cassette_from_env
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
@@ -23,89 +66,2146 @@ MAX_RETRIES = 5
 INITIAL_RETRY_DELAY = 1.0  # seconds
 MAX_RETRY_DELAY = 60.0  # seconds
 BACKOFF_MULTIPLIER = 2.0
+RETRYABLE_STATUS_CODES = (500, 502, 503, 504)  # transient server/gateway errors
+RETRY_CALL_DEADLINE = 120.0  # seconds; total time one call may spend retrying
+
+# Circuit breaker configuration
+# The breaker opens when at least CIRCUIT_FAILURE_RATE of the last
+# CIRCUIT_WINDOW_SIZE attempts (and no fewer than CIRCUIT_MIN_CALLS) failed with
+# 5xx, timeouts or connection errors, then lets one trial call through after
+# CIRCUIT_OPEN_DURATION to check whether Notion has recovered
+CIRCUIT_FAILURE_RATE = 0.5
+CIRCUIT_WINDOW_SIZE = 20  # attempts
+CIRCUIT_MIN_CALLS = 10  # attempts
+CIRCUIT_OPEN_DURATION = 60.0  # seconds
+
+# Circuit breaker states
+CIRCUIT_CLOSED = "closed"  # calls flow normally
+CIRCUIT_OPEN = "open"  # calls fail fast with CircuitOpenError
+CIRCUIT_HALF_OPEN = "half_open"  # one trial call decides whether to close again
+
+# Endpoint methods that create objects; after an ambiguous failure (timeout, 5xx)
+# they may already have succeeded, so they are only retried on 429s and refused
+# connections to avoid duplicates
+NON_IDEMPOTENT_METHODS = {
+    ("pages", "create"),
+    ("databases", "create"),
+    ("comments", "create"),
+}
+
+# Endpoint methods that only read; concurrent identical calls to these share
+# one request (see SingleFlight). Writes are never coalesced.
+READ_METHODS = {
+    ("databases", "query"),
+    ("databases", "retrieve"),
+    ("pages", "retrieve"),
+    ("blocks", "retrieve"),
+    ("users", "list"),
+    ("users", "retrieve"),
+    ("users", "me"),
+    ("comments", "list"),
+}
 
 # Proactive rate limiting configuration
 # Notion's limit is 3 requests/second average
 # We use 0.35s delay (~2.8 req/sec) to stay safely under the limit
 MIN_DELAY_BETWEEN_CALLS = 0.35  # seconds
 
+# Token bucket configuration
+# Notion allows short bursts as long as the average stays around 3 req/sec.
+# The bucket refills at the same ~2.8 req/sec as the fixed spacing above, but
+# holds up to TOKEN_BUCKET_CAPACITY tokens so short bursts go out immediately.
+TOKEN_BUCKET_RATE = 1.0 / MIN_DELAY_BETWEEN_CALLS  # tokens per second
+TOKEN_BUCKET_CAPACITY = 10  # tokens
+
+# Adaptive (AIMD) rate configuration
+# The rate grows by ADAPTIVE_INCREASE_STEP after each successful call and is cut by
+# ADAPTIVE_DECREASE_FACTOR on a 429 or when a call takes longer than
+# ADAPTIVE_LATENCY_THRESHOLD, staying within [ADAPTIVE_MIN_RATE, ADAPTIVE_MAX_RATE].
+ADAPTIVE_INITIAL_RATE = TOKEN_BUCKET_RATE  # req/sec
+ADAPTIVE_MIN_RATE = 0.5  # req/sec
+ADAPTIVE_MAX_RATE = 4.0  # req/sec
+ADAPTIVE_INCREASE_STEP = 0.05  # req/sec added per successful call
+ADAPTIVE_DECREASE_FACTOR = 0.5
+ADAPTIVE_LATENCY_THRESHOLD = 3.0  # seconds
+ADAPTIVE_DECREASE_COOLDOWN = 1.0  # seconds; one cut per congestion event
+ADAPTIVE_HISTORY_SIZE = 100  # rate changes kept for inspection
+
+# Concurrency configuration
+# With ~0.35s between request starts and a few hundred ms of network latency per
+# request, a handful of requests in flight is enough to keep the rate limiter busy.
+MAX_CONCURRENT_REQUESTS = 4
+
+# Pages a PageUpdateBuffer holds before flushing on its own
+PAGE_UPDATE_BUFFER_SIZE = 100
+
+# Upper bounds (seconds) of the latency histogram buckets kept per endpoint
+# method; slower calls land in a final overflow bucket
+LATENCY_HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Connection pool shared by all sync clients in a process (see SharedHTTPTransport)
+HTTP_MAX_CONNECTIONS = 10
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+# httpx drops idle connections after 5s by default, which is shorter than a
+# limiter pause or the gap between script phases, so handshakes would repeat
+HTTP_KEEPALIVE_EXPIRY = 300.0  # seconds
+# HTTP/2 multiplexes concurrent requests over one connection; needs the h2 package
+HTTP2_ENABLED = os.environ.get("NOTION_HTTP2", "").lower() in ("1", "true", "yes")
+
+# How long a databases.retrieve result is served from the schema cache
+SCHEMA_CACHE_TTL = 300.0  # seconds
+
+# Sliding-window call budgets as (max_calls, window_seconds)
+# Notion allows 3 req/sec on average and 2700 calls per 15 minutes. The token
+# bucket keeps the short-term rate; these windows make sure the averages hold
+# over 10 seconds and over the full 15 minutes, however the calls are bunched.
+CALL_BUDGET_LIMITS = (
+    (30, 10.0),  # 3 req/sec averaged over 10 seconds
+    (2700, 15 * 60.0),  # 2700 calls per 15 minutes
+)
+
+# Rate limiting modes
+RATE_LIMIT_MODE_FIXED = "fixed"  # ProactiveRateLimiter: fixed delay between calls
+RATE_LIMIT_MODE_TOKEN_BUCKET = "token_bucket"  # TokenBucketRateLimiter: bursts + average rate
+RATE_LIMIT_MODE_ADAPTIVE = "adaptive"  # AdaptiveRateLimiter: token bucket with AIMD rate
+RATE_LIMIT_MODE_SHARED = "shared"  # SharedFileRateLimiter: token bucket shared by all processes on the host
+RATE_LIMIT_MODE_NONE = "none"  # UnthrottledRateLimiter: no pacing at all, for cassette replays and fakes
+
+# Cross-process limiter ledger; point NOTION_RATE_LIMIT_FILE at a shared volume
+# when processes run in separate containers on the same host
+SHARED_RATE_LIMIT_FILE = os.environ.get(
+    "NOTION_RATE_LIMIT_FILE",
+    os.path.join(tempfile.gettempdir(), "notion_rate_limiter.json"),
+)
+
+# The shared limiter is the default wherever file locking is available, so the
+# scheduler, maintenance scripts and integration tests draw from one budget.
+# NOTION_RATE_LIMIT_MODE overrides the default for every client in the process.
+DEFAULT_RATE_LIMIT_MODE = os.environ.get(
+    "NOTION_RATE_LIMIT_MODE",
+    RATE_LIMIT_MODE_SHARED if fcntl is not None else RATE_LIMIT_MODE_TOKEN_BUCKET,
+)
+
+# JSON-lines file to trace every API call to (see TraceSink); tracing is off
+# unless this is set
+TRACE_FILE = os.environ.get("NOTION_TRACE_FILE")
+
+# JSON file to keep page payloads in between runs (see PageCache); the cache is
+# off unless this is set
+PAGE_CACHE_FILE = os.environ.get("NOTION_PAGE_CACHE_FILE")
+# Notion rounds last_edited_time down to the minute, so a second edit in the
+# same minute wouldn't change it; pages edited this recently aren't cached
+PAGE_CACHE_SETTLE_TIME = 120.0  # seconds
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of waiting when a wait would run past the run deadline."""
+
+
+class RunDeadline:
+    """
+    Point in time a whole run must finish by.
+
+    Every rate-limit wait, call-budget wait and retry sleep checks the active
+    deadline first and raises ``DeadlineExceeded`` rather than sleeping past
+    it, so a run stuck behind backoff fails fast instead of overlapping the
+    next scheduled job. In-flight requests are not interrupted.
+    """
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError(f"Deadline must be positive, got {seconds}")
+        self._seconds = seconds
+        self._expires_at = time.monotonic() + seconds
+
+    @property
+    def seconds(self) -> float:
+        """Length of the run budget in seconds."""
+        return self._seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (negative once it has passed)."""
+        return self._expires_at - time.monotonic()
+
+    def check(self, wait_time: float = 0.0, reason: str = "call"):
+        """Raise DeadlineExceeded if waiting ``wait_time`` seconds would pass the deadline."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{self._seconds:.0f}s run deadline passed before {reason}")
+        if wait_time > remaining:
+            raise DeadlineExceeded(
+                f"{self._seconds:.0f}s run deadline exceeded: {reason} needs {wait_time:.1f}s "
+                f"but {remaining:.1f}s remain"
+            )
+
+
+# Deadline for the current run (see run_deadline); None means unbounded
+_run_deadline = None
+_run_deadline_lock = threading.Lock()
+
+
+def get_run_deadline() -> Optional[RunDeadline]:
+    """Return the active run deadline, or None if the run is unbounded."""
+    return _run_deadline
+
+
+@contextmanager
+def run_deadline(seconds: Optional[float]):
+    """
+    Bound every Notion call made inside the block to ``seconds`` from now.
+
+    The deadline is process-wide, so calls from worker threads respect it too.
+    Nested deadlines never extend an outer one. ``None`` leaves the current
+    deadline (if any) in place.
+    """
+    global _run_deadline
+    with _run_deadline_lock:
+        previous = _run_deadline
+        if seconds is not None:
+            deadline = RunDeadline(seconds)
+            if previous is None or deadline.remaining() < previous.remaining():
+                _run_deadline = deadline
+    try:
+        yield _run_deadline
+    finally:
+        with _run_deadline_lock:
+            _run_deadline = previous
+
+
+def _check_run_deadline(wait_time: float = 0.0, reason: str = "call"):
+    deadline = _run_deadline
+    if deadline is not None:
+        deadline.check(wait_time, reason)
+
+
+def _sleep(seconds: float, reason: str):
+    """Sleep unless that would run past the run deadline."""
+    _check_run_deadline(seconds, reason)
+    time.sleep(seconds)
+
+
+async def _async_sleep(seconds: float, reason: str):
+    """Async counterpart of _sleep."""
+    _check_run_deadline(seconds, reason)
+    await asyncio.sleep(seconds)
+
+
+class ProactiveRateLimiter:
+    """
+    Thread-safe rate limiter that enforces a minimum delay between API calls.
+
+    This prevents hitting Notion's rate limits by proactively spacing out requests
+    rather than only reacting after receiving 429 errors.
+    """
+
+    def __init__(self, min_delay: float = MIN_DELAY_BETWEEN_CALLS):
+        self._min_delay = min_delay
+        self._last_call_time = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next call slot and return how long the caller must wait for it."""
+        with self._lock:
+            current_time = time.time()
+            next_slot = max(current_time, self._last_call_time + self._min_delay)
+            self._last_call_time = next_slot
+            return next_slot - current_time
+
+    def wait_if_needed(self):
+        """
+        Wait if necessary to maintain the minimum delay between calls.
+
+        The slot is claimed under the lock but the sleep happens outside it, so
+        concurrent callers queue up for consecutive slots instead of serializing
+        on the lock.
+        """
+        wait_time = self.reserve()
+        if wait_time > 0:
+            _sleep(wait_time, "rate limiter wait")
+
+    def pause(self, seconds: float):
+        """Hold back the next call until at least ``seconds`` from now."""
+        with self._lock:
+            resume_at = time.time() + seconds
+            self._last_call_time = max(self._last_call_time, resume_at - self._min_delay)
+
+    def record_success(self, latency: float):
+        """Feedback hook for a successful call (unused by the fixed limiter)."""
+
+    def record_rate_limited(self):
+        """Feedback hook for a 429 response (unused by the fixed limiter)."""
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket rate limiter.
+
+    The bucket holds up to ``capacity`` tokens and refills at ``rate`` tokens per
+    second. Each call takes one token, so a burst of up to ``capacity`` calls goes
+    out immediately and the long-run average stays at ``rate`` calls per second.
+
+    When the bucket is empty the token is borrowed (the balance goes negative) and
+    the caller sleeps until it would have been refilled. The sleep happens outside
+    the lock, so waiting callers are queued in arrival order without blocking each
+    other's bookkeeping.
+    """
+
+    def __init__(self, rate: float = TOKEN_BUCKET_RATE, capacity: float = TOKEN_BUCKET_CAPACITY):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self._rate = float(rate)
+        self._capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last_refill = self._now()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Refill rate in tokens (calls) per second."""
+        return self._rate
+
+    @property
+    def capacity(self) -> float:
+        """Maximum number of tokens, i.e. the largest burst allowed."""
+        return self._capacity
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    @contextmanager
+    def _locked_state(self):
+        """Hold the lock while reading and updating the bucket state."""
+        with self._lock:
+            yield
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._rate)
+            self._last_refill = now
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self._locked_state():
+            now = self._now()
+            self._refill(now)
+            self._tokens -= 1.0
+            # _last_refill is in the future while the bucket is paused
+            wait_time = max(0.0, self._last_refill - now)
+            if self._tokens < 0:
+                wait_time += -self._tokens / self._rate
+            return wait_time
+
+    def wait_if_needed(self):
+        """Wait if necessary until a token is available for this call."""
+        wait_time = self.reserve()
+        if wait_time > 0:
+            _sleep(wait_time, "rate limiter wait")
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out tokens for ``seconds``.
+
+        Used when Notion tells us to back off: the bucket resumes with a single
+        token after the pause, so callers don't burst straight back into a 429.
+        """
+        with self._locked_state():
+            now = self._now()
+            self._refill(now)
+            self._tokens = min(self._tokens, 1.0)
+            self._last_refill = max(self._last_refill, now + seconds)
+
+    def record_success(self, latency: float):
+        """Feedback hook for a successful call (unused by the fixed-rate bucket)."""
+
+    def record_rate_limited(self):
+        """Feedback hook for a 429 response (unused by the fixed-rate bucket)."""
+
+
+class AdaptiveRateLimiter(TokenBucketRateLimiter):
+    """
+    Token bucket whose refill rate is tuned with AIMD (additive increase,
+    multiplicative decrease).
+
+    Every successful call raises the rate by ``increase_step``; a 429 or a call
+    slower than ``latency_threshold`` multiplies it by ``decrease_factor``. Cuts
+    within ``decrease_cooldown`` of the previous one are ignored, so a batch of
+    in-flight calls failing together only halves the rate once.
+
+    The current rate is available as ``rate`` and the most recent changes as
+    ``history`` so the rate it settles at can be inspected in production.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = ADAPTIVE_INITIAL_RATE,
+        capacity: float = TOKEN_BUCKET_CAPACITY,
+        min_rate: float = ADAPTIVE_MIN_RATE,
+        max_rate: float = ADAPTIVE_MAX_RATE,
+        increase_step: float = ADAPTIVE_INCREASE_STEP,
+        decrease_factor: float = ADAPTIVE_DECREASE_FACTOR,
+        latency_threshold: float = ADAPTIVE_LATENCY_THRESHOLD,
+        decrease_cooldown: float = ADAPTIVE_DECREASE_COOLDOWN,
+        history_size: int = ADAPTIVE_HISTORY_SIZE,
+    ):
+        if not 0 < min_rate <= initial_rate <= max_rate:
+            raise ValueError(
+                f"Expected 0 < min_rate <= initial_rate <= max_rate, "
+                f"got {min_rate}, {initial_rate}, {max_rate}"
+            )
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"decrease_factor must be between 0 and 1, got {decrease_factor}")
+        super().__init__(rate=initial_rate, capacity=capacity)
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._increase_step = increase_step
+        self._decrease_factor = decrease_factor
+        self._latency_threshold = latency_threshold
+        self._decrease_cooldown = decrease_cooldown
+        self._last_decrease = None
+        self._history = deque(maxlen=history_size)
+
+    @property
+    def history(self) -> list:
+        """
+        Most recent rate changes, oldest first.
+
+        Each entry is a dict with ``time`` (epoch seconds), ``reason``
+        ("increase", "rate_limited" or "latency"), ``previous_rate`` and ``rate``.
+        """
+        with self._lock:
+            return list(self._history)
+
+    def _set_rate(self, new_rate: float, reason: str):
+        """Change the refill rate; must be called with the lock held."""
+        new_rate = max(self._min_rate, min(self._max_rate, new_rate))
+        if new_rate == self._rate:
+            return
+        # Settle tokens earned at the old rate before switching
+        self._refill(self._now())
+        self._history.append({
+            "time": time.time(),
+            "reason": reason,
+            "previous_rate": self._rate,
+            "rate": new_rate,
+        })
+        self._rate = new_rate
+
+    def _decrease(self, reason: str):
+        now = time.monotonic()
+        with self._lock:
+            if self._last_decrease is not None and now - self._last_decrease < self._decrease_cooldown:
+                return
+            self._last_decrease = now
+            self._set_rate(self._rate * self._decrease_factor, reason)
+        logger.info(f"Adaptive rate limiter: {reason}, rate reduced to {self._rate:.2f} req/sec")
+
+    def record_success(self, latency: float):
+        """Raise the rate after a fast success, or cut it after a latency spike."""
+        if latency > self._latency_threshold:
+            self._decrease("latency")
+            return
+        with self._lock:
+            self._set_rate(self._rate + self._increase_step, "increase")
+
+    def record_rate_limited(self):
+        """Cut the rate after a 429 response."""
+        self._decrease("rate_limited")
+
+
+class SharedFileRateLimiter(TokenBucketRateLimiter):
+    """
+    Token bucket shared by every process on the host.
+
+    The bucket state (token balance and last refill time, in wall-clock seconds)
+    lives in a small JSON ledger file. Each reservation takes an exclusive
+    ``flock`` on ``<ledger>.lock``, reads the ledger, updates it and writes it
+    back, so the scheduler, maintenance scripts and test runs all spend the same
+    per-integration-token budget. A pause after a 429 is written to the ledger
+    too, so every process backs off together.
+
+    A missing or unreadable ledger starts again from a full bucket.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        rate: float = TOKEN_BUCKET_RATE,
+        capacity: float = TOKEN_BUCKET_CAPACITY,
+    ):
+        if fcntl is None:
+            raise RuntimeError("SharedFileRateLimiter requires fcntl file locking (POSIX only)")
+        self._path = path or SHARED_RATE_LIMIT_FILE
+        self._lock_path = f"{self._path}.lock"
+        super().__init__(rate=rate, capacity=capacity)
+
+    @property
+    def path(self) -> str:
+        """Path of the shared ledger file."""
+        return self._path
+
+    def _now(self) -> float:
+        # Monotonic clocks aren't comparable across processes
+        return time.time()
+
+    def _load(self):
+        try:
+            with open(self._path, "r") as f:
+                state = json.load(f)
+            self._tokens = min(self._capacity, float(state["tokens"]))
+            self._last_refill = float(state["last_refill"])
+        except (OSError, ValueError, KeyError, TypeError):
+            self._tokens = self._capacity
+            self._last_refill = self._now()
+
+    def _save(self):
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"tokens": self._tokens, "last_refill": self._last_refill}, f)
+        os.replace(tmp_path, self._path)
+
+    @contextmanager
+    def _locked_state(self):
+        """Hold the thread lock and the file lock while updating the shared ledger."""
+        with self._lock:
+            with open(self._lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._load()
+                    yield
+                    self._save()
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class UnthrottledRateLimiter:
+    """
+    Limiter that never waits.
+
+    For runs that never reach Notion, such as cassette replays, where pacing
+    would only measure the limiter and draw from the shared budget of real
+    runs on the same host.
+    """
+
+    def reserve(self) -> float:
+        return 0.0
+
+    def wait_if_needed(self):
+        pass
+
+    def pause(self, seconds: float):
+        pass
+
+    def record_success(self, latency: float):
+        pass
+
+    def record_rate_limited(self):
+        pass
+
+
+def create_rate_limiter(mode: str = DEFAULT_RATE_LIMIT_MODE):
+    """
+    Create a new rate limiter for the given mode.
+
+    Args:
+        mode: RATE_LIMIT_MODE_SHARED, RATE_LIMIT_MODE_TOKEN_BUCKET,
+            RATE_LIMIT_MODE_FIXED, RATE_LIMIT_MODE_ADAPTIVE or RATE_LIMIT_MODE_NONE
+
+    Returns:
+        A limiter exposing ``wait_if_needed()``, ``pause()`` and the
+        ``record_success()``/``record_rate_limited()`` feedback hooks
+    """
+    if mode == RATE_LIMIT_MODE_TOKEN_BUCKET:
+        return TokenBucketRateLimiter()
+    if mode == RATE_LIMIT_MODE_SHARED:
+        return SharedFileRateLimiter()
+    if mode == RATE_LIMIT_MODE_ADAPTIVE:
+        return AdaptiveRateLimiter()
+    if mode == RATE_LIMIT_MODE_FIXED:
+        return ProactiveRateLimiter()
+    if mode == RATE_LIMIT_MODE_NONE:
+        return UnthrottledRateLimiter()
+    raise ValueError(f"Unknown rate limit mode: {mode!r}")
+
+
+# Global rate limiter instance shared across all clients
+_global_rate_limiter = create_rate_limiter(DEFAULT_RATE_LIMIT_MODE)
+
+# Process-wide limiters for non-default modes, created on first use
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(mode: str = None):
+    """
+    Return the process-wide rate limiter for ``mode``.
+
+    Clients created with the same mode share one limiter, so their calls draw
+    from the same budget. ``None`` or the default mode returns the global limiter.
+    """
+    if mode is None or mode == DEFAULT_RATE_LIMIT_MODE:
+        return _global_rate_limiter
+    with _rate_limiters_lock:
+        if mode not in _rate_limiters:
+            _rate_limiters[mode] = create_rate_limiter(mode)
+        return _rate_limiters[mode]
+
+
+class SlidingWindowCallBudget:
+    """
+    Thread-safe ledger of recent call times enforcing sliding-window limits.
+
+    Each limit is a ``(max_calls, window_seconds)`` pair; ``acquire()`` records a
+    call once every window has room, sleeping until the oldest call in a full
+    window drops out. Large runs therefore slow to the sustainable rate as the
+    15-minute budget runs low instead of spending it all and stalling on 429s.
+    ``remaining()`` and ``status()`` report how much budget is left.
+    """
+
+    def __init__(self, limits=CALL_BUDGET_LIMITS):
+        if not limits:
+            raise ValueError("At least one (max_calls, window_seconds) limit is required")
+        for max_calls, window in limits:
+            if max_calls < 1 or window <= 0:
+                raise ValueError(f"Invalid call budget limit: {max_calls} calls per {window}s")
+        self._limits = tuple(sorted(limits, key=lambda limit: limit[1]))
+        self._horizon = self._limits[-1][1]
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def limits(self) -> tuple:
+        """The ``(max_calls, window_seconds)`` limits, shortest window first."""
+        return self._limits
+
+    def _prune(self, now: float):
+        while self._calls and self._calls[0] <= now - self._horizon:
+            self._calls.popleft()
+
+    def _count_since(self, start: float) -> int:
+        return len(self._calls) - bisect_right(self._calls, start)
+
+    def _wait_time(self, now: float) -> float:
+        wait_time = 0.0
+        for max_calls, window in self._limits:
+            if self._count_since(now - window) >= max_calls:
+                # The window frees up once its max_calls-th most recent call expires
+                oldest_blocking = self._calls[len(self._calls) - max_calls]
+                wait_time = max(wait_time, oldest_blocking + window - now)
+        return wait_time
+
+    def try_acquire(self) -> float:
+        """
+        Record a call if every window has room.
+
+        Returns 0 if the call was recorded, otherwise how long to wait before
+        trying again (nothing is recorded in that case).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            wait_time = self._wait_time(now)
+            if wait_time <= 0:
+                self._calls.append(now)
+                return 0.0
+        logger.info(f"Notion call budget exhausted, waiting {wait_time:.1f}s for the window to free up")
+        return wait_time
+
+    def acquire(self):
+        """Wait until every window has room, then record a call."""
+        while True:
+            wait_time = self.try_acquire()
+            if wait_time <= 0:
+                return
+            _sleep(wait_time, "call budget wait")
+
+    def remaining(self) -> int:
+        """Calls that can be made right now before hitting any window's limit."""
+        return min(entry["remaining"] for entry in self.status())
+
+    def status(self) -> list:
+        """
+        Budget usage per window.
+
+        Returns a list of dicts with ``window`` (seconds), ``limit``, ``used``
+        and ``remaining`` for each configured limit, shortest window first.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            status = []
+            for max_calls, window in self._limits:
+                used = self._count_since(now - window)
+                status.append({
+                    "window": window,
+                    "limit": max_calls,
+                    "used": used,
+                    "remaining": max(0, max_calls - used),
+                })
+            return status
+
+
+# Process-wide call budget shared by all clients (Notion's limits are per integration)
+_global_call_budget = SlidingWindowCallBudget()
+
+# Budget for RATE_LIMIT_MODE_NONE clients: effectively no limit
+_unlimited_call_budget = SlidingWindowCallBudget(limits=((sys.maxsize, 1.0),))
+
+
+def _call_budget_for(mode: Optional[str]) -> Optional[SlidingWindowCallBudget]:
+    """The call budget for clients in ``mode``: unlimited when unthrottled, else the global one (None)."""
+    return _unlimited_call_budget if (mode or DEFAULT_RATE_LIMIT_MODE) == RATE_LIMIT_MODE_NONE else None
+
+
+class ClientStats:
+    """
+    Thread-safe counters describing where API time goes.
+
+    Records, per endpoint method (e.g. ``databases.query``), the number of
+    attempts, how many failed and a latency histogram, along with the total
+    time spent waiting on the rate limiter and call budget, the total time
+    slept between retries and the number of 429 responses.
+    """
+
+    def __init__(self, buckets=LATENCY_HISTOGRAM_BUCKETS):
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._methods = {}
+            self._limiter_wait = 0.0
+            self._retry_sleep = 0.0
+            self._rate_limited = 0
+
+    def _bucket_labels(self) -> list:
+        return [f"<={bound:g}s" for bound in self._buckets] + [f">{self._buckets[-1]:g}s"]
+
+    def record_call(self, method: str, latency: float, error: bool = False):
+        """Record one attempt of ``method`` that took ``latency`` seconds."""
+        with self._lock:
+            entry = self._methods.get(method)
+            if entry is None:
+                entry = self._methods[method] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "total_latency": 0.0,
+                    "max_latency": 0.0,
+                    "histogram": [0] * (len(self._buckets) + 1),
+                }
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["total_latency"] += latency
+            entry["max_latency"] = max(entry["max_latency"], latency)
+            entry["histogram"][bisect_left(self._buckets, latency)] += 1
+
+    def record_limiter_wait(self, seconds: float):
+        with self._lock:
+            self._limiter_wait += seconds
+
+    def record_retry_sleep(self, seconds: float):
+        with self._lock:
+            self._retry_sleep += seconds
+
+    def record_rate_limited(self):
+        with self._lock:
+            self._rate_limited += 1
+
+    def snapshot(self) -> dict:
+        """
+        Current stats as plain data.
+
+        ``methods`` maps each method name to its ``calls``, ``errors``,
+        ``total_latency``, ``mean_latency``, ``max_latency`` and ``histogram``
+        (bucket label to count).
+        """
+        labels = self._bucket_labels()
+        with self._lock:
+            methods = {
+                method: {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "total_latency": entry["total_latency"],
+                    "mean_latency": entry["total_latency"] / entry["calls"],
+                    "max_latency": entry["max_latency"],
+                    "histogram": dict(zip(labels, entry["histogram"])),
+                }
+                for method, entry in self._methods.items()
+            }
+            return {
+                "methods": methods,
+                "limiter_wait": self._limiter_wait,
+                "retry_sleep": self._retry_sleep,
+                "rate_limited": self._rate_limited,
+            }
+
+    def summary(self) -> str:
+        """Human-readable summary, busiest methods first."""
+        snapshot = self.snapshot()
+        methods = sorted(snapshot["methods"].items(), key=lambda item: item[1]["total_latency"], reverse=True)
+        total_calls = sum(entry["calls"] for _, entry in methods)
+        lines = [
+            f"Notion API stats: {total_calls} calls, "
+            f"{snapshot['limiter_wait']:.1f}s waiting on rate limiter, "
+            f"{snapshot['retry_sleep']:.1f}s in retry sleeps, "
+            f"{snapshot['rate_limited']} rate limited (429) responses"
+        ]
+        for method, entry in methods:
+            histogram = " ".join(f"{label}:{count}" for label, count in entry["histogram"].items() if count)
+            lines.append(
+                f"  {method}: {entry['calls']} calls ({entry['errors']} failed), "
+                f"total {entry['total_latency']:.1f}s, mean {entry['mean_latency']:.3f}s, "
+                f"max {entry['max_latency']:.3f}s [{histogram}]"
+            )
+        return "\n".join(lines)
+
+
+# Process-wide stats shared by all clients
+_global_client_stats = ClientStats()
+
+
+def get_client_stats() -> ClientStats:
+    """Return the process-wide API stats recorded by all clients."""
+    return _global_client_stats
+
+
+def _param_shape(value: Any) -> Any:
+    """Replace the values in call parameters with their type names, keeping the structure."""
+    if isinstance(value, dict):
+        return {key: _param_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_param_shape(value[0])] if value else []
+    return type(value).__name__
+
+
+# Caller recorded when a call was handed to a worker thread (see _with_caller);
+# the worker's own stack only leads back to the thread pool
+_submitting_caller = contextvars.ContextVar("notion_submitting_caller", default=None)
+
+
+def _caller_name() -> str:
+    """
+    Name the function making a call: the one that submitted it if it runs on a
+    worker thread, else the first function up the stack outside this module
+    and the standard plumbing.
+    """
+    submitted_by = _submitting_caller.get()
+    if submitted_by is not None:
+        return submitted_by
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        code = frame.f_code
+        # Comprehension and generator-expression frames are named after the enclosing function instead
+        comprehension = code.co_name.startswith("<") and code.co_name != "<module>"
+        if module != __name__ and not comprehension and not module.startswith(("functools", "concurrent.", "asyncio", "threading")):
+            script = os.path.splitext(os.path.basename(code.co_filename))[0]
+            # Qualified so methods name their class, but not nested functions' enclosing ones
+            name = getattr(code, "co_qualname", code.co_name).rsplit(".<locals>.", 1)[-1]
+            return f"{script}.{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _with_caller(fn: Callable, caller: str) -> Callable:
+    """Wrap fn so calls it makes on another thread are traced to caller."""
+    @wraps(fn)
+    def run(*args, **kwargs):
+        token = _submitting_caller.set(caller)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _submitting_caller.reset(token)
+    return run
+
+
+class TraceSink:
+    """
+    Appends one JSON object per API call to a JSON-lines file.
+
+    Each event records the endpoint method, the calling function, the target
+    ID and shape of the parameters (values replaced by type names) with a hash
+    of the full parameters so identical queries can be spotted, the response
+    size, and where the call's time went: waiting on the rate limiter and
+    budget, on the network and sleeping between retries. Analyze traces with
+    ``scripts/analyze_notion_trace.py``.
+
+    Tracing is off by default; set ``NOTION_TRACE_FILE`` or pass a sink to a client.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def record(self, event: dict):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            with open(self._path, "a") as f:
+                f.write(line + "\n")
+
+    def record_call(
+        self,
+        method: str,
+        caller: str,
+        params: dict,
+        started_at: float,
+        attempts: int,
+        queue_wait: float,
+        network_time: float,
+        retry_sleep: float,
+        result: Any = None,
+        error: Exception = None,
+    ):
+        """Build and record the trace event for one call, including all of its retries."""
+        target = next((params[key] for key in ("database_id", "page_id", "block_id") if key in params), None)
+        serialized = json.dumps(params, sort_keys=True, default=str)
+        event = {
+            "ts": started_at,
+            "duration": time.time() - started_at,
+            "method": method,
+            "caller": caller,
+            "thread": threading.current_thread().name,
+            "target": target,
+            "params": _param_shape(params),
+            "params_hash": hashlib.sha1(serialized.encode()).hexdigest()[:16],
+            "queue_wait": queue_wait,
+            "network_time": network_time,
+            "retry_sleep": retry_sleep,
+            "retries": attempts - 1,
+            "status": "ok" if error is None else type(error).__name__,
+            "response_bytes": None,
+            "result_count": None,
+        }
+        if isinstance(result, dict):
+            event["response_bytes"] = len(json.dumps(result, default=str))
+            if isinstance(result.get("results"), list):
+                event["result_count"] = len(result["results"])
+        self.record(event)
+
+
+# Process-wide trace sink, enabled by NOTION_TRACE_FILE
+_global_trace_sink = TraceSink(TRACE_FILE) if TRACE_FILE else None
+
+
+def _transport_options(http2: Optional[bool]) -> dict:
+    """Connection limits and HTTP version for pooled transports."""
+    if http2 is None:
+        http2 = HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "http2": http2,
+    }
+
+
+class SharedHTTPTransport(httpx.HTTPTransport):
+    """
+    Pooled HTTP transport reused by every sync client in a process.
+
+    Each ``notion_client.Client`` normally builds its own ``httpx.Client`` and
+    connection pool, so every script run (and every client) starts with a TLS
+    handshake. Clients built on this transport share one pool with a long
+    keep-alive instead. ``httpx.Client.close()`` closes its transport, so
+    ``close()`` is a no-op here to keep one client from closing the pool under
+    the others; ``shutdown()`` actually closes it.
+    """
+
+    def __init__(self, http2: Optional[bool] = None):
+        super().__init__(**_transport_options(http2))
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        """Close every pooled connection."""
+        super().close()
+
+
+_global_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_shared_transport() -> httpx.BaseTransport:
+    """
+    Return the process-wide pooled transport, creating it on first use.
+
+    If NOTION_CASSETTE is set, this is a CassetteTransport recording through
+    (or replaying instead of) the pooled transport; see utils/notion_cassette.py.
+    """
+    global _global_transport
+    with _transport_lock:
+        if _global_transport is None:
+            pooled = SharedHTTPTransport()
+            _global_transport = cassette_from_env(inner=pooled) or pooled
+        return _global_transport
+
+
+def set_shared_transport(transport: Optional[httpx.BaseTransport]):
+    """Replace the process-wide transport (None creates a fresh one on next use); the old one is shut down."""
+    global _global_transport
+    with _transport_lock:
+        previous, _global_transport = _global_transport, transport
+    if previous is not None and previous is not transport:
+        previous.shutdown()
+
+
+def is_rate_limited_error(error: Exception) -> bool:
+    """Check whether an error is a Notion 429 rate limit response."""
+    if isinstance(error, APIResponseError) and error.code == "rate_limited":
+        return True
+    return isinstance(error, HTTPResponseError) and getattr(error, 'status', None) == 429
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After header from an HTTP error response.
+
+    Notion sends Retry-After as a number of seconds; the HTTP-date form is also
+    accepted. Returns None if the header is missing or unparseable.
+    """
+    headers = getattr(error, 'headers', None)
+    if not headers:
+        return None
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring unparseable Retry-After header: {value!r}")
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return max(0.0, seconds)
+
+
+class RetryPolicy:
+    """
+    Which failures are retried, how long to back off and when to give up.
+
+    Retryable failures are 429s, the transient HTTP statuses in
+    ``retry_statuses`` (5xx by default), request timeouts and dropped or reset
+    connections. Waits honor Retry-After when the response has one and
+    otherwise use full-jitter exponential backoff: a random delay between 0 and
+    ``initial_delay * backoff_multiplier ** (attempt - 1)``, capped at
+    ``max_delay``. A call gives up after ``max_retries`` attempts or when the
+    next wait would take it past ``deadline`` seconds since its first attempt.
+
+    Calls that create objects are not idempotent: for those only failures where
+    the request certainly had no effect (429s and refused connections) are
+    retried, so a timeout or 5xx can't produce a duplicate page.
+
+    ``counters`` tracks how often each class of retryable error fired.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        initial_delay: float = INITIAL_RETRY_DELAY,
+        max_delay: float = MAX_RETRY_DELAY,
+        backoff_multiplier: float = BACKOFF_MULTIPLIER,
+        retry_statuses=RETRYABLE_STATUS_CODES,
+        retry_timeouts: bool = True,
+        retry_connection_errors: bool = True,
+        jitter: bool = True,
+        deadline: Optional[float] = RETRY_CALL_DEADLINE,
+    ):
+        if max_retries < 1:
+            raise ValueError(f"max_retries must be at least 1, got {max_retries}")
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff_multiplier = backoff_multiplier
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_timeouts = retry_timeouts
+        self.retry_connection_errors = retry_connection_errors
+        self.jitter = jitter
+        self.deadline = deadline
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def counters(self) -> dict:
+        """Number of times each retryable error class fired, e.g. ``{"http_503": 2}``."""
+        with self._lock:
+            return dict(self._counters)
+
+    def record(self, error_class: str):
+        with self._lock:
+            self._counters[error_class] += 1
+
+    def classify(self, error: Exception, idempotent: bool = True) -> Optional[str]:
+        """
+        Return the retryable error class for ``error``, or None if it must be raised.
+
+        Classes are ``rate_limited``, ``http_<status>``, ``timeout`` and ``connection``.
+        """
+        if is_rate_limited_error(error):
+            return "rate_limited"
+        if isinstance(error, httpx.ConnectError):
+            # The request never reached Notion, so even creates are safe to retry
+            return "connection" if self.retry_connection_errors else None
+        if not idempotent:
+            return None
+        if isinstance(error, HTTPResponseError):
+            status = getattr(error, 'status', None)
+            return f"http_{status}" if status in self.retry_statuses else None
+        if isinstance(error, (RequestTimeoutError, httpx.TimeoutException)):
+            return "timeout" if self.retry_timeouts else None
+        if isinstance(error, (httpx.NetworkError, httpx.RemoteProtocolError)):
+            return "connection" if self.retry_connection_errors else None
+        return None
+
+    def backoff(self, attempt: int) -> float:
+        """Backoff before retry number ``attempt`` (1-based) when there is no Retry-After."""
+        ceiling = min(self.max_delay, self.initial_delay * self.backoff_multiplier ** (attempt - 1))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+
+# Process-wide retry policy shared by all clients
+_global_retry_policy = RetryPolicy()
+
+
+def is_outage_error(error: Exception) -> bool:
+    """True for failures that suggest Notion is down: 5xx, timeouts and connection errors."""
+    if isinstance(error, HTTPResponseError):
+        return (getattr(error, 'status', None) or 0) >= 500
+    return isinstance(error, (RequestTimeoutError, httpx.TransportError))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Notion while the circuit breaker is open."""
+
+    def __init__(self, message: str, retry_in: float):
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker over Notion call outcomes.
+
+    Closed, it records whether each attempt failed with an outage error (see
+    ``is_outage_error``); other errors, such as validation errors, count as
+    successes because Notion answered. Once ``failure_rate`` of the last
+    ``window_size`` attempts failed (with at least ``min_calls`` recorded) it
+    opens, and ``allow()`` raises ``CircuitOpenError`` without spending rate
+    budget. After ``open_duration`` seconds it goes half-open and lets a single
+    trial call through: success closes the breaker, failure reopens it. A trial
+    that never reports back is given up on after another ``open_duration``.
+
+    ``state`` and ``status()`` let callers such as the scheduler postpone work
+    while Notion is down.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        window_size: int = CIRCUIT_WINDOW_SIZE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        open_duration: float = CIRCUIT_OPEN_DURATION,
+    ):
+        if not 0 < failure_rate <= 1:
+            raise ValueError(f"failure_rate must be between 0 and 1, got {failure_rate}")
+        if not 1 <= min_calls <= window_size:
+            raise ValueError(f"Expected 1 <= min_calls <= window_size, got {min_calls}, {window_size}")
+        self._failure_rate = failure_rate
+        self._min_calls = min_calls
+        self._open_duration = open_duration
+        self._outcomes = deque(maxlen=window_size)
+        self._state = CIRCUIT_CLOSED
+        self._opened_at = None
+        self._trial_started_at = None
+        self._lock = threading.Lock()
+
+    def _update_state(self, now: float):
+        """Move from open to half-open once the open duration has passed; lock must be held."""
+        if self._state == CIRCUIT_OPEN and now - self._opened_at >= self._open_duration:
+            self._state = CIRCUIT_HALF_OPEN
+            self._trial_started_at = None
+
+    @property
+    def state(self) -> str:
+        """CIRCUIT_CLOSED, CIRCUIT_OPEN or CIRCUIT_HALF_OPEN."""
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def status(self) -> dict:
+        """
+        Current state, recent failure rate and, while open, ``retry_in``: seconds
+        until a trial call will be allowed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            retry_in = self._opened_at + self._open_duration - now if self._state == CIRCUIT_OPEN else 0.0
+            return {
+                "state": self._state,
+                "calls": len(self._outcomes),
+                "failure_rate": self._current_failure_rate(),
+                "retry_in": max(0.0, retry_in),
+            }
+
+    def _current_failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def allow(self, func_name: str = "call"):
+        """Raise CircuitOpenError unless a call may be made now."""
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            if self._state == CIRCUIT_CLOSED:
+                return
+            if self._state == CIRCUIT_HALF_OPEN:
+                if self._trial_started_at is None or now - self._trial_started_at >= self._open_duration:
+                    self._trial_started_at = now
+                    logger.info(f"Circuit breaker half-open: trying {func_name}")
+                    return
+                retry_in = self._trial_started_at + self._open_duration - now
+            else:
+                retry_in = self._opened_at + self._open_duration - now
+        raise CircuitOpenError(f"Notion circuit breaker is {self._state}; not calling {func_name}", retry_in)
+
+    def record_success(self):
+        """Record an attempt Notion answered; closes a half-open breaker."""
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._state = CIRCUIT_CLOSED
+                self._outcomes.clear()
+                logger.info("Circuit breaker closed: Notion is answering again")
+            if self._state == CIRCUIT_CLOSED:
+                self._outcomes.append(True)
+
+    def record_failure(self, error: Exception):
+        """Record a failed attempt; outage errors can open the breaker."""
+        if not is_outage_error(error):
+            self.record_success()
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._state == CIRCUIT_HALF_OPEN:
+                self._open(now, f"trial call failed ({type(error).__name__})")
+                return
+            if self._state != CIRCUIT_CLOSED:
+                return
+            self._outcomes.append(False)
+            if len(self._outcomes) >= self._min_calls and self._current_failure_rate() >= self._failure_rate:
+                self._open(now, f"{self._current_failure_rate():.0%} of the last {len(self._outcomes)} calls failed")
+
+    def _open(self, now: float, reason: str):
+        """Open the breaker; lock must be held."""
+        self._state = CIRCUIT_OPEN
+        self._opened_at = now
+        self._trial_started_at = None
+        logger.warning(f"Circuit breaker opened: {reason}. Failing Notion calls fast for {self._open_duration:.0f}s")
+
+    def reset(self):
+        """Close the breaker and forget recorded outcomes."""
+        with self._lock:
+            self._state = CIRCUIT_CLOSED
+            self._outcomes.clear()
+            self._opened_at = None
+            self._trial_started_at = None
+
+
+# Process-wide circuit breaker shared by all clients, so one client seeing an
+# outage stops the others from hammering Notion too
+_global_circuit_breaker = CircuitBreaker()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide circuit breaker (e.g. to check its state before starting a job)."""
+    return _global_circuit_breaker
 
-class ProactiveRateLimiter:
+
+def _prepare_retry(
+    error: Exception,
+    attempt: int,
+    started: float,
+    policy: RetryPolicy,
+    limiter,
+    func_name: str,
+    idempotent: bool,
+) -> Optional[float]:
     """
-    Thread-safe rate limiter that enforces a minimum delay between API calls.
+    Decide whether and how long to wait before retrying a failed call.
 
-    This prevents hitting Notion's rate limits by proactively spacing out requests
-    rather than only reacting after receiving 429 errors.
+    Returns None if the error should be raised. Rate limit responses also pause
+    the shared limiter for the wait so every other caller backs off too.
     """
+    error_class = policy.classify(error, idempotent=idempotent)
+    if error_class is None:
+        if not isinstance(error, HTTPResponseError):
+            logger.error(f"Unexpected error in {func_name}: {error}")
+        return None
 
-    def __init__(self, min_delay: float = MIN_DELAY_BETWEEN_CALLS):
-        self._min_delay = min_delay
-        self._last_call_time = 0.0
-        self._lock = threading.Lock()
+    policy.record(error_class)
+    if error_class == "rate_limited":
+        limiter.record_rate_limited()
+    if attempt >= policy.max_retries:
+        logger.error(f"Max retries ({policy.max_retries}) exceeded for {func_name}")
+        return None
 
-    def wait_if_needed(self):
-        """Wait if necessary to maintain the minimum delay between calls."""
-        with self._lock:
-            current_time = time.time()
-            time_since_last_call = current_time - self._last_call_time
+    retry_after = get_retry_after(error)
+    if retry_after is not None:
+        wait_time = min(retry_after, policy.max_delay)
+        source = "Retry-After"
+    else:
+        wait_time = policy.backoff(attempt)
+        source = "backoff"
+    if policy.deadline is not None and time.monotonic() - started + wait_time > policy.deadline:
+        logger.error(f"Retry deadline ({policy.deadline:.0f}s) exceeded for {func_name}")
+        return None
 
-            if time_since_last_call < self._min_delay:
-                wait_time = self._min_delay - time_since_last_call
-                time.sleep(wait_time)
+    description = "Rate limited" if error_class == "rate_limited" else f"Transient error ({error_class})"
+    logger.warning(
+        f"{description} on {func_name}. "
+        f"Retry {attempt}/{policy.max_retries} after {wait_time:.1f}s ({source})"
+    )
+    if error_class == "rate_limited":
+        # Hold back every other caller sharing this limiter as well
+        limiter.pause(wait_time)
+    return wait_time
 
-            self._last_call_time = time.time()
 
+def _retry_deadline_error(wait_time: Optional[float], func_name: str) -> Optional[DeadlineExceeded]:
+    """The DeadlineExceeded to raise instead of sleeping wait_time before a retry, if any."""
+    if wait_time is None:
+        return None
+    try:
+        _check_run_deadline(wait_time, f"retry of {func_name}")
+    except DeadlineExceeded as e:
+        return e
+    return None
 
-# Global rate limiter instance shared across all clients
-_global_rate_limiter = ProactiveRateLimiter()
 
+def _record_failure(stats: ClientStats, method_name: str, latency: Optional[float], error: Exception):
+    """Record a failed attempt; latency is None if it failed before the request went out."""
+    if latency is not None:
+        stats.record_call(method_name, latency, error=True)
+    if is_rate_limited_error(error):
+        stats.record_rate_limited()
 
-def with_retry(func: Callable) -> Callable:
+
+def with_retry(
+    func: Callable = None,
+    *,
+    rate_limiter=None,
+    call_budget=None,
+    retry_policy: RetryPolicy = None,
+    idempotent: bool = True,
+    stats: ClientStats = None,
+    name: str = None,
+    trace_sink: TraceSink = None,
+    circuit_breaker: CircuitBreaker = None,
+) -> Callable:
     """
-    Decorator that adds proactive rate limiting and retry logic with exponential backoff.
+    Decorator that adds proactive rate limiting and retry logic with backoff.
 
     - Proactively waits between calls to prevent hitting rate limits
-    - Handles 429 (rate limit) errors by waiting and retrying with exponential backoff
+    - Records every attempt against the sliding-window call budget
+    - Handles 429 (rate limit) errors by waiting as long as Notion's Retry-After
+      header asks and pausing the rate limiter so other calls back off too
+    - Retries transient 5xx responses, timeouts and connection resets with
+      full-jitter exponential backoff, as configured by the retry policy
+
+    Args:
+        func: Function to wrap
+        rate_limiter: Limiter to wait on before each attempt (defaults to the global limiter)
+        call_budget: Sliding-window budget to record attempts in (defaults to the global budget)
+        retry_policy: RetryPolicy deciding what to retry (defaults to the global policy)
+        idempotent: False for calls that create objects, which are only retried
+            when the failed attempt certainly had no effect
+        stats: ClientStats to record attempts and waits in (defaults to the global stats)
+        name: Method name to record stats under (defaults to the function name)
+        trace_sink: TraceSink to record each call in (defaults to the global sink, if enabled)
+        circuit_breaker: CircuitBreaker to check before and record after each attempt
+            (defaults to the global breaker)
     """
+    if func is None:
+        return lambda f: with_retry(
+            f, rate_limiter=rate_limiter, call_budget=call_budget,
+            retry_policy=retry_policy, idempotent=idempotent, stats=stats, name=name,
+            trace_sink=trace_sink, circuit_breaker=circuit_breaker,
+        )
+
     @wraps(func)
     def wrapper(*args, **kwargs) -> Any:
-        retries = 0
-        delay = INITIAL_RETRY_DELAY
+        limiter = rate_limiter or _global_rate_limiter
+        budget = call_budget or _global_call_budget
+        policy = retry_policy or _global_retry_policy
+        recorder = stats or _global_client_stats
+        method_name = name or func.__name__
+        sink = trace_sink or _global_trace_sink
+        breaker = circuit_breaker or _global_circuit_breaker
+        caller = _caller_name() if sink is not None else None
+        started_at = time.time()
+        started = time.monotonic()
+        queue_wait = network_time = retry_sleep = 0.0
+        attempt = 0
 
-        while retries < MAX_RETRIES:
+        while True:
+            attempt += 1
+            start_time = None
             try:
                 # Proactive rate limiting: wait before making the call
-                _global_rate_limiter.wait_if_needed()
-                return func(*args, **kwargs)
-            except APIResponseError as e:
-                # Check if this is a rate limit error
-                if e.code == "rate_limited" or (hasattr(e, 'status') and e.status == 429):
-                    retries += 1
-                    if retries >= MAX_RETRIES:
-                        logger.error(f"Max retries ({MAX_RETRIES}) exceeded for {func.__name__}")
-                        raise
-
-                    wait_time = min(delay, MAX_RETRY_DELAY)
-                    logger.warning(
-                        f"Rate limited on {func.__name__}. "
-                        f"Retry {retries}/{MAX_RETRIES} after {wait_time:.1f}s"
+                wait_start = time.monotonic()
+                _check_run_deadline(reason=method_name)
+                breaker.allow(method_name)
+                budget.acquire()
+                limiter.wait_if_needed()
+                start_time = time.monotonic()
+                queue_wait += start_time - wait_start
+                recorder.record_limiter_wait(start_time - wait_start)
+                result = func(*args, **kwargs)
+                latency = time.monotonic() - start_time
+                network_time += latency
+                breaker.record_success()
+                limiter.record_success(latency)
+                recorder.record_call(method_name, latency)
+                if sink is not None:
+                    sink.record_call(
+                        method_name, caller, kwargs, started_at, attempt,
+                        queue_wait, network_time, retry_sleep, result=result,
                     )
-                    time.sleep(wait_time)
-                    delay *= BACKOFF_MULTIPLIER
-                else:
-                    # Not a rate limit error, re-raise immediately
-                    raise
+                return result
+            except (DeadlineExceeded, CircuitOpenError):
+                raise
             except Exception as e:
-                # Unexpected error, re-raise
-                logger.error(f"Unexpected error in {func.__name__}: {e}")
+                latency = time.monotonic() - start_time if start_time is not None else None
+                network_time += latency or 0.0
+                if start_time is not None:
+                    breaker.record_failure(e)
+                _record_failure(recorder, method_name, latency, e)
+                wait_time = _prepare_retry(e, attempt, started, policy, limiter, method_name, idempotent)
+                deadline_error = _retry_deadline_error(wait_time, method_name)
+                if wait_time is None or deadline_error is not None:
+                    if sink is not None:
+                        sink.record_call(
+                            method_name, caller, kwargs, started_at, attempt,
+                            queue_wait, network_time, retry_sleep, error=e,
+                        )
+                    if deadline_error is not None:
+                        raise deadline_error from e
+                    raise
+                retry_sleep += wait_time
+                recorder.record_retry_sleep(wait_time)
+                time.sleep(wait_time)
+
+    return wrapper
+
+
+async def _async_wait_if_needed(limiter):
+    """Wait on a rate limiter without blocking the event loop."""
+    if isinstance(limiter, SharedFileRateLimiter):
+        # Reserving locks and rewrites the ledger file, which can block on other processes
+        wait_time = await asyncio.to_thread(limiter.reserve)
+    else:
+        wait_time = limiter.reserve()
+    # Every limiter hands out reservations, so waiting is just a sleep
+    if wait_time > 0:
+        await _async_sleep(wait_time, "rate limiter wait")
+
+
+def with_async_retry(
+    func: Callable = None,
+    *,
+    rate_limiter=None,
+    call_budget=None,
+    retry_policy: RetryPolicy = None,
+    idempotent: bool = True,
+    stats: ClientStats = None,
+    name: str = None,
+    trace_sink: TraceSink = None,
+    circuit_breaker: CircuitBreaker = None,
+) -> Callable:
+    """
+    Async counterpart of ``with_retry`` for coroutine functions.
+
+    Applies the same call budget, proactive rate limiting and retry policy,
+    but waits with ``asyncio.sleep`` so other requests can stay in flight while
+    this one is held back.
+
+    Args:
+        func: Coroutine function to wrap
+        rate_limiter: Limiter to wait on before each attempt (defaults to the global limiter)
+        call_budget: Sliding-window budget to record attempts in (defaults to the global budget)
+        retry_policy: RetryPolicy deciding what to retry (defaults to the global policy)
+        idempotent: False for calls that create objects
+        stats: ClientStats to record attempts and waits in (defaults to the global stats)
+        name: Method name to record stats under (defaults to the function name)
+        trace_sink: TraceSink to record each call in (defaults to the global sink, if enabled)
+        circuit_breaker: CircuitBreaker to check before and record after each attempt
+            (defaults to the global breaker)
+    """
+    if func is None:
+        return lambda f: with_async_retry(
+            f, rate_limiter=rate_limiter, call_budget=call_budget,
+            retry_policy=retry_policy, idempotent=idempotent, stats=stats, name=name,
+            trace_sink=trace_sink, circuit_breaker=circuit_breaker,
+        )
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> Any:
+        limiter = rate_limiter or _global_rate_limiter
+        budget = call_budget or _global_call_budget
+        policy = retry_policy or _global_retry_policy
+        recorder = stats or _global_client_stats
+        method_name = name or func.__name__
+        sink = trace_sink or _global_trace_sink
+        breaker = circuit_breaker or _global_circuit_breaker
+        caller = _caller_name() if sink is not None else None
+        started_at = time.time()
+        started = time.monotonic()
+        queue_wait = network_time = retry_sleep = 0.0
+        attempt = 0
+
+        while True:
+            attempt += 1
+            start_time = None
+            try:
+                # Proactive rate limiting: wait before making the call
+                wait_start = time.monotonic()
+                _check_run_deadline(reason=method_name)
+                breaker.allow(method_name)
+                wait_time = budget.try_acquire()
+                while wait_time > 0:
+                    await _async_sleep(wait_time, "call budget wait")
+                    wait_time = budget.try_acquire()
+                await _async_wait_if_needed(limiter)
+                start_time = time.monotonic()
+                queue_wait += start_time - wait_start
+                recorder.record_limiter_wait(start_time - wait_start)
+                result = await func(*args, **kwargs)
+                latency = time.monotonic() - start_time
+                network_time += latency
+                breaker.record_success()
+                limiter.record_success(latency)
+                recorder.record_call(method_name, latency)
+                if sink is not None:
+                    sink.record_call(
+                        method_name, caller, kwargs, started_at, attempt,
+                        queue_wait, network_time, retry_sleep, result=result,
+                    )
+                return result
+            except (DeadlineExceeded, CircuitOpenError):
                 raise
+            except Exception as e:
+                latency = time.monotonic() - start_time if start_time is not None else None
+                network_time += latency or 0.0
+                if start_time is not None:
+                    breaker.record_failure(e)
+                _record_failure(recorder, method_name, latency, e)
+                wait_time = _prepare_retry(e, attempt, started, policy, limiter, method_name, idempotent)
+                deadline_error = _retry_deadline_error(wait_time, method_name)
+                if wait_time is None or deadline_error is not None:
+                    if sink is not None:
+                        sink.record_call(
+                            method_name, caller, kwargs, started_at, attempt,
+                            queue_wait, network_time, retry_sleep, error=e,
+                        )
+                    if deadline_error is not None:
+                        raise deadline_error from e
+                    raise
+                retry_sleep += wait_time
+                recorder.record_retry_sleep(wait_time)
+                await asyncio.sleep(wait_time)
+
+    return wrapper
+
+
+class SchemaCache:
+    """
+    TTL cache of ``databases.retrieve`` results keyed by database ID.
+
+    Scripts look up the same database schema several times per run (the daily
+    review did five full retrieves of one database). Clients serve repeat
+    retrieves from this cache until the entry is ``ttl`` seconds old, and
+    replace the entry with the updated database whenever ``databases.update``
+    is called through them. Callers get a copy, so mutating a returned schema
+    doesn't change the cached one.
+    """
+
+    def __init__(self, ttl: float = SCHEMA_CACHE_TTL):
+        if ttl < 0:
+            raise ValueError(f"ttl must be non-negative, got {ttl}")
+        self._ttl = ttl
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    @property
+    def hits(self) -> int:
+        with self._lock:
+            return self._hits
+
+    @property
+    def misses(self) -> int:
+        with self._lock:
+            return self._misses
+
+    def get(self, database_id: str) -> Optional[dict]:
+        """Return a copy of the cached database, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(database_id)
+            if entry is not None and time.monotonic() - entry[0] >= self._ttl:
+                del self._entries[database_id]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, database_id: str, database: dict):
+        with self._lock:
+            self._entries[database_id] = (time.monotonic(), copy.deepcopy(database))
+
+    def invalidate(self, database_id: str = None):
+        """Drop one database from the cache, or every database if no ID is given."""
+        with self._lock:
+            if database_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(database_id, None)
+
+
+# Process-wide schema cache shared by all clients
+_global_schema_cache = SchemaCache()
+
 
-        # Should not reach here, but just in case
-        raise Exception(f"Failed after {MAX_RETRIES} retries")
+def _database_id(args: tuple, kwargs: dict) -> Optional[str]:
+    return kwargs.get("database_id", args[0] if args else None)
+
+
+def _with_schema_cache(func: Callable, cache: SchemaCache, method: str) -> Callable:
+    """Serve ``databases.retrieve`` from the cache and refresh it on ``databases.update``."""
+    @wraps(func)
+    def wrapper(*args, **kwargs) -> Any:
+        database_id = _database_id(args, kwargs)
+        if method == "retrieve":
+            cached = cache.get(database_id)
+            if cached is not None:
+                return cached
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            if method == "update":
+                # The update may or may not have been applied
+                cache.invalidate(database_id)
+            raise
+        cache.set(database_id, result)
+        return result
+
+    return wrapper
+
+
+def _with_async_schema_cache(func: Callable, cache: SchemaCache, method: str) -> Callable:
+    """Async counterpart of ``_with_schema_cache``."""
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> Any:
+        database_id = _database_id(args, kwargs)
+        if method == "retrieve":
+            cached = cache.get(database_id)
+            if cached is not None:
+                return cached
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            if method == "update":
+                cache.invalidate(database_id)
+            raise
+        cache.set(database_id, result)
+        return result
+
+    return wrapper
+
+
+class _Flight:
+    """One in-flight call that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one.
+
+    The first caller for a key runs the call; callers arriving with the same
+    key while it is in flight wait for it and get a copy of its result (or its
+    exception) instead of making their own request. Once the call finishes the
+    key is forgotten, so later calls run again; this only deduplicates work
+    that overlaps in time.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._coalesced = 0
+        self._lock = threading.Lock()
+
+    @property
+    def coalesced(self) -> int:
+        """Number of calls that were served by another caller's request."""
+        with self._lock:
+            return self._coalesced
+
+    def do(self, key, func: Callable) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self._coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        result = None
+        try:
+            result = func()
+            return result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                waiters = flight.waiters
+            if waiters and flight.error is None:
+                # Snapshot before the leader's caller can mutate its result
+                flight.result = copy.deepcopy(result)
+            flight.done.set()
+
+
+class AsyncSingleFlight:
+    """``SingleFlight`` for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._flights = {}
+        self._coalesced = 0
+
+    @property
+    def coalesced(self) -> int:
+        """Number of calls that were served by another caller's request."""
+        return self._coalesced
+
+    async def do(self, key, func: Callable) -> Any:
+        future = self._flights.get(key)
+        if future is not None:
+            self._coalesced += 1
+            return copy.deepcopy(await asyncio.shield(future))
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(copy.deepcopy(result))
+            return result
+        finally:
+            del self._flights[key]
+
+
+def _single_flight_key(method: str, args: tuple, kwargs: dict):
+    return method, json.dumps([args, kwargs], sort_keys=True, default=str)
+
+
+def _with_single_flight(func: Callable, flights: SingleFlight, method: str) -> Callable:
+    @wraps(func)
+    def wrapper(*args, **kwargs) -> Any:
+        return flights.do(_single_flight_key(method, args, kwargs), lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def _with_async_single_flight(func: Callable, flights: AsyncSingleFlight, method: str) -> Callable:
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> Any:
+        return await flights.do(_single_flight_key(method, args, kwargs), lambda: func(*args, **kwargs))
 
     return wrapper
 
 
+class ConcurrentRequestExecutor(ThreadPoolExecutor):
+    """
+    Thread pool for issuing rate-limited Notion calls concurrently.
+
+    The client's rate limiter still spaces request *start* times, but up to
+    ``max_workers`` requests can be waiting on the network at once. Serial code
+    gets roughly 1/(spacing + round trip) calls per second; with a few workers
+    the round trips overlap and throughput approaches the rate limit itself.
+
+    Use it like any executor::
+
+        with ConcurrentRequestExecutor() as executor:
+            results = list(executor.map(update_page, pages))
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_REQUESTS):
+        super().__init__(max_workers=max_workers, thread_name_prefix="notion-request")
+
+    def submit(self, fn, /, *args, **kwargs):
+        # Name the submitting function here, while it's still on the stack
+        return super().submit(_with_caller(fn, _caller_name()), *args, **kwargs)
+
+
+class PageUpdateBuffer:
+    """
+    Write-behind buffer that merges ``pages.update`` calls per page.
+
+    ``update()`` takes the same arguments as ``pages.update`` but only records
+    the change; property changes for a page already pending are merged into it
+    (later values win), so a page touched several times in a run is patched
+    once. ``flush()`` sends one request per pending page, concurrently, and
+    happens automatically once ``max_pending`` pages are waiting and when the
+    buffer is used as a context manager and the block exits cleanly.
+
+    A failed page doesn't stop the others: failures are returned from
+    ``flush()`` and collected in ``failures``. If the run deadline passes or the
+    circuit breaker opens during a flush, that error is raised once the flush
+    has finished, so the run stops as it would without the buffer.
+
+    ``on_flush``, if given, is called with each flush's result, including the
+    automatic ones, so callers can account for what was actually written.
+    """
+
+    def __init__(self, pages, max_pending: int = PAGE_UPDATE_BUFFER_SIZE,
+                 max_workers: int = MAX_CONCURRENT_REQUESTS, on_flush: Optional[Callable[[dict], None]] = None):
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be at least 1, got {max_pending}")
+        self._pages = pages
+        self._max_pending = max_pending
+        self._max_workers = max_workers
+        self._on_flush = on_flush
+        self._pending = {}
+        # Function that first queued each pending page, for tracing its write
+        self._callers = {}
+        self._merged = 0
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Pages with changes not yet sent."""
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def merged(self) -> int:
+        """Updates folded into an already pending update for the same page."""
+        with self._lock:
+            return self._merged
+
+    @property
+    def failures(self) -> dict:
+        """Page ID to exception for every page whose update failed so far."""
+        with self._lock:
+            return dict(self._failures)
+
+    def update(self, page_id: str, properties: dict = None, **kwargs):
+        """Queue a ``pages.update`` call, merging it with any pending one for the page."""
+        caller = _caller_name()
+        with self._lock:
+            entry = self._pending.get(page_id)
+            if entry is None:
+                entry = self._pending[page_id] = {"properties": {}}
+                self._callers[page_id] = caller
+            else:
+                self._merged += 1
+            entry["properties"].update(properties or {})
+            entry.update(kwargs)
+            full = len(self._pending) >= self._max_pending
+        if full:
+            self.flush()
+
+    def _send(self, page_id: str, entry: dict):
+        if not entry["properties"]:
+            entry = {key: value for key, value in entry.items() if key != "properties"}
+        return self._pages.update(page_id=page_id, **entry)
+
+    def flush(self) -> dict:
+        """
+        Send every pending update.
+
+        Returns a dict with ``updated`` (page IDs written) and ``failed``
+        (page ID to exception).
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            callers, self._callers = self._callers, {}
+        updated, failed = [], {}
+        if not pending:
+            return {"updated": updated, "failed": failed}
+
+        with ConcurrentRequestExecutor(max_workers=self._max_workers) as executor:
+            futures = [
+                (page_id, executor.submit(_with_caller(self._send, callers[page_id]), page_id, entry))
+                for page_id, entry in pending.items()
+            ]
+            for page_id, future in futures:
+                try:
+                    future.result()
+                    updated.append(page_id)
+                except Exception as e:
+                    logger.error(f"Failed to update page {page_id}: {e}")
+                    failed[page_id] = e
+        with self._lock:
+            self._failures.update(failed)
+        logger.info(f"Flushed {len(pending)} page updates: {len(updated)} written, {len(failed)} failed")
+        if self._on_flush is not None:
+            self._on_flush({"updated": updated, "failed": failed})
+
+        stop = next((e for e in failed.values() if isinstance(e, (DeadlineExceeded, CircuitOpenError))), None)
+        if stop is not None:
+            raise stop
+        return {"updated": updated, "failed": failed}
+
+    def __enter__(self) -> "PageUpdateBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+
+def paginate(function: Callable, *, prefetch: bool = False, **kwargs) -> Iterator[dict]:
+    """
+    Yield every result of a paginated endpoint such as ``databases.query``.
+
+    Results are yielded as each API page arrives, so callers can start working
+    (or stop early) without collecting every page into a list first. With
+    ``prefetch=True`` the request for the next page is sent from a background
+    thread as soon as the current page arrives, overlapping its round trip
+    with the caller's processing of the current page.
+
+    Example::
+
+        for page in paginate(notion.databases.query, database_id=db_id, filter=filter_):
+            ...
+
+    Args:
+        function: Endpoint method taking ``start_cursor``
+        prefetch: Fetch the next page while the current one is being processed
+        **kwargs: Arguments passed to every call (e.g. ``database_id``, ``filter``)
+    """
+    def fetch(cursor):
+        if cursor:
+            return function(start_cursor=cursor, **kwargs)
+        return function(**kwargs)
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notion-prefetch") if prefetch else None
+    if executor is not None:
+        fetch_ahead = _with_caller(fetch, _caller_name())
+    try:
+        response = fetch(None)
+        while True:
+            upcoming = None
+            if response.get("has_more") and executor is not None:
+                upcoming = executor.submit(fetch_ahead, response["next_cursor"])
+            yield from response["results"]
+            if not response.get("has_more"):
+                return
+            response = upcoming.result() if upcoming is not None else fetch(response["next_cursor"])
+    finally:
+        if executor is not None:
+            # Don't block a caller that stopped early on a page it no longer needs
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _and_filter(filter_: Optional[dict], condition: dict) -> Optional[dict]:
+    """
+    Combine a query filter with one more condition, or return None if the
+    result would nest deeper than the two levels Notion accepts.
+    """
+    if not filter_:
+        return condition
+    if "and" in filter_:
+        return {"and": filter_["and"] + [condition]}
+    if "or" in filter_ and any("and" in part or "or" in part for part in filter_["or"]):
+        return None
+    return {"and": [filter_, condition]}
+
+
+class PageCache:
+    """
+    On-disk cache of page payloads keyed by page ID, validated by ``last_edited_time``.
+
+    ``query()`` runs a database query in two passes. The first asks only for
+    the title property, which is enough to learn which pages match and when
+    each was last edited. Pages whose ``last_edited_time`` matches the cached
+    copy are served from the cache; the rest are fetched in full with the same
+    query narrowed to pages edited since the oldest change. A run where
+    nothing changed downloads only the small first pass.
+
+    Both passes cost calls, so the cache pays off for large result sets that
+    mostly don't change between runs, not for small per-item queries.
+    ``save()`` writes the cache back; pages not seen by any query in the run
+    are dropped so the file doesn't keep deleted pages forever.
+
+    ``last_edited_time`` only has minute precision, so pages edited less than
+    ``settle_time`` seconds before they were fetched are returned but not
+    cached, and count as misses on the next run.
+    """
+
+    def __init__(self, path: str, settle_time: float = PAGE_CACHE_SETTLE_TIME):
+        self._path = path
+        self._settle_time = settle_time
+        self._pages = {}
+        self._seen = set()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def hits(self) -> int:
+        """Pages served from the cache."""
+        with self._lock:
+            return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Pages that were new or changed and had to be fetched in full."""
+        with self._lock:
+            return self._misses
+
+    def hit_rate(self) -> float:
+        with self._lock:
+            hits, misses = self._hits, self._misses
+        total = hits + misses
+        return hits / total if total else 0.0
+
+    def summary(self) -> str:
+        with self._lock:
+            hits, misses, cached = self._hits, self._misses, len(self._pages)
+        total = hits + misses
+        hit_rate = hits / total if total else 0.0
+        return (
+            f"Page cache: {hits} hits, {misses} misses "
+            f"({hit_rate:.0%} hit rate), {cached} pages cached"
+        )
+
+    def _load(self):
+        try:
+            with open(self._path, "r") as f:
+                pages = json.load(f)["pages"]
+            if isinstance(pages, dict):
+                self._pages = pages
+        except (OSError, ValueError, KeyError, TypeError):
+            self._pages = {}
+
+    def save(self):
+        """Write the pages seen this run to the cache file."""
+        with self._lock:
+            pages = {page_id: self._pages[page_id] for page_id in self._seen if page_id in self._pages}
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"pages": pages}, f)
+        os.replace(tmp_path, self._path)
+
+    def _settled(self, page: dict) -> bool:
+        try:
+            edited = datetime.fromisoformat(page["last_edited_time"].replace("Z", "+00:00"))
+        except (KeyError, AttributeError, ValueError):
+            return False
+        return time.time() - edited.timestamp() >= self._settle_time
+
+    def query(self, client, database_id: str, **kwargs) -> list:
+        """
+        Return every page matching a ``databases.query``, in query order.
+
+        Args:
+            client: Client with ``databases.query`` and ``pages.retrieve``
+            database_id: Database to query
+            **kwargs: ``filter`` and ``sorts`` as for ``databases.query``
+        """
+        stubs = list(paginate(client.databases.query, database_id=database_id, filter_properties=["title"], **kwargs))
+        with self._lock:
+            stale = [
+                stub for stub in stubs
+                if self._pages.get(stub["id"], {}).get("last_edited_time") != stub["last_edited_time"]
+            ]
+            self._seen.update(stub["id"] for stub in stubs)
+            self._hits += len(stubs) - len(stale)
+            self._misses += len(stale)
+
+        fetched = {}
+        if stale:
+            since = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": min(stub["last_edited_time"] for stub in stale)}}
+            narrowed = _and_filter(kwargs.get("filter"), since)
+            query_kwargs = dict(kwargs, filter=narrowed) if narrowed is not None else kwargs
+            for page in paginate(client.databases.query, database_id=database_id, **query_kwargs):
+                fetched[page["id"]] = page
+            # A page edited again between the passes may be missing; fetch it directly
+            for stub in stale:
+                if stub["id"] not in fetched:
+                    fetched[stub["id"]] = client.pages.retrieve(page_id=stub["id"])
+            with self._lock:
+                for stub in stale:
+                    page = fetched[stub["id"]]
+                    if self._settled(page):
+                        self._pages[stub["id"]] = page
+                    else:
+                        self._pages.pop(stub["id"], None)
+
+        with self._lock:
+            return [copy.deepcopy(self._pages.get(stub["id"]) or fetched[stub["id"]]) for stub in stubs]
+
+
+def open_page_cache(path: Optional[str] = None) -> Optional[PageCache]:
+    """Return a PageCache backed by path (default: PAGE_CACHE_FILE), or None if neither is set."""
+    path = path or PAGE_CACHE_FILE
+    return PageCache(path) if path else None
+
+
 class RateLimitedNotionClient:
     """
     Wrapper around the Notion Client that adds rate limiting and retry logic.
@@ -114,27 +2214,109 @@ class RateLimitedNotionClient:
     to handle rate limiting gracefully.
     """
 
-    def __init__(self, auth: str, **kwargs):
+    def __init__(self, auth: str, rate_limiter=None, call_budget=None, retry_policy=None, stats=None,
+                 trace_sink=None, transport=None, schema_cache=None, single_flight=None, circuit_breaker=None,
+                 **kwargs):
         """
         Initialize the rate-limited Notion client.
 
         Args:
             auth: Notion API token
+            rate_limiter: Limiter shared by all calls (defaults to the global limiter)
+            call_budget: Sliding-window call budget (defaults to the global budget)
+            retry_policy: RetryPolicy for failed calls (defaults to the global policy)
+            stats: ClientStats to record API timings in (defaults to the global stats)
+            trace_sink: TraceSink to trace every call to (defaults to the global sink, if enabled)
+            schema_cache: SchemaCache for databases.retrieve results (defaults to the global cache)
+            single_flight: SingleFlight coalescing concurrent identical reads
+                (defaults to one per client)
+            circuit_breaker: CircuitBreaker failing calls fast during outages
+                (defaults to the global breaker)
+            transport: httpx transport to send requests through (defaults to the
+                process-wide pooled transport; ignored if ``client`` is passed)
             **kwargs: Additional arguments passed to the Notion Client
         """
+        if "client" not in kwargs:
+            kwargs["client"] = httpx.Client(transport=transport or get_shared_transport())
         self._client = Client(auth=auth, **kwargs)
+        self._rate_limiter = rate_limiter or _global_rate_limiter
+        self._call_budget = call_budget or _global_call_budget
+        self._retry_policy = retry_policy or _global_retry_policy
+        self._stats = stats or _global_client_stats
+        self._trace_sink = trace_sink or _global_trace_sink
+        self._schema_cache = schema_cache or _global_schema_cache
+        self._single_flight = single_flight or SingleFlight()
+        self._circuit_breaker = circuit_breaker or _global_circuit_breaker
         self._wrap_client_methods()
 
+    @property
+    def rate_limiter(self):
+        """The proactive rate limiter used by this client."""
+        return self._rate_limiter
+
+    @property
+    def call_budget(self) -> SlidingWindowCallBudget:
+        """The sliding-window call budget used by this client."""
+        return self._call_budget
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """The retry policy used by this client."""
+        return self._retry_policy
+
+    @property
+    def stats(self) -> ClientStats:
+        """Per-endpoint call counts, latency histograms and wait times."""
+        return self._stats
+
+    @property
+    def single_flight(self):
+        """The single-flight group concurrent identical reads are coalesced in."""
+        return self._single_flight
+
+    @property
+    def schema_cache(self) -> SchemaCache:
+        """The cache databases.retrieve results are served from."""
+        return self._schema_cache
+
+    @property
+    def trace_sink(self) -> Optional[TraceSink]:
+        """The trace sink calls are recorded in, or None if tracing is off."""
+        return self._trace_sink
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        """The circuit breaker calls are checked against."""
+        return self._circuit_breaker
+
+    def remaining_budget(self) -> int:
+        """Calls that can be made right now without exceeding Notion's windowed limits."""
+        return self._call_budget.remaining()
+
+    def page_update_buffer(self, max_pending: int = PAGE_UPDATE_BUFFER_SIZE,
+                           on_flush: Optional[Callable[[dict], None]] = None) -> PageUpdateBuffer:
+        """Return a write-behind buffer merging this client's ``pages.update`` calls per page."""
+        return PageUpdateBuffer(self.pages, max_pending=max_pending, on_flush=on_flush)
+
     def _wrap_client_methods(self):
         """Wrap all client API endpoint methods with retry logic."""
         # Wrap the main API endpoint objects
         for attr_name in ['databases', 'pages', 'blocks', 'users', 'search', 'comments']:
             if hasattr(self._client, attr_name):
                 endpoint = getattr(self._client, attr_name)
-                setattr(self, attr_name, self._wrap_endpoint(endpoint))
+                setattr(self, attr_name, self._wrap_endpoint(attr_name, endpoint))
 
-    def _wrap_endpoint(self, endpoint: Any) -> Any:
+    def _wrap_endpoint(self, endpoint_name: str, endpoint: Any) -> Any:
         """Create a wrapper object that adds retry logic to all endpoint methods."""
+        rate_limiter = self._rate_limiter
+        call_budget = self._call_budget
+        retry_policy = self._retry_policy
+        stats = self._stats
+        trace_sink = self._trace_sink
+        schema_cache = self._schema_cache
+        single_flight = self._single_flight
+        circuit_breaker = self._circuit_breaker
+
         class WrappedEndpoint:
             def __init__(self, original_endpoint):
                 self._original = original_endpoint
@@ -142,7 +2324,22 @@ class RateLimitedNotionClient:
             def __getattr__(self, name):
                 attr = getattr(self._original, name)
                 if callable(attr):
-                    return with_retry(attr)
+                    wrapped = with_retry(
+                        attr,
+                        rate_limiter=rate_limiter,
+                        call_budget=call_budget,
+                        retry_policy=retry_policy,
+                        idempotent=(endpoint_name, name) not in NON_IDEMPOTENT_METHODS,
+                        stats=stats,
+                        name=f"{endpoint_name}.{name}",
+                        trace_sink=trace_sink,
+                        circuit_breaker=circuit_breaker,
+                    )
+                    if (endpoint_name, name) in READ_METHODS:
+                        wrapped = _with_single_flight(wrapped, single_flight, f"{endpoint_name}.{name}")
+                    if endpoint_name == "databases" and name in ("retrieve", "update"):
+                        wrapped = _with_schema_cache(wrapped, schema_cache, name)
+                    return wrapped
                 return attr
 
         return WrappedEndpoint(endpoint)
@@ -152,15 +2349,184 @@ class RateLimitedNotionClient:
         return getattr(self._client, name)
 
 
-def create_rate_limited_client(auth: str, **kwargs) -> RateLimitedNotionClient:
+class AsyncRateLimitedNotionClient:
+    """
+    Wrapper around the Notion AsyncClient that adds rate limiting and retry logic.
+
+    Endpoint methods are coroutines wrapped with ``with_async_retry``, so many
+    requests can be in flight at once (e.g. via ``asyncio.gather``) while their
+    start times are still spaced by the shared rate limiter and call budget.
+    """
+
+    def __init__(self, auth: str, rate_limiter=None, call_budget=None, retry_policy=None, stats=None,
+                 trace_sink=None, schema_cache=None, single_flight=None, circuit_breaker=None, **kwargs):
+        """
+        Initialize the async rate-limited Notion client.
+
+        Args:
+            auth: Notion API token
+            rate_limiter: Limiter shared by all calls (defaults to the global limiter)
+            call_budget: Sliding-window call budget (defaults to the global budget)
+            retry_policy: RetryPolicy for failed calls (defaults to the global policy)
+            stats: ClientStats to record API timings in (defaults to the global stats)
+            trace_sink: TraceSink to trace every call to (defaults to the global sink, if enabled)
+            schema_cache: SchemaCache for databases.retrieve results (defaults to the global cache)
+            single_flight: AsyncSingleFlight coalescing concurrent identical reads
+                (defaults to one per client)
+            circuit_breaker: CircuitBreaker failing calls fast during outages
+                (defaults to the global breaker)
+            **kwargs: Additional arguments passed to the Notion AsyncClient
+        """
+        if "client" not in kwargs:
+            # Async pools are bound to one event loop, so they can't be shared
+            # process-wide; each client gets its own with the same tuning
+            kwargs["client"] = httpx.AsyncClient(transport=httpx.AsyncHTTPTransport(**_transport_options(None)))
+        self._client = AsyncClient(auth=auth, **kwargs)
+        self._rate_limiter = rate_limiter or _global_rate_limiter
+        self._call_budget = call_budget or _global_call_budget
+        self._retry_policy = retry_policy or _global_retry_policy
+        self._stats = stats or _global_client_stats
+        self._trace_sink = trace_sink or _global_trace_sink
+        self._schema_cache = schema_cache or _global_schema_cache
+        self._single_flight = single_flight or AsyncSingleFlight()
+        self._circuit_breaker = circuit_breaker or _global_circuit_breaker
+        self._wrap_client_methods()
+
+    @property
+    def rate_limiter(self):
+        """The proactive rate limiter used by this client."""
+        return self._rate_limiter
+
+    @property
+    def call_budget(self) -> SlidingWindowCallBudget:
+        """The sliding-window call budget used by this client."""
+        return self._call_budget
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """The retry policy used by this client."""
+        return self._retry_policy
+
+    @property
+    def stats(self) -> ClientStats:
+        """Per-endpoint call counts, latency histograms and wait times."""
+        return self._stats
+
+    @property
+    def single_flight(self):
+        """The single-flight group concurrent identical reads are coalesced in."""
+        return self._single_flight
+
+    @property
+    def schema_cache(self) -> SchemaCache:
+        """The cache databases.retrieve results are served from."""
+        return self._schema_cache
+
+    @property
+    def trace_sink(self) -> Optional[TraceSink]:
+        """The trace sink calls are recorded in, or None if tracing is off."""
+        return self._trace_sink
+
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        """The circuit breaker calls are checked against."""
+        return self._circuit_breaker
+
+    def remaining_budget(self) -> int:
+        """Calls that can be made right now without exceeding Notion's windowed limits."""
+        return self._call_budget.remaining()
+
+    def _wrap_client_methods(self):
+        """Wrap all client API endpoint methods with async retry logic."""
+        for attr_name in ['databases', 'pages', 'blocks', 'users', 'search', 'comments']:
+            if hasattr(self._client, attr_name):
+                endpoint = getattr(self._client, attr_name)
+                setattr(self, attr_name, self._wrap_endpoint(attr_name, endpoint))
+
+    def _wrap_endpoint(self, endpoint_name: str, endpoint: Any) -> Any:
+        """Create a wrapper object that adds async retry logic to all endpoint methods."""
+        rate_limiter = self._rate_limiter
+        call_budget = self._call_budget
+        retry_policy = self._retry_policy
+        stats = self._stats
+        trace_sink = self._trace_sink
+        schema_cache = self._schema_cache
+        single_flight = self._single_flight
+        circuit_breaker = self._circuit_breaker
+
+        class WrappedAsyncEndpoint:
+            def __init__(self, original_endpoint):
+                self._original = original_endpoint
+
+            def __getattr__(self, name):
+                attr = getattr(self._original, name)
+                if callable(attr):
+                    wrapped = with_async_retry(
+                        attr,
+                        rate_limiter=rate_limiter,
+                        call_budget=call_budget,
+                        retry_policy=retry_policy,
+                        idempotent=(endpoint_name, name) not in NON_IDEMPOTENT_METHODS,
+                        stats=stats,
+                        name=f"{endpoint_name}.{name}",
+                        trace_sink=trace_sink,
+                        circuit_breaker=circuit_breaker,
+                    )
+                    if (endpoint_name, name) in READ_METHODS:
+                        wrapped = _with_async_single_flight(wrapped, single_flight, f"{endpoint_name}.{name}")
+                    if endpoint_name == "databases" and name in ("retrieve", "update"):
+                        wrapped = _with_async_schema_cache(wrapped, schema_cache, name)
+                    return wrapped
+                return attr
+
+        return WrappedAsyncEndpoint(endpoint)
+
+    async def __aenter__(self) -> "AsyncRateLimitedNotionClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the underlying HTTP connection pool."""
+        await self._client.aclose()
+
+    def __getattr__(self, name):
+        """Forward any other attributes to the underlying client."""
+        return getattr(self._client, name)
+
+
+def create_rate_limited_client(auth: str, rate_limit_mode: str = None, **kwargs) -> RateLimitedNotionClient:
     """
     Factory function to create a rate-limited Notion client.
 
     Args:
         auth: Notion API token
+        rate_limit_mode: RATE_LIMIT_MODE_SHARED, RATE_LIMIT_MODE_TOKEN_BUCKET,
+            RATE_LIMIT_MODE_FIXED, RATE_LIMIT_MODE_ADAPTIVE or RATE_LIMIT_MODE_NONE
+            (defaults to DEFAULT_RATE_LIMIT_MODE, i.e. the cross-process limiter
+            where available); RATE_LIMIT_MODE_NONE also lifts the call budget
         **kwargs: Additional arguments passed to the Notion Client
 
     Returns:
         RateLimitedNotionClient instance
     """
-    return RateLimitedNotionClient(auth=auth, **kwargs)
+    kwargs.setdefault("call_budget", _call_budget_for(rate_limit_mode))
+    return RateLimitedNotionClient(auth=auth, rate_limiter=get_rate_limiter(rate_limit_mode), **kwargs)
+
+
+def create_async_rate_limited_client(auth: str, rate_limit_mode: str = None, **kwargs) -> AsyncRateLimitedNotionClient:
+    """
+    Factory function to create an async rate-limited Notion client.
+
+    Args:
+        auth: Notion API token
+        rate_limit_mode: Same modes as create_rate_limited_client; async clients
+            share the process-wide limiter for that mode with sync clients
+        **kwargs: Additional arguments passed to the Notion AsyncClient
+
+    Returns:
+        AsyncRateLimitedNotionClient instance
+    """
+    kwargs.setdefault("call_budget", _call_budget_for(rate_limit_mode))
+    return AsyncRateLimitedNotionClient(auth=auth, rate_limiter=get_rate_limiter(rate_limit_mode), **kwargs)